@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark: cost of finding the route for callback data.
+Compares callback_router's single dict lookup with the if/elif chain of
+`==` / `split(':')` comparisons main_callback_handler used before.
+
+Run from the repository root:  python benchmarks/callback_dispatch.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config exits without these; the values are never used here
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("ADMIN_USER_ID", "1")
+
+from handlers.callback_handlers import callback_router # noqa: E402
+
+# Opcodes of the old format, in the order the if/elif chain tested them
+LEGACY_EXACT = ["noop", "up", "rt", "s_bk", "sm", "ss", "sx", "pm", "pc", "fm", "fx"]
+LEGACY_PREFIXED = ["d:", "f:", "si:", "pi:", "pv:", "fi:", "p:", "sd:", "sf:", "au:", "ru:", "adm_d:"]
+
+# A browsing-heavy mix: mostly folder/file/page taps, some toggles and admin buttons
+ROUTER_SAMPLES = ["d:3", "f:17", "p:2", "up", "rt", "si:5", "pv:120", "sd:9", "au:123456789", "no4", "fx", "ss"]
+LEGACY_SAMPLES = ["d:3", "f:17", "p:2", "up", "rt", "si:5", "pv:120", "sd:9", "au:123456789", "noop", "fx", "ss"]
+
+
+def legacy_resolve(data: str):
+    for opcode in LEGACY_EXACT:
+        if data == opcode:
+            return opcode, ""
+    if ':' in data:
+        prefix, payload = data.split(':', 1)
+        prefix_with_colon = prefix + ":"
+        for opcode in LEGACY_PREFIXED:
+            if prefix_with_colon == opcode:
+                return opcode, payload
+    return None
+
+
+def router_resolve(data: str):
+    return callback_router.resolve(data)
+
+
+def bench(label: str, resolve, samples, rounds: int = 200_000) -> float:
+    def run():
+        for data in samples:
+            resolve(data)
+    seconds = min(timeit.repeat(run, number=rounds // len(samples), repeat=5))
+    per_call_ns = seconds / (rounds // len(samples) * len(samples)) * 1e9
+    print(f"{label:<28} {per_call_ns:8.1f} ns/dispatch")
+    return per_call_ns
+
+
+if __name__ == "__main__":
+    print(f"{len(callback_router)} routes registered, {len(ROUTER_SAMPLES)} sample callbacks\n")
+    legacy_ns = bench("if/elif chain (before)", legacy_resolve, LEGACY_SAMPLES)
+    router_ns = bench("callback_router.resolve", router_resolve, ROUTER_SAMPLES)
+    print(f"\nspeed-up: {legacy_ns / router_ns:.1f}x")
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
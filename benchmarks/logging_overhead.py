@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: time a handler spends in logging calls on the event loop.
+The simulated handler logs what a button press does (the click line, the
+folder display line and one more INFO line) and every 50th call an error
+with its traceback, as error_handler does. Compared setups:
+- sync: logging.FileHandler on the root logger (the old bot.py setup)
+- queue: utils.logging_setup without sampling
+- queue+sampling: utils.logging_setup with the default LOG_SAMPLING
+
+Run from the repository root:  python benchmarks/logging_overhead.py
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config exits without these; the values are never used here
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("ADMIN_USER_ID", "1")
+
+from config import LOG_SAMPLING # noqa: E402
+from utils.logging_setup import setup_logging, stop_logging, TEXT_FORMAT, TEXT_DATE_FORMAT # noqa: E402
+
+CALLS = 20_000
+ERROR_EVERY = 50
+
+click_logger = logging.getLogger("handlers.callback_handlers.clicks")
+folder_logger = logging.getLogger("handlers.common_handlers")
+handler_logger = logging.getLogger("handlers.callback_handlers")
+
+
+def raise_nested(depth: int) -> None:
+    if depth == 0:
+        raise ValueError("simulated failure")
+    raise_nested(depth - 1)
+
+
+async def handler(call: int) -> None:
+    click_logger.info(f"Callback received: User=123456789, Data='nd{call % 24}'")
+    folder_logger.info(f"Displaying folder: User=123456789, Target='/srv/data/projects/{call}', ReqPage=0, EditHint=True")
+    handler_logger.info(f"Sending file /srv/data/projects/{call}/report.pdf to chat 123456789")
+    if call % ERROR_EVERY == 0:
+        try:
+            raise_nested(15)
+        except ValueError as e:
+            handler_logger.error(f"Error handling update: update_id={call} - ValueError: {e}", exc_info=True)
+
+
+async def measure() -> list:
+    latencies = []
+    for call in range(CALLS):
+        started = time.perf_counter()
+        await handler(call)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def setup_sync(log_file: Path) -> None:
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATE_FORMAT))
+    root.addHandler(file_handler)
+    root.setLevel(logging.INFO)
+
+
+def report(name: str, latencies: list) -> None:
+    latencies.sort()
+    mean_us = statistics.fmean(latencies) * 1e6
+    p50_us = latencies[len(latencies) // 2] * 1e6
+    p99_us = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"{name:<16} {mean_us:>10.1f} {p50_us:>10.1f} {p99_us:>10.1f}")
+
+
+def main() -> None:
+    print(f"{CALLS} handler calls, 3 INFO lines each, an error with traceback every {ERROR_EVERY}\n")
+    print(f"{'setup':<16} {'mean (us)':>10} {'p50 (us)':>10} {'p99 (us)':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        setup_sync(Path(directory) / "sync.log")
+        report("sync", asyncio.run(measure()))
+
+        setup_logging(log_file=str(Path(directory) / "queue.log"), log_format="text", sampling="", console=False)
+        report("queue", asyncio.run(measure()))
+        stop_logging()
+
+        setup_logging(log_file=str(Path(directory) / "sampled.log"), log_format="text", sampling=LOG_SAMPLING, console=False)
+        report("queue+sampling", asyncio.run(measure()))
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cost of one persistence run versus the number of users.
+PicklePersistence re-pickles and rewrites the whole file for every changed user;
+SQLitePersistence writes only the rows that changed. Each run here changes
+the data of 2% of the users (the ones active since the previous run).
+
+Run from the repository root:  python benchmarks/persistence_flush.py
+(takes a few minutes, almost all of it in the pickle runs)
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config exits without these; the values are never used here
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("ADMIN_USER_ID", "1")
+
+from telegram.ext import PersistenceInput, PicklePersistence # noqa: E402
+
+from utils.sqlite_persistence import SQLitePersistence # noqa: E402
+
+USER_COUNTS = (100, 500, 2_000)
+ACTIVE_SHARE = 0.02
+RUNS = 3
+STORE = PersistenceInput(bot_data=True, user_data=True, chat_data=False, callback_data=False)
+
+
+def sample_user_data(user_id: int, run: int) -> dict:
+    return {
+        "current_path": f"/srv/data/user{user_id}/projects",
+        "current_page": run,
+        "click_mode": "download",
+        "view_items": [{"name": f"file_{i}.log", "is_dir": False, "size": i * 1024} for i in range(24)],
+    }
+
+
+def sample_bot_data() -> dict:
+    return {
+        "file_id_cache": {f"/srv/data/file_{i}.bin": {"size": i, "mtime_ns": i, "kind": "document", "file_id": f"BQAC{i:040d}"} for i in range(500)},
+        "banner_file_id": {"source": "url", "file_id": "AgAC" + "x" * 60},
+    }
+
+
+async def run_pickle(directory: Path, users: int) -> float:
+    persistence = PicklePersistence(directory / "state.pickle", store_data=STORE, on_flush=False)
+    persistence.set_bot(None)
+    await persistence.get_user_data()
+    await persistence.get_bot_data()
+    for user_id in range(users):
+        await persistence.update_user_data(user_id, sample_user_data(user_id, 0))
+    bot_data = sample_bot_data()
+    active = max(1, int(users * ACTIVE_SHARE))
+    started = time.perf_counter()
+    for run in range(1, RUNS + 1):
+        await persistence.update_bot_data(bot_data)
+        for user_id in range(active):
+            await persistence.update_user_data(user_id, sample_user_data(user_id, run))
+    return (time.perf_counter() - started) / RUNS
+
+
+async def run_sqlite(directory: Path, users: int) -> float:
+    persistence = SQLitePersistence(directory / "state.sqlite3", store_data=STORE)
+    persistence.set_bot(None)
+    await persistence.get_user_data()
+    await persistence.get_bot_data()
+    await asyncio.gather(*(persistence.update_user_data(user_id, sample_user_data(user_id, 0)) for user_id in range(users)))
+    bot_data = sample_bot_data()
+    active = max(1, int(users * ACTIVE_SHARE))
+    started = time.perf_counter()
+    for run in range(1, RUNS + 1):
+        # Application.update_persistence runs these concurrently, like here
+        await asyncio.gather(
+            persistence.update_bot_data(bot_data),
+            *(persistence.update_user_data(user_id, sample_user_data(user_id, run)) for user_id in range(active))
+        )
+    elapsed = (time.perf_counter() - started) / RUNS
+    await persistence.flush()
+    return elapsed
+
+
+async def main() -> None:
+    print(f"{'users':>8} {'pickle (ms/run)':>16} {'sqlite (ms/run)':>16}")
+    for users in USER_COUNTS:
+        with tempfile.TemporaryDirectory() as pickle_dir, tempfile.TemporaryDirectory() as sqlite_dir:
+            pickle_ms = await run_pickle(Path(pickle_dir), users) * 1000
+            sqlite_ms = await run_sqlite(Path(sqlite_dir), users) * 1000
+        print(f"{users:>8} {pickle_ms:>16.1f} {sqlite_ms:>16.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -4,7 +4,7 @@
 Telegram Bot for Remote File Management.
 Main entry point for the bot application.
 Initializes the application, sets up logging, registers handlers,
-sets command list and starts polling.
+sets command list and starts polling (or the webhook server).
 Console output is limited to WARNINGS, ERRORS, and unauthorized access attempts.
 """
 
@@ -19,8 +19,8 @@ from telegram.ext import (
     CommandHandler,
     CallbackQueryHandler,
     MessageHandler,
+    TypeHandler,
     filters,
-    PicklePersistence, # For bot_data persistence
     PersistenceInput #  <--- Import الجديد
 )
 
@@ -28,27 +28,33 @@ from telegram.ext import (
 import config
 # import localization as loc # Not directly used here, but good for consistency
 from handlers import (
-    start_command, help_command, cancel_command,
+    start_command, help_command, cancel_command, stats_command, profile_command,
     main_callback_handler,
     handle_text_search, # handle_unauthorized_catch_all is now mostly part of other handlers
+    handle_document_upload,
     error_handler
 )
-from utils.auth_utils import load_authorized_users # To load initially
-
-# --- Logging Setup (Simplified) ---
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.FileHandler(config.LOG_FILE_NAME, encoding='utf-8'),
-    ]
-)
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.WARNING)
-console_formatter = logging.Formatter('%(levelname)s: %(name)s - %(message)s')
-console_handler.setFormatter(console_formatter)
-logging.getLogger().addHandler(console_handler)
+from handlers.follow_handlers import stop_all_follows
+from utils.auth_utils import load_authorized_users, auth_service
+from utils.access_guard import unauthorized_guard
+from utils.error_tracker import error_tracker
+from utils.rate_limiter import TelegramRateLimiter
+from utils.webhook import run_webhook
+from utils.update_processor import PerUserUpdateProcessor
+from utils.request_pools import PooledRequest
+from utils.sqlite_persistence import SQLitePersistence
+from utils.sessions import session_manager, compact_session
+from utils.metrics_endpoint import metrics_endpoint
+from utils.profiler import profiler
+from utils.loop_monitor import loop_monitor
+from utils.runtime_stats import runtime_stats
+from utils.helpers import load_banner_source
+from utils import metrics
+from utils.logging_setup import setup_logging
+
+# --- Logging Setup ---
+# Records are queued; a background thread writes the rotating log file (INFO+) and the console (WARNING+).
+setup_logging(logging.INFO)
 
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("telegram.vendor.ptb_urllib3.urllib3").setLevel(logging.WARNING)
@@ -84,13 +90,36 @@ async def post_init(application: Application) -> None:
     ])
     logger.info("Bot command list set.")
     
-    # Load authorized users into bot_data for the first time if persistence didn't handle it
-    # (PicklePersistence should load it automatically if file exists)
-    if 'authorized_ids' not in application.bot_data:
-        load_authorized_users(application) # Pass application which has .bot_data
-        logger.info(f"Initial authorized users loaded via post_init. Admin ID: {config.ADMIN_USER_ID}")
-    else:
-        logger.info(f"Authorized users already present in bot_data (likely from persistence). Admin ID: {config.ADMIN_USER_ID}")
+    # authorized_users.json is the only source of truth; IDs an older version kept in
+    # bot_data (the old .pickle, imported into the SQLite database) are merged into it once and dropped from bot_data.
+    load_authorized_users(application)
+    auth_service.start_watching() # Hot reload when the file is edited
+    logger.info(f"Authorized users loaded. Admin ID: {config.ADMIN_USER_ID}")
+    unauthorized_guard.start(application) # Periodic admin summary of repeated unauthorized attempts
+    error_tracker.start(application) # Periodic admin report of the most frequent errors
+    session_manager.start(application) # Forgets sessions idle for longer than SESSION_TTL
+    await metrics_endpoint.start() # Only when METRICS_PORT is set
+    loop_monitor.start() # Event loop lag and blocking-call stacks (metrics, /stats)
+    runtime_stats.start() # API calls per minute for /stats
+    profiler.install_signal_handler(application) # kill -USR1 <pid> profiles for PROFILE_SIGNAL_SECONDS
+    await load_banner_source() # Renders reuse the key instead of a stat() per banner
+
+
+async def post_stop(application: Application) -> None:
+    # Live follows are plain tasks (Application.stop() would otherwise wait up to FOLLOW_TIMEOUT for them);
+    # they get their final edit here, while the bot can still send requests.
+    await stop_all_follows()
+
+
+async def post_shutdown(application: Application) -> None:
+    await auth_service.stop_watching()
+    await unauthorized_guard.stop()
+    await error_tracker.stop()
+    await session_manager.stop()
+    await metrics_endpoint.stop()
+    await profiler.stop()
+    await loop_monitor.stop()
+    await runtime_stats.stop()
 
 
 # --- Main Function ---
@@ -99,38 +128,38 @@ def main() -> None:
     logger.info("--- Bot Initialization Sequence Started ---")
     check_security_risks()
 
-    # Configure persistence for bot_data (like authorized users list)
-    # The .json file is for human readability and manual backup/restore if needed.
-    # PTB's PicklePersistence will use the .pickle file for its own operations.
-    # We load from .json if .pickle doesn't exist or on first run logic.
-    # Our `save_authorized_users` in `auth_utils` writes to the .json.
-    # PTB's persistence writes to the .pickle. We need to keep them in sync or choose one.
-    # For simplicity with PTB's built-in persistence, let's rely on PTB to manage the state
-    # and our `load_authorized_users` can be a fallback if the pickle doesn't exist initially.
-
-    # This configures what data PTB's persistence system will store.
-    # We are primarily interested in bot_data for the dynamic authorized users list.
-    persistence_config = PersistenceInput(bot_data=True, chat_data=False, user_data=False)
+    # Configure persistence for bot_data (file_id caches, banner file_id) and browsing sessions.
+    # Authorized users are not kept here: authorized_users.json is their only store
+    # (see utils.auth_utils.AuthService); older pickles still holding them are migrated on start.
+    persistence_config = PersistenceInput(bot_data=True, chat_data=False, user_data=True, callback_data=False)
     
-    # The filepath for PicklePersistence. PTB will create/manage this .pickle file.
-    # Our manual `authorized_users.json` can serve as a human-readable backup or initial seed.
-    # Let's use a distinct name for the pickle file managed by PTB.
-    ptb_persistence_file = Path(config.AUTHORIZED_USERS_FILE).with_suffix('.pickle')
-
-    persistence = PicklePersistence(
-        filepath=ptb_persistence_file,
-        store_data=persistence_config
+    # The .pickle older versions kept with PicklePersistence; imported into the database on its first start.
+    legacy_pickle_file = Path(config.AUTHORIZED_USERS_FILE).with_suffix('.pickle')
+
+    persistence = SQLitePersistence(
+        filepath=Path(config.PERSISTENCE_FILE),
+        store_data=persistence_config,
+        legacy_pickle=legacy_pickle_file,
+        compact_user_data=compact_session # Only path, page, mode and message id; restored on the user's first update
     )
-    logger.info(f"Using PicklePersistence with file: {ptb_persistence_file}")
+    logger.info(f"Using SQLite persistence with file: {config.PERSISTENCE_FILE}")
 
 
     logger.info("Initializing Telegram Bot Application...")
     try:
+        builder = Application.builder().token(config.TOKEN)
+        if config.BOT_API_BASE_URL:
+            api_base_url = config.BOT_API_BASE_URL.rstrip('/')
+            builder = builder.base_url(f"{api_base_url}/bot").base_file_url(f"{api_base_url}/file/bot")
         application = (
-            Application.builder()
-            .token(config.TOKEN)
-            .post_init(post_init) # post_init now also ensures authorized_ids is in bot_data
+            builder
+            .post_init(post_init) # Also loads the authorized users
+            .post_stop(post_stop)
+            .post_shutdown(post_shutdown)
             .persistence(persistence)
+            .request(PooledRequest()) # Separate connection pools for control calls and file transfers
+            .rate_limiter(TelegramRateLimiter()) # Global/per-chat limits, flood-wait retries
+            .concurrent_updates(PerUserUpdateProcessor()) # Parallel across users, ordered per user
             .build()
         )
         logger.info("Application built successfully.")
@@ -140,13 +169,21 @@ def main() -> None:
 
     logger.info("Registering handlers...")
     try:
-        application.add_handler(CommandHandler("start", start_command))
-        application.add_handler(CommandHandler("help", help_command))
-        application.add_handler(CommandHandler("cancel", cancel_command))
-        application.add_handler(CallbackQueryHandler(main_callback_handler))
+        application.add_handler(TypeHandler(Update, session_manager.restore), group=-1) # Before all other handlers
+        # Each handler records handler_seconds / handler_errors / handler_in_flight (see utils.metrics.track)
+        application.add_handler(CommandHandler("start", metrics.track("handler", handler="start")(start_command)))
+        application.add_handler(CommandHandler("help", metrics.track("handler", handler="help")(help_command)))
+        application.add_handler(CommandHandler("cancel", metrics.track("handler", handler="cancel")(cancel_command)))
+        application.add_handler(CommandHandler("stats", metrics.track("handler", handler="stats")(stats_command))) # Admin only, not in the command list
+        application.add_handler(CommandHandler("profile", metrics.track("handler", handler="profile")(profile_command))) # Admin only
+        application.add_handler(CallbackQueryHandler(metrics.track("handler", handler="callback")(main_callback_handler)))
         application.add_handler(MessageHandler(
             filters.TEXT & ~filters.COMMAND & filters.ChatType.PRIVATE,
-            handle_text_search
+            metrics.track("handler", handler="search")(handle_text_search)
+        ))
+        application.add_handler(MessageHandler(
+            filters.Document.ALL & filters.ChatType.PRIVATE,
+            metrics.track("handler", handler="upload")(handle_document_upload)
         ))
         application.add_error_handler(error_handler)
         logger.info("Handler registration SUCCESS.")
@@ -154,21 +191,24 @@ def main() -> None:
         logger.critical(f"FATAL: Failed to register handlers: {e}", exc_info=True)
         sys.exit(1)
 
-    logger.info("Initialization complete. Starting bot polling...")
+    logger.info(f"Initialization complete. Starting bot ({config.BOT_MODE})...")
     try:
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
-        logger.info("Bot polling finished gracefully.")
+        if config.BOT_MODE == "webhook":
+            run_webhook(application)
+            logger.info("Bot webhook server finished gracefully.")
+        else:
+            application.run_polling(allowed_updates=Update.ALL_TYPES)
+            logger.info("Bot polling finished gracefully.")
     except KeyboardInterrupt:
         logger.info("Shutdown: KeyboardInterrupt detected. Stopping bot...")
     except Exception as e:
-        logger.critical(f"FATAL: An unexpected error occurred during polling: {e}", exc_info=True)
+        logger.critical(f"FATAL: An unexpected error occurred while running the bot: {e}", exc_info=True)
     finally:
         logger.info("Bot process finishing.")
 
 
 if __name__ == '__main__':
     # Initial check/creation of the primary .json file for authorized users
-    # This file can act as an initial seed if the .pickle file for PTB persistence doesn't exist.
     auth_json_file_path = Path(config.AUTHORIZED_USERS_FILE)
     if not auth_json_file_path.exists():
         try:
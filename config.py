@@ -17,6 +17,7 @@ logger = logging.getLogger(__name__)
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 ADMIN_USER_ID_STR = os.getenv("ADMIN_USER_ID")
 BOT_IMAGE_URL = os.getenv("BOT_IMAGE_URL", "https://i.postimg.cc/SRKg918j/filesharing-plesk-t.jpg")
+BOT_IMAGE_PATH = os.getenv("BOT_IMAGE_PATH") # Optional local banner image, used instead of BOT_IMAGE_URL
 
 
 if not TOKEN:
@@ -33,6 +34,23 @@ except ValueError:
     logger.critical(f"Eʀʀᴏʀ: Iɴᴠᴀʟɪᴅ AUTHORIZED_USER_ID '{ADMIN_USER_ID_STR}'. Mᴜsᴛ ʙᴇ ᴀɴ ɪɴᴛᴇɢᴇʀ.")
     sys.exit(1)
 
+# --- Update Delivery (polling / webhook) ---
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower() # "polling" (default) or "webhook"
+WEBHOOK_URL = os.getenv("WEBHOOK_URL") # Public HTTPS URL Telegram posts updates to
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1") # Address of the built-in HTTP server
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram-webhook") # Path the reverse proxy forwards to
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN") # Random per start if unset
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL") # e.g. a local Bot API server; default is api.telegram.org
+
+if BOT_MODE not in ("polling", "webhook"):
+    logger.critical(f"Eʀʀᴏʀ: Iɴᴠᴀʟɪᴅ BOT_MODE '{BOT_MODE}'. Usᴇ 'polling' ᴏʀ 'webhook'.")
+    sys.exit(1)
+
+if BOT_MODE == "webhook" and not WEBHOOK_URL:
+    logger.critical("Eʀʀᴏʀ: BOT_MODE=webhook ʀᴇǫᴜɪʀᴇs WEBHOOK_URL.")
+    sys.exit(1)
+
 # --- Filesystem Configuration ---
 _start_dir_env = os.getenv("START_DIRECTORY")
 if _start_dir_env:
@@ -59,26 +77,141 @@ MAX_FILENAME_DISPLAY_LENGTH = 28
 ITEMS_PER_PAGE = 24
 MAX_CALLBACK_DATA_LENGTH = 64
 SEARCH_RESULTS_LIMIT = 100
-MIN_CALLBACK_INTERVAL = 0.8 # Seconds
+CALLBACK_COALESCE_WINDOW = float(os.getenv("CALLBACK_COALESCE_WINDOW", "0.3")) # Seconds; taps closer together are coalesced into one render
+CALLBACK_ANSWER_DEADLINE = float(os.getenv("CALLBACK_ANSWER_DEADLINE", "1.0")) # Seconds before an unanswered button press is acknowledged empty
 LOG_FILE_NAME = "bot_activity.log"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower() # "text" or "json" (one JSON object per line)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))) # Log file size that triggers a rotation
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5")) # Rotated files kept (bot_activity.log.1, .2, ...)
+LOG_QUEUE_SIZE = 10000 # Records waiting for the writer thread; more are dropped rather than blocking
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "handlers.common_handlers=10,handlers.callback_handlers.clicks=10") # logger=N keeps 1 in N INFO records
 AUTHORIZED_USERS_FILE = "authorized_users.json"
+PERSISTENCE_FILE = os.getenv("PERSISTENCE_FILE", "bot_state.sqlite3") # SQLite database (WAL mode) for bot_data and caches
+PERSISTENCE_UPDATE_INTERVAL = float(os.getenv("PERSISTENCE_UPDATE_INTERVAL", "60")) # Seconds between writes of changed rows
+PERSISTENCE_BATCH_SIZE = 500 # Rows written per transaction
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(7 * 24 * 3600))) # Seconds of inactivity after which a user's browsing session is forgotten
+SESSION_EVICT_INTERVAL = 3600 # Seconds between deletions of expired sessions from the database
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "900")) # Seconds of inactivity after which a user's cached item lists are dropped
+SESSION_MEMORY_BUDGET = int(os.getenv("SESSION_MEMORY_BUDGET", str(64 * 1024 * 1024))) # Bytes all sessions may use before the least recently active lose their cached lists
+SESSION_SWEEP_INTERVAL = 60 # Seconds between session memory checks
+MESSAGE_STATE_MAX_ENTRIES = 1000 # Messages whose last caption/keyboard hashes are remembered for minimal edits
+UPDATE_MAX_CONCURRENT = int(os.getenv("UPDATE_MAX_CONCURRENT", "16")) # Updates processed in parallel (same-user updates stay sequential)
+
+# --- File Transfer Retries ---
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3")) # Extra attempts after the first one
+SEND_RETRY_BASE_DELAY = float(os.getenv("SEND_RETRY_BASE_DELAY", "1.5")) # Seconds, doubled on each retry
+SEND_RETRY_MAX_DELAY = 30.0 # Seconds, upper bound for a single backoff sleep
+FILE_ID_CACHE_MAX_ENTRIES = 500 # Uploaded file_ids remembered for re-sending without re-upload
+
+# --- Multi-Select & Batched Sending ---
+MAX_SELECTED_FILES = 50
+MEDIA_GROUP_MAX_SIZE = 10 # Telegram limit for sendMediaGroup
+MAX_PHOTO_UPLOAD_SIZE = 10 * 1024 * 1024 # Larger images are sent as documents
+TRANSFER_MAX_CONCURRENT = int(os.getenv("TRANSFER_MAX_CONCURRENT", "2")) # Uploads in flight at once
+
+# --- HTTP Connection Pools ---
+CONTROL_POOL_SIZE = int(os.getenv("CONTROL_POOL_SIZE", "8")) # Connections for answers, edits, messages
+CONTROL_READ_TIMEOUT = 10.0 # Seconds
+CONTROL_POOL_TIMEOUT = 3.0 # Seconds a control call may wait for a free connection
+MEDIA_POOL_SIZE = int(os.getenv("MEDIA_POOL_SIZE", "4")) # Connections for uploads/downloads; keep >= TRANSFER_MAX_CONCURRENT
+MEDIA_READ_TIMEOUT = 180.0 # Seconds
+MEDIA_POOL_TIMEOUT = 180.0
+
+# --- Outgoing API Rate Limits ---
+RATE_LIMIT_GLOBAL_PER_SECOND = float(os.getenv("RATE_LIMIT_GLOBAL_PER_SECOND", "30")) # Telegram: ~30 calls/s per bot
+RATE_LIMIT_PRIVATE_CHAT_PER_SECOND = float(os.getenv("RATE_LIMIT_PRIVATE_CHAT_PER_SECOND", "1")) # Sustained calls/s in one private chat
+RATE_LIMIT_GROUP_PER_MINUTE = 20.0 # Telegram: 20 messages/min in a group
+RATE_LIMIT_CHAT_BURST = 4 # Calls a chat may burst before its rate applies
+RATE_LIMIT_BULK_RESERVE = 5 # Global tokens uploads leave for interactive calls
+RATE_LIMIT_MAX_RETRIES = 3 # RetryAfter responses absorbed before the error reaches the caller
+
+# --- Metrics ---
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) # Port of the Prometheus /metrics endpoint; 0 disables it
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1") # Keep it on localhost unless the scraper runs elsewhere
+
+# --- Error Reports ---
+ERROR_TRACKER_SIZE = 256 # Distinct error fingerprints counted (LRU)
+ERROR_DEDUP_WINDOW = int(os.getenv("ERROR_DEDUP_WINDOW", "600")) # Seconds in which a repeated error is logged without traceback and not shown to the user again
+ERROR_REPORT_INTERVAL = int(os.getenv("ERROR_REPORT_INTERVAL", "3600")) # Seconds between the admin's top-errors reports; 0 disables them
+ERROR_REPORT_TOP_N = 5 # Errors listed per report
+
+# --- Event Loop Watchdog ---
+LOOP_LAG_INTERVAL = 0.1 # Seconds between lag measurements
+LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.25")) # Seconds of lag reported as a blocked loop, with the blocking stack
+LOOP_BLOCK_EVENTS_KEPT = 20 # Recent blocks kept for /stats
+
+# --- Profiling (/profile, SIGUSR1) ---
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles") # Where raw .pstats / .collapsed captures are kept
+PROFILE_MAX_SECONDS = 300 # Longest capture /profile accepts
+PROFILE_SIGNAL_SECONDS = int(os.getenv("PROFILE_SIGNAL_SECONDS", "30")) # Length of a capture started by SIGUSR1
+PROFILE_SAMPLE_INTERVAL = 0.005 # Seconds between stack samples in "sample" mode
+PROFILE_TOP_N = 30 # Functions listed in the summary sent to the admin
+
+# --- Unauthorized Access Alerts ---
+UNAUTH_REPLIES_PER_HOUR = float(os.getenv("UNAUTH_REPLIES_PER_HOUR", "6")) # "Access denied" replies one sender gets per hour (0 = never reply)
+UNAUTH_REPLY_BURST = 2 # Replies a sender may get in a row before the hourly rate applies
+UNAUTH_SILENCE_AFTER = int(os.getenv("UNAUTH_SILENCE_AFTER", "20")) # Attempts after which a sender gets no reply at all
+UNAUTH_ADMIN_ALERTS_PER_HOUR = int(os.getenv("UNAUTH_ADMIN_ALERTS_PER_HOUR", "10")) # Immediate alerts for new senders; the rest waits for the summary (0 = summary only)
+UNAUTH_DIGEST_INTERVAL = int(os.getenv("UNAUTH_DIGEST_INTERVAL", "600")) # Seconds between admin summaries of repeated attempts
+UNAUTH_DIGEST_MAX_USERS = 10 # Senders listed (with buttons) in one summary
+UNAUTH_TRACKED_SENDERS = 1024 # Senders remembered (LRU)
+UNAUTH_FORGET_AFTER = 24 * 3600 # Seconds of silence after which a sender is forgotten
+
+# --- Text Preview ---
+PREVIEW_LINES_PER_PAGE = int(os.getenv("PREVIEW_LINES_PER_PAGE", "30"))
+PREVIEW_MAX_LINE_LENGTH = 200 # Longer lines are cut in the preview
+PREVIEW_MAX_CHARS = 3500 # Keeps the preview message under Telegram's 4096 character limit
+LINE_INDEX_CACHE_MAX_FILES = 8 # Line indexes kept in memory (LRU)
+
+# --- Live Follow (tail -F) ---
+FOLLOW_LINES = 20 # Lines shown in the follow message
+FOLLOW_EDIT_INTERVAL = float(os.getenv("FOLLOW_EDIT_INTERVAL", "3")) # Min seconds between edits of the follow message
+FOLLOW_TIMEOUT = int(os.getenv("FOLLOW_TIMEOUT", "600")) # Seconds before following stops by itself
+FOLLOW_POLL_INTERVAL = 2.0 # Seconds, used only where inotify is unavailable
+FOLLOW_MAX_READ_BYTES = 256 * 1024 # Max bytes read per wake-up (older bursts are skipped)
+FOLLOW_RATE_LIMIT_RETRIES = 2 # Flood waits sat out per follow edit before that edit is skipped (none on shutdown)
+
+# --- Uploads (files sent to the bot) ---
+UPLOADS_ENABLED = os.getenv("UPLOADS_ENABLED", "true").lower() in ("1", "true", "yes") # Store documents sent to the bot
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(20 * 1024 * 1024))) # Bytes; 20 MB is the cloud Bot API download limit
+UPLOAD_CHUNK_SIZE = 1024 * 1024 # Bytes written per chunk while streaming to disk
+UPLOAD_BACKGROUND_THRESHOLD = 2 * 1024 * 1024 # Larger uploads run through the transfer scheduler
 
 
 # --- Callback Data Prefixes ---
+# Each prefix is a 2-character opcode (utils.callback_router.OPCODE_WIDTH); the payload follows it directly.
 CB_PREFIX_NAV_DIR = "d:"
 CB_PREFIX_NAV_FILE = "f:"
 CB_PREFIX_NAV_PAGE = "p:"
 CB_PREFIX_NAV_PARENT = "up"
 CB_PREFIX_NAV_ROOT = "rt"
 # CB_PREFIX_SRCH_START = "s_go" # No longer needed, search is automatic
-CB_PREFIX_SRCH_BACK = "s_bk"
-CB_PREFIX_SRCH_DIR = "sd:"
-CB_PREFIX_SRCH_FILE = "sf:"
+CB_PREFIX_SRCH_BACK = "sb"
+CB_PREFIX_SRCH_DIR = "sd"
+CB_PREFIX_SRCH_FILE = "sf"
 # CB_PREFIX_SRCH_CANCEL = "s_cl" # Cancel is a command /cancel
-CB_PREFIX_NOOP = "noop"
-CB_PREFIX_ACCEPT_USER = "au:"
-CB_PREFIX_REJECT_USER = "ru:"
-CB_PREFIX_DISMISS_ADMIN_MSG = "adm_d:"
+CB_PREFIX_NOOP = "no"
+CB_PREFIX_ACCEPT_USER = "au"
+CB_PREFIX_REJECT_USER = "ru"
+CB_PREFIX_DISMISS_ADMIN_MSG = "ad"
+CB_PREFIX_SELECT_MODE = "sm" # Toggle multi-select mode
+CB_PREFIX_SELECT_ITEM = "si" # Tick/untick a file in multi-select mode
+CB_PREFIX_SEND_SELECTED = "ss"
+CB_PREFIX_CLEAR_SELECTION = "sx"
+CB_PREFIX_PREVIEW_MODE = "pm" # Toggle preview mode
+CB_PREFIX_PREVIEW_ITEM = "pi" # Open a preview of a file from the folder view
+CB_PREFIX_PREVIEW_PAGE = "pv" # Show a page of an open preview: start line, or "t" for tail
+CB_PREFIX_PREVIEW_CLOSE = "pc"
+CB_PREFIX_FOLLOW_MODE = "fm" # Toggle follow mode
+CB_PREFIX_FOLLOW_ITEM = "fi" # Start following a file from the folder view
+CB_PREFIX_FOLLOW_STOP = "fx" # Stop the live follow of this message
+# Prefixes used before the 2-character opcodes, still accepted for buttons sent before the upgrade
+# (pending access requests in the admin's chat above all)
+CB_LEGACY_PREFIXES = {
+    "s_bk": CB_PREFIX_SRCH_BACK, "sd:": CB_PREFIX_SRCH_DIR, "sf:": CB_PREFIX_SRCH_FILE, "noop": CB_PREFIX_NOOP,
+    "au:": CB_PREFIX_ACCEPT_USER, "ru:": CB_PREFIX_REJECT_USER, "adm_d:": CB_PREFIX_DISMISS_ADMIN_MSG,
+    "si:": CB_PREFIX_SELECT_ITEM, "pi:": CB_PREFIX_PREVIEW_ITEM, "pv:": CB_PREFIX_PREVIEW_PAGE, "fi:": CB_PREFIX_FOLLOW_ITEM,
+}
 
 
 # --- Conversation States for Search (No longer used as search is not a conversation) ---
@@ -88,10 +221,25 @@ CB_PREFIX_DISMISS_ADMIN_MSG = "adm_d:"
 UD_KEY_CURRENT_PATH = "current_path"
 UD_KEY_CURRENT_PAGE = "current_page"
 UD_KEY_VIEW_ITEMS = "view_items" # Items currently displayed in folder view
+UD_KEY_VIEW_SIGNATURE = "view_signature" # Folder mtime (ns) when the displayed items were listed
 UD_KEY_SEARCH_RESULTS = "search_results" # Results from the last automatic text search
 UD_KEY_SEARCH_BASE_PATH = "search_base_path" # Path from which the last search was initiated
-UD_KEY_LAST_CB_TIME = "last_cb_time"
+UD_KEY_LAST_CALLBACK = "last_callback" # (callback data, monotonic time) of the user's previous tap
+UD_KEY_TOTAL_PAGES = "total_pages" # Page count of the folder currently shown
 UD_KEY_CURRENT_MESSAGE_ID = "current_message_id" # To edit messages with photo
+UD_KEY_CLICK_MODE = "click_mode" # What tapping a file does (see CLICK_MODE_*)
+UD_KEY_SELECTED_FILES = "selected_files" # Paths ticked in multi-select mode (kept across pages/folders)
+UD_KEY_PREVIEW_PATHS = "preview_paths" # Preview message_id -> previewed file path
+
+# --- Click Modes ---
+CLICK_MODE_DOWNLOAD = "download" # Default: tapping a file sends it
+CLICK_MODE_SELECT = "select" # Tapping a file ticks it for a batched send
+CLICK_MODE_PREVIEW = "preview" # Tapping a file shows its text inline
+CLICK_MODE_FOLLOW = "follow" # Tapping a file streams its new lines into one message
+
+# --- Bot Data Keys ---
+BD_KEY_FILE_ID_CACHE = "file_id_cache" # path -> {size, mtime_ns, file_id} of already uploaded files
+BD_KEY_BANNER_FILE_ID = "banner_file_id" # {source, file_id} of the uploaded banner photo
 
 # Made by: Zaky1million 😊♥️
 # For contact or project requests: https://t.me/Zaky1million
@@ -2,11 +2,12 @@
 # This file makes Python treat the 'handlers' directory as a package.
 
 # Import handlers to make them accessible via the package
-from .command_handlers import start_command, help_command, cancel_command
+from .command_handlers import start_command, help_command, cancel_command, stats_command, profile_command
 from .callback_handlers import main_callback_handler # <--- السطر ده اللي كان عامل المشكلة
 from .message_handlers import handle_text_search, handle_unauthorized_catch_all
+from .upload_handlers import handle_document_upload
 from .error_handlers import error_handler
-from .common_handlers import display_folder_content
+from .common_handlers import display_folder_content, refresh_current_folder
 
 
 # Made by: Zaky1million 😊♥️
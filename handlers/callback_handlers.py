@@ -2,71 +2,57 @@
 """
 Handlers for callback queries (button presses).
 """
+import asyncio
 import logging
 import time
 import os
-import html as pyhtml
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import List, Tuple
 
-from telegram import Update, constants, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, CallbackQuery, constants, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from telegram.error import BadRequest, TimedOut, NetworkError, Forbidden
+from telegram.error import BadRequest, TimedOut, NetworkError, Forbidden, RetryAfter
 
 from config import (
-    START_DIRECTORY_PATH, MIN_CALLBACK_INTERVAL, BOT_IMAGE_URL,
+    START_DIRECTORY_PATH, CALLBACK_COALESCE_WINDOW,
     CB_PREFIX_NAV_DIR, CB_PREFIX_NAV_FILE, CB_PREFIX_NAV_PAGE, CB_PREFIX_NAV_PARENT,
     CB_PREFIX_NAV_ROOT, CB_PREFIX_SRCH_BACK, CB_PREFIX_SRCH_DIR,
     CB_PREFIX_SRCH_FILE, CB_PREFIX_NOOP, CB_PREFIX_ACCEPT_USER, CB_PREFIX_REJECT_USER,
-    CB_PREFIX_DISMISS_ADMIN_MSG,
-    UD_KEY_VIEW_ITEMS, UD_KEY_SEARCH_RESULTS, UD_KEY_CURRENT_PATH, UD_KEY_CURRENT_PAGE,
-    UD_KEY_LAST_CB_TIME, UD_KEY_SEARCH_BASE_PATH, UD_KEY_CURRENT_MESSAGE_ID, ADMIN_USER_ID
+    CB_PREFIX_DISMISS_ADMIN_MSG, CB_PREFIX_SELECT_MODE, CB_PREFIX_SELECT_ITEM,
+    CB_PREFIX_SEND_SELECTED, CB_PREFIX_CLEAR_SELECTION, MAX_SELECTED_FILES,
+    CB_PREFIX_PREVIEW_MODE, CB_PREFIX_PREVIEW_ITEM, CB_PREFIX_PREVIEW_PAGE, CB_PREFIX_PREVIEW_CLOSE,
+    CB_PREFIX_FOLLOW_MODE, CB_PREFIX_FOLLOW_ITEM, CB_PREFIX_FOLLOW_STOP,
+    UD_KEY_CLICK_MODE, UD_KEY_SELECTED_FILES, CLICK_MODE_DOWNLOAD, CLICK_MODE_SELECT,
+    UD_KEY_VIEW_ITEMS, UD_KEY_SEARCH_RESULTS, UD_KEY_CURRENT_PAGE,
+    UD_KEY_LAST_CALLBACK, UD_KEY_TOTAL_PAGES, UD_KEY_SEARCH_BASE_PATH, UD_KEY_CURRENT_MESSAGE_ID, ADMIN_USER_ID,
+    CB_LEGACY_PREFIXES
 )
 import localization as loc
-from utils.auth_utils import is_authorized, add_authorized_user # <<<--- مصدر is_authorized الصحيح
+from utils.auth_utils import is_authorized, add_authorized_user, auth_service # <<<--- مصدر is_authorized الصحيح
 from utils.helpers import (
     # is_authorized removed from here
     get_safe_path, set_safe_path, get_item_from_context, escape_html,
-    create_callback_data, send_or_edit_photo_message, handle_unauthorized_access
+    create_callback_data, handle_unauthorized_access, send_with_banner
 )
-from .common_handlers import display_folder_content
+from utils.transfer_utils import (
+    send_document_with_retry, send_media_group_with_retry, build_media_batches, transfer_scheduler
+)
+from utils.callback_ack import answer_query, answer_deadline, defer, render_coalescer
+from utils.access_guard import unauthorized_guard
+from utils.callback_router import CallbackRouter, InvalidPayload, index_payload, step_payload, text_payload, AUTH_ADMIN, OPCODE_WIDTH
+from utils import metrics
+from .common_handlers import display_folder_content, refresh_current_folder
+from .preview_handlers import (
+    handle_preview_mode_toggle, handle_preview_item, handle_preview_page, handle_preview_close
+)
+from .follow_handlers import handle_follow_mode_toggle, handle_follow_item, handle_follow_stop
 
 logger = logging.getLogger(__name__)
+click_logger = logging.getLogger(f"{__name__}.clicks") # One INFO line per button press; sampled (LOG_SAMPLING)
 
-# ... (باقي الكود بتاع الملف ده كما هو من المرة السابقة، ما عدا تعديل الـ import فوق) ...
-# والتعديل جوه main_callback_handler لاستخدام is_authorized مباشرة:
-
-async def main_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
-    if not query or not query.data:
-        logger.warning("CallbackQuery received without data attribute.")
-        return
-    
-    user_who_clicked = query.from_user
-    
-    is_admin_specific_cb = query.data.startswith(CB_PREFIX_ACCEPT_USER) or \
-                           query.data.startswith(CB_PREFIX_REJECT_USER) or \
-                           query.data.startswith(CB_PREFIX_DISMISS_ADMIN_MSG)
-
-    # Use the directly imported 'is_authorized' from auth_utils
-    user_is_authorized_for_bot = await is_authorized(update, context)
-
-    if not user_is_authorized_for_bot:
-        # Allow admin to press admin-specific buttons even if not in dynamic list (should be caught by user_is_authorized_for_bot if ADMIN_USER_ID matches)
-        # This check is more about a non-admin, non-authorized user trying admin buttons.
-        # The primary authorization handles "is this user allowed to use the bot AT ALL".
-        # The secondary check here is "is THIS specific admin action allowed for THIS user" (which is stricter for admin buttons).
-        if is_admin_specific_cb and user_who_clicked.id != ADMIN_USER_ID:
-             await query.answer("Tʜɪs ᴀᴄᴛɪᴏɴ ɪs ғᴏʀ Aᴅᴍɪɴs ᴏɴʟʏ.", show_alert=True)
-             return
-        elif not is_admin_specific_cb: # Any other button by a non-authorized user
-             await handle_unauthorized_access(update, context)
-             try: await query.answer(loc.ACCESS_DENIED, show_alert=True)
-             except BadRequest: pass
-             return
-    
-    # ... (باقي دالة main_callback_handler)
-# --- File Sending Logic --- (كاملة كما في الردود السابقة)
+# --- File Sending Logic ---
+@metrics.track("handler", handler="send_file")
 async def send_file_safe(context: ContextTypes.DEFAULT_TYPE, chat_id: int, file_path: Path):
     try:
         if not file_path.is_file():
@@ -93,11 +79,7 @@ async def send_file_safe(context: ContextTypes.DEFAULT_TYPE, chat_id: int, file_
         await context.bot.send_chat_action(chat_id=chat_id, action=constants.ChatAction.UPLOAD_DOCUMENT)
         logger.info(f"Sending file {file_path} to chat {chat_id}")
 
-        with open(file_path, 'rb') as file_to_send:
-            await context.bot.send_document(
-                chat_id=chat_id, document=file_to_send, filename=file_name,
-                read_timeout=180, write_timeout=180, connect_timeout=60, pool_timeout=180,
-            )
+        await send_document_with_retry(context, chat_id, file_path, file_name)
         logger.info(f"Successfully sent file {file_path} to chat {chat_id}")
 
     except FileNotFoundError:
@@ -109,10 +91,7 @@ async def send_file_safe(context: ContextTypes.DEFAULT_TYPE, chat_id: int, file_
             chat_id=chat_id, text=f"{loc.ERROR_SEND_PERMISSION}\n<code>{escape_html(str(file_path))}</code>",
             parse_mode=constants.ParseMode.HTML
         )
-    except (TimedOut, NetworkError) as e:
-        logger.error(f"Network/Timeout sending file: {e}")
-        await context.bot.send_message(chat_id=chat_id, text=loc.ERROR_SEND_NETWORK, parse_mode=constants.ParseMode.HTML)
-    except BadRequest as e:
+    except BadRequest as e: # Must come before NetworkError, which it subclasses
         error_message_lower = str(e).lower()
         if "file is too big" in error_message_lower or "request entity too large" in e.message.lower():
             logger.error(f"File too large: {file_path}")
@@ -124,6 +103,9 @@ async def send_file_safe(context: ContextTypes.DEFAULT_TYPE, chat_id: int, file_
                 text=f"{loc.ERROR_SEND_TG_BADREQUEST}<code>{escaped_file_name_html}</code>\n<code>{escape_html(e.message)}</code>",
                 parse_mode=constants.ParseMode.HTML
             )
+    except (TimedOut, NetworkError, RetryAfter) as e:
+        logger.error(f"Network/Timeout sending file (retries used up, or the upload may have gone through): {e}")
+        await context.bot.send_message(chat_id=chat_id, text=loc.ERROR_SEND_NETWORK, parse_mode=constants.ParseMode.HTML)
     except Forbidden as e_forbidden:
          logger.error(f"Forbidden error sending file to {chat_id}: {e_forbidden}. Bot blocked or no permission?")
     except Exception as e:
@@ -141,28 +123,74 @@ async def send_file_safe(context: ContextTypes.DEFAULT_TYPE, chat_id: int, file_
             except Exception as del_e:
                 logger.warning(f"Could not delete file sending status message: {del_e}")
 
-# --- Callback Handler Helpers --- (كاملة كما في الردود السابقة)
-async def handle_item_click(update: Update, context: ContextTypes.DEFAULT_TYPE, prefix: str, index_str: str):
-    query = update.callback_query
-    chat_id = update.effective_chat.id
+async def send_selected_files(context: ContextTypes.DEFAULT_TYPE, chat_id: int, file_paths: List[Path]):
+    """
+    Sends several files as media groups of up to MEDIA_GROUP_MAX_SIZE.
+    Batches are handed to the transfer scheduler so they upload in parallel
+    (bounded by TRANSFER_MAX_CONCURRENT); a summary is sent at the end.
+    """
+    batches = build_media_batches(file_paths)
+    status_message_obj = None
+    try:
+        status_message_obj = await context.bot.send_message(
+            chat_id=chat_id,
+            text=loc.SENDING_SELECTED_FILES.format(count=len(file_paths), batches=len(batches)),
+            parse_mode=constants.ParseMode.HTML, disable_notification=True
+        )
+        await context.bot.send_chat_action(chat_id=chat_id, action=constants.ChatAction.UPLOAD_DOCUMENT)
+    except Exception as e:
+        logger.warning(f"Could not send batch sending status message: {e}")
 
+    async def send_batch(batch: List[Tuple[Path, str]]) -> bool:
+        try:
+            await send_media_group_with_retry(context, chat_id, batch)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send batch of {len(batch)} file(s) to chat {chat_id}: {e}")
+            return False
+
+    logger.info(f"Sending {len(file_paths)} selected file(s) to chat {chat_id} in {len(batches)} batch(es)")
+    batch_results = await asyncio.gather(*[
+        transfer_scheduler.submit(context.application, send_batch(batch)) for batch in batches
+    ])
+
+    sent_count = 0
+    failed_names: List[str] = []
+    for batch, batch_ok in zip(batches, batch_results):
+        if batch_ok:
+            sent_count += len(batch)
+        else:
+            failed_names.extend(file_path.name for file_path, _ in batch)
+
+    if status_message_obj:
+        try:
+            await context.bot.delete_message(chat_id=chat_id, message_id=status_message_obj.message_id)
+        except Exception as del_e:
+            logger.warning(f"Could not delete batch sending status message: {del_e}")
+
+    summary_text = loc.SEND_SELECTED_SUMMARY.format(sent=sent_count, count=len(file_paths))
+    if failed_names:
+        summary_text += f"\n{loc.SEND_SELECTED_FAILED}\n" + "\n".join(f"<code>{escape_html(name)}</code>" for name in failed_names)
     try:
-        item_index = int(index_str)
-    except ValueError:
-        logger.error(f"Invalid item index: {prefix}{index_str}")
-        await query.answer(loc.INVALID_INDEX_ERROR, show_alert=True)
-        return
+        await context.bot.send_message(chat_id=chat_id, text=summary_text, parse_mode=constants.ParseMode.HTML)
+    except Exception as e:
+        logger.warning(f"Could not send batch sending summary: {e}")
+
+# --- Callback Route Handlers ---
+async def handle_item_click(update: Update, context: ContextTypes.DEFAULT_TYPE, item_index: int, prefix: str):
+    query = update.callback_query
+    chat_id = update.effective_chat.id
 
     item = get_item_from_context(context, UD_KEY_VIEW_ITEMS, item_index)
     if not item:
-        logger.warning(f"Item not found at index {item_index} for CB {prefix}{index_str}")
-        await query.answer(loc.STALE_DATA_ERROR, show_alert=True)
+        logger.warning(f"Item not found at index {item_index} for CB {prefix}{item_index}")
+        await answer_query(query, loc.STALE_DATA_ERROR, show_alert=True)
         return
 
     target_path_str = item.get("path")
     if not target_path_str:
         logger.error(f"Item {item_index} has no path attribute.")
-        await query.answer(loc.ERROR_ITEM_PATH_MISSING, show_alert=True)
+        await answer_query(query, loc.ERROR_ITEM_PATH_MISSING, show_alert=True)
         return
     
     try:
@@ -170,17 +198,17 @@ async def handle_item_click(update: Update, context: ContextTypes.DEFAULT_TYPE,
         if not (target_path == START_DIRECTORY_PATH or \
                 str(target_path).startswith(str(START_DIRECTORY_PATH) + os.sep)):
             logger.error(f"SECURITY: Item path '{target_path_str}' (resolves to '{target_path}') is outside allowed root.")
-            await query.answer(loc.ERROR_PERMISSION_DENIED.splitlines()[0], show_alert=True)
+            await answer_query(query, loc.ERROR_PERMISSION_DENIED.splitlines()[0], show_alert=True)
             return
         
         if item.get("is_symlink") and not target_path.exists():
             logger.warning(f"Symlink target does not exist: {target_path_str}")
-            await query.answer("🔗 Eʀʀᴏʀ: Lɪɴᴋᴇᴅ ɪᴛᴇᴍ ɴᴏᴛ ғᴏᴜɴᴅ.", show_alert=True)
+            await answer_query(query, "🔗 Eʀʀᴏʀ: Lɪɴᴋᴇᴅ ɪᴛᴇᴍ ɴᴏᴛ ғᴏᴜɴᴅ.", show_alert=True)
             return
 
     except Exception as path_err:
         logger.error(f"Error resolving path for item {item_index} ('{target_path_str}'): {path_err}")
-        await query.answer(loc.ERROR_ITEM_PATH_MISSING, show_alert=True)
+        await answer_query(query, loc.ERROR_ITEM_PATH_MISSING, show_alert=True)
         return
 
     item_name = item.get('name', 'Unknown')
@@ -189,50 +217,58 @@ async def handle_item_click(update: Update, context: ContextTypes.DEFAULT_TYPE,
     if prefix == CB_PREFIX_NAV_DIR:
         if not item.get('is_dir', False):
             logger.warning(f"Not a directory: {target_path_str} (Item marked as is_dir: {item.get('is_dir')})")
-            await query.answer(loc.ERROR_NOT_A_FOLDER, show_alert=True)
+            await answer_query(query, loc.ERROR_NOT_A_FOLDER, show_alert=True)
             return
-        await query.answer(loc.BUTTON_OPENING_FOLDER.format(name=escaped_item_name))
-        await display_folder_content(update, context, target_path, page=0, edit_message=True)
+        await answer_query(query, loc.BUTTON_OPENING_FOLDER.format(name=escaped_item_name))
+        render_coalescer.submit(update, context, lambda: display_folder_content(update, context, target_path, page=0, edit_message=True), page=0)
     elif prefix == CB_PREFIX_NAV_FILE:
         if not item.get('is_file', False):
             logger.warning(f"Not a file: {target_path_str} (Item marked as is_file: {item.get('is_file')})")
-            await query.answer(loc.ERROR_NOT_A_FILE, show_alert=True)
+            await answer_query(query, loc.ERROR_NOT_A_FILE, show_alert=True)
             return
-        await query.answer(loc.BUTTON_PREPARING_FILE.format(name=escaped_item_name))
-        await send_file_safe(context, chat_id, target_path)
-
-async def handle_pagination(update: Update, context: ContextTypes.DEFAULT_TYPE, page_str: str):
+        await answer_query(query, loc.BUTTON_PREPARING_FILE.format(name=escaped_item_name))
+        defer(update, context, send_file_safe(context, chat_id, target_path), serialize=False)
+
+async def handle_pagination(update: Update, context: ContextTypes.DEFAULT_TYPE, step: Tuple[bool, int]):
+    """
+    Page buttons carry a relative step, applied to the page a still-pending
+    render is heading to, so five quick taps on "next" land five pages on.
+    """
     query = update.callback_query
-    try:
-        page = int(page_str)
-        assert page >= 0
-    except (ValueError, AssertionError):
-        logger.error(f"Invalid page number: {page_str}")
-        await query.answer(loc.INVALID_INDEX_ERROR, show_alert=True)
-        return
-
-    await query.answer(loc.BUTTON_LOADING_PAGE.format(page=page + 1))
+    is_relative, value = step
+    page = value
+    if is_relative:
+        base_page = render_coalescer.pending_page(update.effective_user.id)
+        if base_page is None:
+            base_page = context.user_data.get(UD_KEY_CURRENT_PAGE, 0)
+        page = base_page + value
+    total_pages = context.user_data.get(UD_KEY_TOTAL_PAGES)
+    if total_pages:
+        page = min(page, total_pages - 1)
+    page = max(page, 0)
+
+    await answer_query(query, loc.BUTTON_LOADING_PAGE.format(page=page + 1))
     current_path = get_safe_path(context)
-    await display_folder_content(update, context, current_path, page=page, edit_message=True)
+    render_coalescer.submit(update, context, lambda: display_folder_content(update, context, current_path, page=page, edit_message=True), page=page)
 
 async def handle_parent_nav(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     current_path = get_safe_path(context)
 
     if current_path != START_DIRECTORY_PATH:
-        await query.answer(loc.BUTTON_GO_UP)
-        await display_folder_content(update, context, current_path.parent, page=0, edit_message=True)
+        await answer_query(query, loc.BUTTON_GO_UP)
+        render_coalescer.submit(update, context, lambda: display_folder_content(update, context, current_path.parent, page=0, edit_message=True), page=0)
     else:
-        await query.answer(loc.ALERT_ALREADY_ROOT, show_alert=True)
+        await answer_query(query, loc.ALERT_ALREADY_ROOT, show_alert=True)
 
 async def handle_root_nav(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer(loc.BUTTON_GO_ROOT)
-    await display_folder_content(update, context, START_DIRECTORY_PATH, page=0, edit_message=True)
+    await answer_query(query, loc.BUTTON_GO_ROOT)
+    render_coalescer.submit(update, context, lambda: display_folder_content(update, context, START_DIRECTORY_PATH, page=0, edit_message=True), page=0)
 
 async def handle_search_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer(loc.BUTTON_SEARCH_RETURN_BROWSER)
+    await answer_query(query, loc.BUTTON_SEARCH_RETURN_BROWSER)
     
     context.user_data.pop(UD_KEY_SEARCH_RESULTS, None)
     original_search_path_str = context.user_data.pop(UD_KEY_SEARCH_BASE_PATH, None)
@@ -247,23 +283,15 @@ async def handle_search_back(update: Update, context: ContextTypes.DEFAULT_TYPE)
             logger.warning(f"Could not resolve search base path '{original_search_path_str}', defaulting to root.")
     
     set_safe_path(context, target_path_for_display)
-    await display_folder_content(update, context, target_path_for_display, page=0, edit_message=False)
+    defer(update, context, display_folder_content(update, context, target_path_for_display, page=0, edit_message=False))
 
-async def handle_search_result_click(update: Update, context: ContextTypes.DEFAULT_TYPE, prefix: str, index_str: str):
+async def handle_search_result_click(update: Update, context: ContextTypes.DEFAULT_TYPE, result_index: int, prefix: str):
     query = update.callback_query
-    chat_id = update.effective_chat.id
-
-    try:
-        result_index = int(index_str)
-    except ValueError:
-        logger.error(f"Invalid search result index: {prefix}{index_str}")
-        await query.answer(loc.SEARCH_INVALID_INDEX_ERROR, show_alert=True)
-        return
 
     result_item = get_item_from_context(context, UD_KEY_SEARCH_RESULTS, result_index)
     if not result_item:
-        logger.warning(f"Search result {result_index} not found for CB {prefix}{index_str}")
-        await query.answer(loc.SEARCH_STALE_RESULTS_ERROR, show_alert=True)
+        logger.warning(f"Search result {result_index} not found for CB {prefix}{result_index}")
+        await answer_query(query, loc.SEARCH_STALE_RESULTS_ERROR, show_alert=True)
         if query.message:
             try: await query.delete_message()
             except Exception: pass
@@ -272,7 +300,7 @@ async def handle_search_result_click(update: Update, context: ContextTypes.DEFAU
     target_path_str = result_item.get("path")
     if not target_path_str:
         logger.error(f"Search result {result_index} has no path.")
-        await query.answer(loc.SEARCH_RESULT_PATH_MISSING_ERROR, show_alert=True)
+        await answer_query(query, loc.SEARCH_RESULT_PATH_MISSING_ERROR, show_alert=True)
         return
 
     try:
@@ -280,219 +308,304 @@ async def handle_search_result_click(update: Update, context: ContextTypes.DEFAU
         if not (target_path.resolve() == START_DIRECTORY_PATH or \
                 str(target_path.resolve()).startswith(str(START_DIRECTORY_PATH) + os.sep)):
              logger.error(f"SECURITY: Search result path '{target_path_str}' is outside allowed root.")
-             await query.answer(loc.ERROR_PERMISSION_DENIED.splitlines()[0], show_alert=True)
+             await answer_query(query, loc.ERROR_PERMISSION_DENIED.splitlines()[0], show_alert=True)
              return
         if result_item.get("is_symlink") and not target_path.exists():
             logger.warning(f"Search result symlink target does not exist: {target_path_str}")
-            await query.answer("🔗 Eʀʀᴏʀ: Lɪɴᴋᴇᴅ ɪᴛᴇᴍ ɴᴏᴛ ғᴏᴜɴᴅ.", show_alert=True)
+            await answer_query(query, "🔗 Eʀʀᴏʀ: Lɪɴᴋᴇᴅ ɪᴛᴇᴍ ɴᴏᴛ ғᴏᴜɴᴅ.", show_alert=True)
             return
             
     except Exception as path_err:
         logger.error(f"Error resolving path for search result {result_index} ('{target_path_str}'): {path_err}")
-        await query.answer(loc.SEARCH_RESULT_PATH_MISSING_ERROR, show_alert=True)
+        await answer_query(query, loc.SEARCH_RESULT_PATH_MISSING_ERROR, show_alert=True)
         return
 
     item_name = result_item.get('name', 'Unknown')
     escaped_item_name = escape_html(item_name)
 
+    if prefix == CB_PREFIX_SRCH_DIR:
+        if not result_item.get('is_dir'):
+            logger.warning(f"Search result not a directory: {target_path_str}")
+            await answer_query(query, loc.SEARCH_RESULT_NOT_FOLDER, show_alert=True)
+            return
+        await answer_query(query, loc.SEARCH_OPENING_RESULT.format(name=escaped_item_name))
+    elif prefix == CB_PREFIX_SRCH_FILE:
+        if not result_item.get('is_file'):
+            logger.warning(f"Search result not a file: {target_path_str}")
+            await answer_query(query, loc.SEARCH_RESULT_NOT_FILE, show_alert=True)
+            return
+        await answer_query(query, loc.SEARCH_PREPARING_RESULT.format(name=escaped_item_name))
+
+    context.user_data.pop(UD_KEY_SEARCH_RESULTS, None)
+    context.user_data.pop(UD_KEY_SEARCH_BASE_PATH, None)
+    defer(update, context, _open_search_result(update, context, prefix, target_path))
+
+async def _open_search_result(update: Update, context: ContextTypes.DEFAULT_TYPE, prefix: str, target_path: Path):
+    query = update.callback_query
     if query.message:
         try:
             await query.delete_message()
             context.user_data.pop(UD_KEY_CURRENT_MESSAGE_ID, None)
         except Exception as del_e:
             logger.warning(f"Could not delete search results message {query.message.message_id}: {del_e}")
-    
-    context.user_data.pop(UD_KEY_SEARCH_RESULTS, None)
-    context.user_data.pop(UD_KEY_SEARCH_BASE_PATH, None)
 
     if prefix == CB_PREFIX_SRCH_DIR:
-        if not result_item.get('is_dir'):
-            logger.warning(f"Search result not a directory: {target_path_str}")
-            await query.answer(loc.SEARCH_RESULT_NOT_FOLDER, show_alert=True)
-            return
-        await query.answer(loc.SEARCH_OPENING_RESULT.format(name=escaped_item_name))
         await display_folder_content(update, context, target_path, page=0, edit_message=False)
-    elif prefix == CB_PREFIX_SRCH_FILE:
-        if not result_item.get('is_file'):
-            logger.warning(f"Search result not a file: {target_path_str}")
-            await query.answer(loc.SEARCH_RESULT_NOT_FILE, show_alert=True)
-            return
-        await query.answer(loc.SEARCH_PREPARING_RESULT.format(name=escaped_item_name))
-        await send_file_safe(context, chat_id, target_path)
+    else:
+        await send_file_safe(context, update.effective_chat.id, target_path)
 
-async def handle_admin_action(update: Update, context: ContextTypes.DEFAULT_TYPE, prefix: str, user_id_to_manage_str: str):
+async def handle_select_mode_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    admin_user_from_query = query.from_user
+    if context.user_data.get(UD_KEY_CLICK_MODE) == CLICK_MODE_SELECT:
+        context.user_data[UD_KEY_CLICK_MODE] = CLICK_MODE_DOWNLOAD
+        context.user_data.pop(UD_KEY_SELECTED_FILES, None)
+        await answer_query(query, loc.ALERT_SELECT_MODE_OFF)
+    else:
+        context.user_data[UD_KEY_CLICK_MODE] = CLICK_MODE_SELECT
+        await answer_query(query, loc.ALERT_SELECT_MODE_ON)
+    render_coalescer.submit(update, context, lambda: refresh_current_folder(update, context))
 
-    if admin_user_from_query.id != ADMIN_USER_ID:
-        logger.warning(f"Non-admin {admin_user_from_query.id} tried to use admin callback {prefix}{user_id_to_manage_str}")
-        await query.answer("Tʜɪs ᴀᴄᴛɪᴏɴ ɪs ғᴏʀ Aᴅᴍɪɴs ᴏɴʟʏ.", show_alert=True)
+async def handle_select_item(update: Update, context: ContextTypes.DEFAULT_TYPE, item_index: int):
+    query = update.callback_query
+    item = get_item_from_context(context, UD_KEY_VIEW_ITEMS, item_index)
+    if not item or not item.get("path"):
+        logger.warning(f"Item not found at index {item_index} for CB {CB_PREFIX_SELECT_ITEM}{item_index}")
+        await answer_query(query, loc.STALE_DATA_ERROR, show_alert=True)
+        return
+    if not item.get("is_file", False):
+        await answer_query(query, loc.ERROR_NOT_A_FILE, show_alert=True)
         return
 
-    try:
-        user_id_to_manage = int(user_id_to_manage_str)
-    except ValueError:
-        logger.error(f"Invalid user_id in admin callback: {user_id_to_manage_str}")
-        await query.answer("Eʀʀᴏʀ: Iɴᴠᴀʟɪᴅ ᴜsᴇʀ ID ɪɴ ᴄᴀʟʟʙᴀᴄᴋ.", show_alert=True)
+    escaped_item_name = escape_html(item.get('name', 'Unknown'))
+    selected_files: List[str] = context.user_data.setdefault(UD_KEY_SELECTED_FILES, [])
+    if item["path"] in selected_files:
+        selected_files.remove(item["path"])
+        await answer_query(query, loc.ALERT_ITEM_UNSELECTED.format(name=escaped_item_name))
+    elif len(selected_files) >= MAX_SELECTED_FILES:
+        await answer_query(query, loc.ALERT_SELECTION_LIMIT.format(limit=MAX_SELECTED_FILES), show_alert=True)
+        return
+    else:
+        selected_files.append(item["path"])
+        await answer_query(query, loc.ALERT_ITEM_SELECTED.format(name=escaped_item_name))
+    render_coalescer.submit(update, context, lambda: refresh_current_folder(update, context))
+
+async def handle_clear_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    context.user_data.pop(UD_KEY_SELECTED_FILES, None)
+    await answer_query(query, loc.ALERT_SELECTION_CLEARED)
+    render_coalescer.submit(update, context, lambda: refresh_current_folder(update, context))
+
+async def handle_send_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    chat_id = update.effective_chat.id
+    selected_files: List[str] = context.user_data.get(UD_KEY_SELECTED_FILES, [])
+    if not selected_files:
+        await answer_query(query, loc.ALERT_NOTHING_SELECTED, show_alert=True)
+        return
+
+    file_paths: List[Path] = []
+    for path_str in selected_files:
+        try:
+            target_path = Path(path_str).resolve()
+            if not (target_path == START_DIRECTORY_PATH or \
+                    str(target_path).startswith(str(START_DIRECTORY_PATH) + os.sep)):
+                logger.error(f"SECURITY: Selected path '{path_str}' (resolves to '{target_path}') is outside allowed root.")
+                continue
+            if target_path.is_file():
+                file_paths.append(target_path)
+            else:
+                logger.warning(f"Selected path is no longer a file: {path_str}")
+        except Exception as path_err:
+            logger.error(f"Error resolving selected path '{path_str}': {path_err}")
+
+    if not file_paths:
+        context.user_data.pop(UD_KEY_SELECTED_FILES, None)
+        await answer_query(query, loc.ERROR_SEND_NOT_A_VALID_FILE, show_alert=True)
+        render_coalescer.submit(update, context, lambda: refresh_current_folder(update, context))
         return
 
+    await answer_query(query, loc.BUTTON_SENDING_SELECTED)
+    context.user_data.pop(UD_KEY_SELECTED_FILES, None)
+    context.user_data[UD_KEY_CLICK_MODE] = CLICK_MODE_DOWNLOAD
+    render_coalescer.submit(update, context, lambda: refresh_current_folder(update, context))
+    defer(update, context, send_selected_files(context, chat_id, file_paths), serialize=False)
+
+async def handle_admin_action(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id_to_manage: int, prefix: str):
+    """Accept / reject / dismiss buttons of the access request sent to the admin (admin-only route)."""
+    query = update.callback_query
+
     if user_id_to_manage == ADMIN_USER_ID:
-        await query.answer(loc.ADMIN_CANNOT_SELF_MODIFY, show_alert=True)
+        await answer_query(query, loc.ADMIN_CANNOT_SELF_MODIFY, show_alert=True)
         return
 
     managed_user_mention_html = f"<a href='tg://user?id={user_id_to_manage}'>{user_id_to_manage}</a>"
 
     if prefix == CB_PREFIX_ACCEPT_USER:
-        user_added = add_authorized_user(context, user_id_to_manage) # from auth_utils
+        user_added = await add_authorized_user(context, user_id_to_manage) # from auth_utils
+        unauthorized_guard.forget(user_id_to_manage)
         if user_added:
-            await query.answer(f"Usᴇʀ {user_id_to_manage} ᴀᴄᴄᴇᴘᴛᴇᴅ.")
+            await answer_query(query, f"Usᴇʀ {user_id_to_manage} ᴀᴄᴄᴇᴘᴛᴇᴅ.")
             edited_admin_text = loc.ADMIN_USER_ACCEPTED_NOTIFICATION.format(user_mention=managed_user_mention_html, user_id=user_id_to_manage)
-            
-            try:
-                await context.bot.send_photo(
-                    chat_id=user_id_to_manage,
-                    photo=BOT_IMAGE_URL,
-                    caption=loc.USER_NOW_AUTHORIZED.format(user_mention=managed_user_mention_html),
-                    parse_mode=constants.ParseMode.HTML
-                )
-            except Exception as e_notify:
-                logger.error(f"Failed to notify user {user_id_to_manage} of authorization: {e_notify}")
+        elif auth_service.is_allowed(user_id_to_manage):
+            await answer_query(query, f"Usᴇʀ {user_id_to_manage} ᴡᴀs ᴀʟʀᴇᴀᴅʏ ᴀᴜᴛʜᴏʀɪᴢᴇᴅ.")
+            edited_admin_text = loc.ADMIN_USER_ALREADY_ACCEPTED_NOTIFICATION.format(user_mention=managed_user_mention_html, user_id=user_id_to_manage)
         else:
-            if await is_authorized(Update(0, effective_user=type('obj', (), {'id': user_id_to_manage})()), context):
-                await query.answer(f"Usᴇʀ {user_id_to_manage} ᴡᴀs ᴀʟʀᴇᴀᴅʏ ᴀᴜᴛʜᴏʀɪᴢᴇᴅ.")
-                edited_admin_text = loc.ADMIN_USER_ALREADY_ACCEPTED_NOTIFICATION.format(user_mention=managed_user_mention_html, user_id=user_id_to_manage)
-            else:
-                await query.answer(loc.ERROR_ADDING_USER, show_alert=True)
-                edited_admin_text = loc.ERROR_ADDING_USER + f" (Usᴇʀ {user_id_to_manage})"
-        
-        dismiss_button = InlineKeyboardButton(loc.BUTTON_DISMISS_ADMIN_MSG, callback_data=create_callback_data(CB_PREFIX_DISMISS_ADMIN_MSG, user_id_to_manage))
-        if query.message:
-            try:
-                await context.bot.edit_message_caption(
-                    chat_id=query.message.chat_id, message_id=query.message.message_id,
-                    caption=edited_admin_text, reply_markup=InlineKeyboardMarkup([[dismiss_button]]),
-                    parse_mode=constants.ParseMode.HTML
-                )
-            except Exception as e_edit_admin: logger.error(f"Failed to edit admin msg on accept/already_auth: {e_edit_admin}")
+            await answer_query(query, loc.ERROR_ADDING_USER, show_alert=True)
+            edited_admin_text = loc.ERROR_ADDING_USER + f" (Usᴇʀ {user_id_to_manage})"
+        defer(update, context, _finish_admin_decision(
+            context, query, user_id_to_manage, edited_admin_text, notify_user=user_added
+        ), serialize=False)
 
     elif prefix == CB_PREFIX_REJECT_USER:
-        await query.answer(f"Usᴇʀ {user_id_to_manage} ʀᴇᴊᴇᴄᴛᴇᴅ (ɴᴏ ᴄʜᴀɴɢᴇ ᴍᴀᴅᴇ).")
+        await answer_query(query, f"Usᴇʀ {user_id_to_manage} ʀᴇᴊᴇᴄᴛᴇᴅ (ɴᴏ ᴄʜᴀɴɢᴇ ᴍᴀᴅᴇ).")
         edited_admin_text = loc.ADMIN_USER_REJECTED_NOTIFICATION.format(user_mention=managed_user_mention_html, user_id=user_id_to_manage)
-        dismiss_button = InlineKeyboardButton(loc.BUTTON_DISMISS_ADMIN_MSG, callback_data=create_callback_data(CB_PREFIX_DISMISS_ADMIN_MSG, user_id_to_manage))
-        if query.message:
-            try:
-                await context.bot.edit_message_caption(
-                    chat_id=query.message.chat_id, message_id=query.message.message_id,
-                    caption=edited_admin_text, reply_markup=InlineKeyboardMarkup([[dismiss_button]]),
-                    parse_mode=constants.ParseMode.HTML
-                )
-            except Exception as e_edit_admin: logger.error(f"Failed to edit admin msg on reject: {e_edit_admin}")
+        defer(update, context, _finish_admin_decision(
+            context, query, user_id_to_manage, edited_admin_text, notify_user=False
+        ), serialize=False)
 
     elif prefix == CB_PREFIX_DISMISS_ADMIN_MSG:
-        await query.answer("Nᴏᴛɪғɪᴄᴀᴛɪᴏɴ ᴅɪsᴍɪssᴇᴅ.")
+        await answer_query(query, "Nᴏᴛɪғɪᴄᴀᴛɪᴏɴ ᴅɪsᴍɪssᴇᴅ.")
         if query.message:
             try:
                 await query.delete_message()
             except Exception as e_del:
                 logger.warning(f"Could not delete dismissed admin message: {e_del}")
 
+async def _finish_admin_decision(
+    context: ContextTypes.DEFAULT_TYPE, query: CallbackQuery, user_id_to_manage: int, edited_admin_text: str, notify_user: bool
+):
+    """Runs after the admin's button press was answered: notifies the user and updates the admin message."""
+    if notify_user:
+        managed_user_mention_html = f"<a href='tg://user?id={user_id_to_manage}'>{user_id_to_manage}</a>"
+        try:
+            await send_with_banner(context, lambda photo: context.bot.send_photo(
+                chat_id=user_id_to_manage,
+                photo=photo,
+                caption=loc.USER_NOW_AUTHORIZED.format(user_mention=managed_user_mention_html),
+                parse_mode=constants.ParseMode.HTML
+            ))
+        except Exception as e_notify:
+            logger.error(f"Failed to notify user {user_id_to_manage} of authorization: {e_notify}")
+
+    if query.message and not query.message.photo: # Summary of several senders: only drop this sender's buttons
+        user_suffix = str(user_id_to_manage)
+        remaining_rows = [
+            row for row in query.message.reply_markup.inline_keyboard
+            if not any(button.callback_data and button.callback_data[OPCODE_WIDTH:] == user_suffix for button in row)
+        ] if query.message.reply_markup else []
+        try:
+            await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(remaining_rows) if remaining_rows else None)
+        except Exception as e_edit_admin: logger.error(f"Failed to update admin summary after decision on {user_id_to_manage}: {e_edit_admin}")
+        return
+
+    dismiss_button = InlineKeyboardButton(loc.BUTTON_DISMISS_ADMIN_MSG, callback_data=create_callback_data(CB_PREFIX_DISMISS_ADMIN_MSG, user_id_to_manage))
+    if query.message:
+        try:
+            await context.bot.edit_message_caption(
+                chat_id=query.message.chat_id, message_id=query.message.message_id,
+                caption=edited_admin_text, reply_markup=InlineKeyboardMarkup([[dismiss_button]]),
+                parse_mode=constants.ParseMode.HTML
+            )
+        except Exception as e_edit_admin: logger.error(f"Failed to edit admin msg after decision on {user_id_to_manage}: {e_edit_admin}")
+
+async def handle_noop(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await answer_query(update.callback_query)
+
+# --- Callback Routes ---
+callback_router = CallbackRouter()
+callback_router.register(CB_PREFIX_NOOP, "noop", handle_noop)
+callback_router.register(CB_PREFIX_NAV_DIR, "open_folder", partial(handle_item_click, prefix=CB_PREFIX_NAV_DIR), index_payload)
+callback_router.register(CB_PREFIX_NAV_FILE, "send_file", partial(handle_item_click, prefix=CB_PREFIX_NAV_FILE), index_payload)
+callback_router.register(CB_PREFIX_NAV_PAGE, "page", handle_pagination, step_payload, repeatable=True)
+callback_router.register(CB_PREFIX_NAV_PARENT, "parent", handle_parent_nav)
+callback_router.register(CB_PREFIX_NAV_ROOT, "root", handle_root_nav)
+callback_router.register(CB_PREFIX_SRCH_BACK, "search_back", handle_search_back)
+callback_router.register(CB_PREFIX_SRCH_DIR, "search_folder", partial(handle_search_result_click, prefix=CB_PREFIX_SRCH_DIR), index_payload)
+callback_router.register(CB_PREFIX_SRCH_FILE, "search_file", partial(handle_search_result_click, prefix=CB_PREFIX_SRCH_FILE), index_payload)
+callback_router.register(CB_PREFIX_SELECT_MODE, "select_mode", handle_select_mode_toggle)
+callback_router.register(CB_PREFIX_SELECT_ITEM, "select_item", handle_select_item, index_payload)
+callback_router.register(CB_PREFIX_SEND_SELECTED, "send_selected", handle_send_selected)
+callback_router.register(CB_PREFIX_CLEAR_SELECTION, "clear_selection", handle_clear_selection)
+callback_router.register(CB_PREFIX_PREVIEW_MODE, "preview_mode", handle_preview_mode_toggle)
+callback_router.register(CB_PREFIX_PREVIEW_ITEM, "preview_item", handle_preview_item, index_payload)
+callback_router.register(CB_PREFIX_PREVIEW_PAGE, "preview_page", handle_preview_page, text_payload)
+callback_router.register(CB_PREFIX_PREVIEW_CLOSE, "preview_close", handle_preview_close)
+callback_router.register(CB_PREFIX_FOLLOW_MODE, "follow_mode", handle_follow_mode_toggle)
+callback_router.register(CB_PREFIX_FOLLOW_ITEM, "follow_item", handle_follow_item, index_payload)
+callback_router.register(CB_PREFIX_FOLLOW_STOP, "follow_stop", handle_follow_stop)
+callback_router.register(CB_PREFIX_ACCEPT_USER, "accept_user", partial(handle_admin_action, prefix=CB_PREFIX_ACCEPT_USER), index_payload, AUTH_ADMIN)
+callback_router.register(CB_PREFIX_REJECT_USER, "reject_user", partial(handle_admin_action, prefix=CB_PREFIX_REJECT_USER), index_payload, AUTH_ADMIN)
+callback_router.register(CB_PREFIX_DISMISS_ADMIN_MSG, "dismiss_admin_msg", partial(handle_admin_action, prefix=CB_PREFIX_DISMISS_ADMIN_MSG), index_payload, AUTH_ADMIN)
+for legacy_prefix, legacy_opcode in CB_LEGACY_PREFIXES.items():
+    callback_router.register_alias(legacy_prefix, legacy_opcode)
+
 # --- Main Callback Query Dispatcher ---
 async def main_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     if not query or not query.data:
         logger.warning("CallbackQuery received without data attribute.")
         return
-    
+
+    async with answer_deadline(query): # Every press is answered, at the latest after CALLBACK_ANSWER_DEADLINE
+        await _dispatch_callback(update, context)
+
+async def _dispatch_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Looks the opcode up in callback_router, enforces the route's auth level and
+    payload format, drops double taps, then runs it. Route handlers answer the
+    query first and hand folder renders to `render_coalescer` and other heavy
+    work to `defer`, so the answer never waits for disk or upload I/O.
+    """
+    query = update.callback_query
     user_who_clicked = query.from_user
+    callback_data = query.data
+    resolved = callback_router.resolve(callback_data)
+    route = resolved[0] if resolved else None
+
+    if route is not None and route.auth == AUTH_ADMIN:
+        if user_who_clicked.id != ADMIN_USER_ID:
+            logger.warning(f"Non-admin {user_who_clicked.id} tried to use admin callback '{callback_data}'")
+            await answer_query(query, "Tʜɪs ᴀᴄᴛɪᴏɴ ɪs ғᴏʀ Aᴅᴍɪɴs ᴏɴʟʏ.", show_alert=True)
+            return
+    elif not await is_authorized(update, context): # <<<--- Uses is_authorized from auth_utils
+        if unauthorized_guard.is_silenced(user_who_clicked.id):
+            await answer_query(query) # Stops the spinner, nothing else
+        else:
+            await answer_query(query, loc.ACCESS_DENIED, show_alert=True)
+        defer(update, context, handle_unauthorized_access(update, context), serialize=False)
+        return
     
-    is_admin_specific_cb = query.data.startswith(CB_PREFIX_ACCEPT_USER) or \
-                           query.data.startswith(CB_PREFIX_REJECT_USER) or \
-                           query.data.startswith(CB_PREFIX_DISMISS_ADMIN_MSG)
+    click_logger.info(f"Callback received: User={user_who_clicked.id}, Data='{callback_data}'")
 
-    user_is_authorized_for_bot = await is_authorized(update, context) # <<<--- Uses is_authorized from auth_utils
+    if route is None:
+        logger.warning(f"Unhandled CBQ data: '{callback_data}' from user {user_who_clicked.id}")
+        metrics.increment("callback_route_unknown")
+        await answer_query(query, loc.ACTION_UNKNOWN, show_alert=True)
+        return
 
-    if not user_is_authorized_for_bot:
-        if is_admin_specific_cb and user_who_clicked.id != ADMIN_USER_ID:
-             await query.answer("Tʜɪs ᴀᴄᴛɪᴏɴ ɪs ғᴏʀ Aᴅᴍɪɴs ᴏɴʟʏ.", show_alert=True)
-             return
-        elif not is_admin_specific_cb:
-             await handle_unauthorized_access(update, context)
-             try: await query.answer(loc.ACCESS_DENIED, show_alert=True)
-             except BadRequest: pass
-             return
-    
     now = time.monotonic()
-    last_cb_time = context.user_data.get(UD_KEY_LAST_CB_TIME, 0)
-    if (now - last_cb_time) < MIN_CALLBACK_INTERVAL:
-        logger.debug(f"Rapid callback click from {user_who_clicked.id} blocked: {query.data}")
-        try:
-            current_path_for_alert = get_safe_path(context)
-            current_page_for_alert = context.user_data.get(UD_KEY_CURRENT_PAGE, 0)
-            alert_text = loc.ALERT_CALLBACK_CONTEXT.format(
-                name=escape_html(current_path_for_alert.name),
-                page=current_page_for_alert + 1
-            )
-            await query.answer(alert_text, show_alert=True)
-        except Exception:
-            await query.answer("🔄 Pʀᴏᴄᴇssɪɴɢ...", show_alert=False)
+    last_callback = context.user_data.get(UD_KEY_LAST_CALLBACK)
+    context.user_data[UD_KEY_LAST_CALLBACK] = (callback_data, now)
+    if not route.repeatable and last_callback and last_callback[0] == callback_data \
+            and now - last_callback[1] < CALLBACK_COALESCE_WINDOW:
+        logger.debug(f"Repeated tap from {user_who_clicked.id} dropped: {callback_data}")
+        metrics.increment("callback_repeats_dropped", route=route.name)
+        await answer_query(query)
         return
-    context.user_data[UD_KEY_LAST_CB_TIME] = now
-
-    callback_data = query.data
-    logger.info(f"Callback received: User={user_who_clicked.id}, Data='{callback_data}'")
-
-    answer_text_default = None
-    answer_show_alert_default = False
 
     try:
-        if callback_data == CB_PREFIX_NOOP:
-            answer_text_default = None
-        elif callback_data == CB_PREFIX_NAV_PARENT:
-            await handle_parent_nav(update, context)
-            return
-        elif callback_data == CB_PREFIX_NAV_ROOT:
-            await handle_root_nav(update, context)
-            return
-        elif callback_data == CB_PREFIX_SRCH_BACK:
-            await handle_search_back(update, context)
-            return
-        
-        elif ':' in callback_data:
-            prefix, payload = callback_data.split(':', 1)
-            prefix_with_colon = prefix + ":"
-
-            if prefix_with_colon == CB_PREFIX_NAV_DIR or prefix_with_colon == CB_PREFIX_NAV_FILE:
-                await handle_item_click(update, context, prefix_with_colon, payload)
-                return 
-            elif prefix_with_colon == CB_PREFIX_NAV_PAGE:
-                await handle_pagination(update, context, payload)
-                return
-            elif prefix_with_colon == CB_PREFIX_SRCH_DIR or prefix_with_colon == CB_PREFIX_SRCH_FILE:
-                await handle_search_result_click(update, context, prefix_with_colon, payload)
-                return
-            elif prefix_with_colon in [CB_PREFIX_ACCEPT_USER, CB_PREFIX_REJECT_USER, CB_PREFIX_DISMISS_ADMIN_MSG]:
-                await handle_admin_action(update, context, prefix_with_colon, payload) # Authorization is checked inside
-                return
-            else:
-                logger.warning(f"Unhandled CBQ prefix: {prefix_with_colon} from user {user_who_clicked.id}")
-                answer_text_default = loc.ACTION_UNKNOWN
-                answer_show_alert_default = True
-        else:
-            logger.warning(f"Malformed CBQ data: '{callback_data}' from user {user_who_clicked.id}")
-            answer_text_default = loc.INVALID_FORMAT
-            answer_show_alert_default = True
-
-        if answer_text_default is not None or answer_show_alert_default:
-            await query.answer(text=answer_text_default, show_alert=answer_show_alert_default)
-        else:
-            try: await query.answer()
-            except BadRequest as e_ans:
-                logger.debug(f"Silent query.answer failed (likely too old or already answered): {e_ans}")
+        payload = callback_router.parse(route, resolved[1])
+    except InvalidPayload:
+        logger.error(f"Invalid payload for route '{route.name}': '{callback_data}' from user {user_who_clicked.id}")
+        await answer_query(query, loc.INVALID_FORMAT, show_alert=True)
+        return
 
+    try:
+        await callback_router.call(route, update, context, payload)
     except Exception as e:
         logger.exception(f"Error processing CBQ '{callback_data}' from user {user_who_clicked.id}: {e}")
         try:
-            await query.answer(loc.INTERNAL_ERROR, show_alert=True)
+            await answer_query(query, loc.INTERNAL_ERROR, show_alert=True) # No-op if the route already answered
         except Exception as answer_e:
             logger.error(f"Failed to answer query after CBQ error: {answer_e}")
 
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """
-Handlers for Telegram commands like /start, /help, and /cancel.
+Handlers for Telegram commands like /start, /help, /cancel and the admin's /stats.
 """
 import logging
 import os # Needed for os.sep for path construction
@@ -9,13 +9,15 @@ from pathlib import Path
 from telegram import Update, constants
 from telegram.ext import ContextTypes
 
-from config import START_DIRECTORY_PATH, UD_KEY_CURRENT_PATH, UD_KEY_SEARCH_RESULTS, UD_KEY_SEARCH_BASE_PATH, BOT_IMAGE_URL, UD_KEY_CURRENT_PAGE
+from config import START_DIRECTORY_PATH, UD_KEY_CURRENT_PATH, UD_KEY_SEARCH_RESULTS, UD_KEY_SEARCH_BASE_PATH, BOT_IMAGE_URL, UD_KEY_CURRENT_PAGE, ADMIN_USER_ID, PROFILE_MAX_SECONDS
 import localization as loc
 from utils.auth_utils import is_authorized # <<<--- مصدر is_authorized الصحيح
 from utils.helpers import (
     set_safe_path, escape_html,
     send_or_edit_photo_message, handle_unauthorized_access, get_safe_path
 )
+from utils.profiler import profiler, MODES, MODE_CPROFILE
+from utils.runtime_stats import runtime_stats
 from .common_handlers import display_folder_content
 
 logger = logging.getLogger(__name__)
@@ -106,5 +108,47 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await display_folder_content(update, context, current_path, page=current_page, edit_message=False)
         # Similar to above, loc.CANCEL_NO_ACTIVE_OP message can be integrated or sent separately.
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin-only: runtime statistics of the bot."""
+    if not await is_authorized(update, context):
+        await handle_unauthorized_access(update, context)
+        return
+    if update.effective_user.id != ADMIN_USER_ID:
+        await update.message.reply_text(loc.ADMIN_ONLY_COMMAND, parse_mode=constants.ParseMode.HTML)
+        return
+
+    logger.info(f"Admin {update.effective_user.id} used /stats.")
+    await update.message.reply_text(runtime_stats.build_report(context.application), parse_mode=constants.ParseMode.HTML)
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin-only: /profile <seconds> [cprofile|sample] profiles the bot in the background."""
+    if not await is_authorized(update, context):
+        await handle_unauthorized_access(update, context)
+        return
+    if update.effective_user.id != ADMIN_USER_ID:
+        await update.message.reply_text(loc.ADMIN_ONLY_COMMAND, parse_mode=constants.ParseMode.HTML)
+        return
+
+    args = context.args or []
+    mode = args[1].lower() if len(args) > 1 else MODE_CPROFILE
+    try:
+        seconds = float(args[0])
+    except (IndexError, ValueError):
+        seconds = 0
+    if seconds <= 0 or mode not in MODES:
+        await update.message.reply_text(loc.PROFILE_USAGE, parse_mode=constants.ParseMode.HTML)
+        return
+    seconds = max(1.0, min(seconds, PROFILE_MAX_SECONDS))
+
+    # Runs as a task: awaiting it here would hold up the admin's next updates (ordered per user)
+    if not profiler.start_capture(context.application, seconds, mode, chat_id=update.effective_chat.id):
+        await update.message.reply_text(loc.PROFILE_BUSY, parse_mode=constants.ParseMode.HTML)
+        return
+    logger.info(f"Admin {update.effective_user.id} started profiling ({mode}, {seconds:g}s).")
+    await update.message.reply_text(
+        loc.PROFILE_STARTED.format(seconds=f"{seconds:g}", mode=mode),
+        parse_mode=constants.ParseMode.HTML
+    )
+
 # Made by: Zaky1million 😊♥️
 # For contact or project requests: https://t.me/Zaky1million
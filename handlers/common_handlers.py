@@ -7,16 +7,17 @@ from pathlib import Path
 
 from telegram import Update, constants
 from telegram.ext import ContextTypes
-from telegram.error import BadRequest, Forbidden
+from telegram.error import BadRequest, Forbidden, TelegramError
 
 from config import UD_KEY_CURRENT_PAGE, BOT_IMAGE_URL, UD_KEY_CURRENT_MESSAGE_ID
 import localization as loc
 from utils.helpers import (
     # is_authorized, # Authorization handled by caller
-    set_safe_path, send_or_edit_photo_message,
+    set_safe_path, get_safe_path, send_or_edit_photo_message,
     # handle_unauthorized_access # Authorization handled by caller
 )
 from utils.markup import generate_file_list_markup
+from utils.callback_ack import answer_query
 
 logger = logging.getLogger(__name__)
 
@@ -60,15 +61,15 @@ async def display_folder_content(
             logger.debug(f"Message not modified for {target_path}. (Handled by helper or this is a fallback)")
             if query:
                 try:
-                    await query.answer() 
-                except Exception as e_ans:
+                    await answer_query(query)
+                except TelegramError as e_ans: # answer_query already absorbs BadRequest (query too old)
                     logger.debug(f"Query answer failed (likely already answered or old) for 'not modified': {e_ans}")
         else:
             logger.error(f"BadRequest during display_folder_content for {target_path}: {e}")
             if query:
                 try:
-                    await query.answer(loc.ERROR_DISPLAY_UPDATE, show_alert=True)
-                except Exception as e_ans:
+                    await answer_query(query, loc.ERROR_DISPLAY_UPDATE, show_alert=True)
+                except TelegramError as e_ans: # answer_query already absorbs BadRequest (query too old)
                      logger.debug(f"Query answer failed for BadRequest display_folder_content: {e_ans}")
             try:
                 # Send a new text message as fallback if editing/sending photo fails with other BadRequest
@@ -80,15 +81,15 @@ async def display_folder_content(
          logger.error(f"Forbidden: Cannot update display for {target_path} in chat {chat_id}: {e}")
          if query:
              try:
-                 await query.answer(loc.ERROR_BOT_PERMISSION, show_alert=True)
-             except Exception as e_ans:
+                 await answer_query(query, loc.ERROR_BOT_PERMISSION, show_alert=True)
+             except TelegramError as e_ans: # answer_query already absorbs BadRequest (query too old)
                   logger.debug(f"Query answer failed for Forbidden display_folder_content: {e_ans}")
     except Exception as e:
         logger.exception(f"Unexpected error during display_folder_content for {target_path}: {e}")
         if query:
             try:
-                await query.answer(loc.INTERNAL_ERROR, show_alert=True)
-            except Exception as e_ans:
+                await answer_query(query, loc.INTERNAL_ERROR, show_alert=True)
+            except TelegramError as e_ans: # answer_query already absorbs BadRequest (query too old)
                 logger.debug(f"Query answer failed for general Exception in display_folder_content: {e_ans}")
         try:
             await context.bot.send_message(chat_id, loc.ERROR_FATAL_DISPLAY, parse_mode=constants.ParseMode.HTML)
@@ -96,5 +97,12 @@ async def display_folder_content(
             logger.error(f"Failed to send text fallback for general Exception: {final_err}")
 
 
+async def refresh_current_folder(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Re-renders the current folder page in place (e.g. after a mode or selection change)."""
+    current_path = get_safe_path(context)
+    current_page = context.user_data.get(UD_KEY_CURRENT_PAGE, 0)
+    await display_folder_content(update, context, current_path, page=current_page, edit_message=True)
+
+
 # Made by: Zaky1million 😊♥️
 # For contact or project requests: https://t.me/Zaky1million
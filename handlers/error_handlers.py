@@ -3,8 +3,6 @@
 Global error handler for the bot.
 """
 import logging
-import html as pyhtml
-import traceback
 
 from telegram import Update, constants
 from telegram.ext import ContextTypes
@@ -16,29 +14,35 @@ from config import (
 )
 import localization as loc
 from utils.helpers import send_or_edit_photo_message # For notifying user with image
+from utils.error_tracker import error_tracker
 
 logger = logging.getLogger(__name__)
 
+UPDATE_TEXT_LOG_LENGTH = 80 # Characters of the message text / callback data logged with an error
+
+
+def describe_update(update: object) -> str:
+    """A one-line summary of the update for the log (str(update) dumps the whole object tree)."""
+    if not isinstance(update, Update):
+        return repr(update)[:UPDATE_TEXT_LOG_LENGTH]
+    user = update.effective_user
+    chat = update.effective_chat
+    parts = [f"update_id={update.update_id}", f"user={user.id if user else None}", f"chat={chat.id if chat else None}"]
+    if update.callback_query:
+        parts.append(f"callback={update.callback_query.data!r:.{UPDATE_TEXT_LOG_LENGTH}}")
+    elif update.effective_message:
+        message = update.effective_message
+        if message.text:
+            parts.append(f"text={message.text!r:.{UPDATE_TEXT_LOG_LENGTH}}")
+        elif message.document:
+            parts.append(f"document={message.document.file_name!r:.{UPDATE_TEXT_LOG_LENGTH}}")
+    return " ".join(parts)
+
+
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log Errors caused by Updates and notify user if possible."""
     
-    tb_lines = traceback.format_exception(context.error.__class__, context.error, context.error.__traceback__)
-    tb_text = "".join(tb_lines)
-    
-    # Log with WARNING or ERROR level based on error type potentially
-    log_level = logging.ERROR
-    if isinstance(context.error, (NetworkError, BadRequest)): # Less critical often
-        log_level = logging.WARNING
-
-    logger.log(
-        log_level,
-        f"Eʀʀᴏʀ ʜᴀɴᴅʟɪɴɢ ᴜᴘᴅᴀᴛᴇ: {pyhtml.escape(str(update))}\n"
-        f"Error Type: {context.error.__class__.__name__}\n"
-        f"Error: {pyhtml.escape(str(context.error))}\n"
-        f"Traceback:\n{pyhtml.escape(tb_text)}"
-    )
-
-    # Ignore common benign errors early
+    # Ignore common benign errors early: not fingerprinted, so they never show up in the top-errors report
     if isinstance(context.error, BadRequest) and "Message is not modified" in str(context.error):
         logger.debug(f"Benign BadRequest (Message not modified) in global error handler: {context.error}")
         return
@@ -47,25 +51,46 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
         # No direct user notification for this one to avoid spam on flaky connections.
         return
 
+    # Log with WARNING or ERROR level based on error type potentially
+    log_level = logging.ERROR
+    if isinstance(context.error, (NetworkError, BadRequest)): # Less critical often
+        log_level = logging.WARNING
+
+    # Full traceback only for the first occurrence of this error per ERROR_DEDUP_WINDOW; it is
+    # formatted by the logging thread (exc_info), not here on the event loop
+    occurrence = error_tracker.record(context.error)
+    summary = f"Eʀʀᴏʀ ʜᴀɴᴅʟɪɴɢ ᴜᴘᴅᴀᴛᴇ: {describe_update(update)} - {context.error.__class__.__name__}: {context.error}"
+    if occurrence.first_in_window:
+        logger.log(
+            log_level, f"{summary} [{occurrence.fingerprint}]",
+            exc_info=(context.error.__class__, context.error, context.error.__traceback__)
+        )
+    else:
+        logger.log(log_level, f"{summary} [{occurrence.fingerprint}, repeat #{occurrence.count_in_window}, traceback logged before]")
+
     if isinstance(update, Update) and update.effective_chat:
         chat_id = update.effective_chat.id
-        try:
-            await send_or_edit_photo_message(
-                update, context, chat_id,
-                caption=loc.INTERNAL_ERROR_LOGGED,
-                reply_markup=None,
-                edit_existing=False # Send as new message for errors
-            )
-        except Forbidden:
-            logger.error(f"Cannot send error message (photo) to chat {chat_id}: Bot forbidden.")
-        except Exception as e:
-            logger.error(f"Failed to send error notification (photo) to chat {chat_id}: {e}")
-            try: # Fallback to simple text
-                await context.bot.send_message(
-                    chat_id=chat_id, text=loc.INTERNAL_ERROR_LOGGED, parse_mode=constants.ParseMode.HTML
+        if not error_tracker.should_notify(occurrence.fingerprint, chat_id):
+            # A recurring failure (e.g. a flaky mount) would otherwise send a photo per update
+            logger.debug(f"Error notification to chat {chat_id} suppressed (already told about {occurrence.fingerprint}).")
+        else:
+            try:
+                await send_or_edit_photo_message(
+                    update, context, chat_id,
+                    caption=loc.INTERNAL_ERROR_LOGGED,
+                    reply_markup=None,
+                    edit_existing=False # Send as new message for errors
                 )
-            except Exception as final_e:
-                 logger.error(f"Failed to send even text error notification to chat {chat_id}: {final_e}")
+            except Forbidden:
+                logger.error(f"Cannot send error message (photo) to chat {chat_id}: Bot forbidden.")
+            except Exception as e:
+                logger.error(f"Failed to send error notification (photo) to chat {chat_id}: {e}")
+                try: # Fallback to simple text
+                    await context.bot.send_message(
+                        chat_id=chat_id, text=loc.INTERNAL_ERROR_LOGGED, parse_mode=constants.ParseMode.HTML
+                    )
+                except Exception as final_e:
+                     logger.error(f"Failed to send even text error notification to chat {chat_id}: {final_e}")
 
     # Clean up any potentially stuck search context data
     if isinstance(context.error, Exception) and context.user_data:
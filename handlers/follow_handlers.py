@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Handlers for live follow mode (`tail -F` in a chat message).
+One background task per user watches the file through utils.follow_utils
+and edits a single message with the newest lines, at most once every
+FOLLOW_EDIT_INTERVAL seconds, until stopped or FOLLOW_TIMEOUT is reached.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from telegram import Update, constants, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from telegram.error import BadRequest, RetryAfter, Forbidden, NetworkError
+
+from config import (
+    FOLLOW_EDIT_INTERVAL, FOLLOW_TIMEOUT, FOLLOW_RATE_LIMIT_RETRIES, PREVIEW_MAX_CHARS, PREVIEW_MAX_LINE_LENGTH,
+    CB_PREFIX_FOLLOW_ITEM, CB_PREFIX_FOLLOW_STOP,
+    UD_KEY_VIEW_ITEMS, UD_KEY_CLICK_MODE,
+    CLICK_MODE_DOWNLOAD, CLICK_MODE_FOLLOW
+)
+import localization as loc
+from utils.helpers import get_item_from_context, escape_html
+from utils.preview_utils import looks_binary
+from utils.follow_utils import ChangeNotifier, FileFollower
+from utils.callback_ack import answer_query, defer, render_coalescer
+from .common_handlers import refresh_current_folder
+from .preview_handlers import _resolve_previewable
+
+logger = logging.getLogger(__name__)
+
+# user_id -> (follow task, chat_id, message_id). At most one follow per user.
+_active_follows: Dict[int, Tuple["asyncio.Task[None]", int, int]] = {}
+_shutting_down = False # Set by stop_all_follows(): final edits then don't sit out flood waits
+
+
+def _render_follow_text(file_name: str, lines: List[str], header: str, status: str = "") -> str:
+    """Header, optional status line and the newest lines that fit the message budget."""
+    shown_lines: List[str] = []
+    used_chars = 0
+    for line in reversed(lines):
+        if len(line) > PREVIEW_MAX_LINE_LENGTH:
+            line = line[:PREVIEW_MAX_LINE_LENGTH - 1] + "…"
+        escaped_line = escape_html(line)
+        if shown_lines and used_chars + len(escaped_line) + 1 > PREVIEW_MAX_CHARS:
+            break
+        shown_lines.append(escaped_line)
+        used_chars += len(escaped_line) + 1
+    shown_lines.reverse()
+
+    text = header
+    if status:
+        text += "\n" + status
+    text += f"\n<pre>{chr(10).join(shown_lines)}</pre>" if shown_lines else f"\n{loc.FOLLOW_NO_LINES}"
+    return text
+
+def _stop_markup() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton(loc.BUTTON_FOLLOW_STOP, callback_data=CB_PREFIX_FOLLOW_STOP)]])
+
+async def _edit_follow_message(
+    context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: int, text: str, with_stop_button: bool
+) -> Optional[bool]:
+    """
+    Edits the follow message. Returns True once edited, False if the message is
+    gone and following should end, None if the edit was skipped (flood waits
+    used up, network error): the next edit simply tries again.
+    """
+    retries_left = 0 if _shutting_down else FOLLOW_RATE_LIMIT_RETRIES
+    while True:
+        try:
+            await context.bot.edit_message_text(
+                chat_id=chat_id, message_id=message_id, text=text,
+                reply_markup=_stop_markup() if with_stop_button else None,
+                parse_mode=constants.ParseMode.HTML,
+                rate_limit_args=0, # Flood waits are capped here, not absorbed by the rate limiter
+            )
+            return True
+        except RetryAfter as e:
+            if retries_left <= 0:
+                logger.warning(f"Follow edit of message {message_id} rate limited ({e.retry_after}s); skipped.")
+                return None
+            retries_left -= 1
+            logger.warning(f"Follow edit rate limited; waiting {e.retry_after}s.")
+            await asyncio.sleep(float(e.retry_after))
+        except BadRequest as e: # Before NetworkError, which it subclasses
+            if "Message is not modified" in str(e):
+                return True
+            logger.info(f"Follow message {message_id} in chat {chat_id} can't be edited anymore ({e}).")
+            return False
+        except Forbidden as e:
+            logger.info(f"Follow message {message_id} in chat {chat_id} is not reachable ({e}).")
+            return False
+        except NetworkError as e: # Includes TimedOut
+            logger.warning(f"Follow edit of message {message_id} failed ({e}); skipped.")
+            return None
+
+async def _follow_loop(context: ContextTypes.DEFAULT_TYPE, user_id: int, chat_id: int, message_id: int, file_path: Path):
+    file_name = escape_html(file_path.name)
+    follower = FileFollower(file_path)
+    notifier = ChangeNotifier(file_path)
+    started_at = time.monotonic()
+    reason = loc.FOLLOW_REASON_USER
+    logger.info(f"User {user_id} following {file_path} (inotify: {notifier.uses_inotify}).")
+    try:
+        await asyncio.to_thread(follower.start)
+        changed = True
+        last_edit = 0.0
+        while True:
+            now = time.monotonic()
+            remaining = FOLLOW_TIMEOUT - (now - started_at)
+            if remaining <= 0:
+                reason = loc.FOLLOW_REASON_TIMEOUT
+                break
+            if changed and now - last_edit >= FOLLOW_EDIT_INTERVAL:
+                status = loc.FOLLOW_STATUS.format(
+                    time=datetime.now().strftime("%H:%M:%S"), minutes=max(1, int(remaining // 60))
+                )
+                text = _render_follow_text(file_name, follower.visible_lines(), loc.FOLLOW_HEADER.format(name=file_name), status)
+                edited = await _edit_follow_message(context, chat_id, message_id, text, with_stop_button=True)
+                if edited is False:
+                    return
+                last_edit = time.monotonic()
+                changed = not edited # A skipped edit is retried after the next interval
+            # Sleep until the file changes; while an edit is pending, only until the throttle expires
+            wait_for = FOLLOW_EDIT_INTERVAL - (time.monotonic() - last_edit) if changed else remaining
+            await notifier.wait(min(wait_for, remaining))
+            try:
+                changed = await asyncio.to_thread(follower.poll) or changed
+            except FileNotFoundError:
+                reason = loc.FOLLOW_REASON_GONE
+                break
+    except asyncio.CancelledError:
+        if _shutting_down:
+            reason = loc.FOLLOW_REASON_SHUTDOWN
+    except FileNotFoundError:
+        reason = loc.FOLLOW_REASON_GONE
+    except Exception as e: # Still replace the Stop button below
+        logger.error(f"Following {file_path} for user {user_id} failed: {e}", exc_info=True)
+        reason = loc.FOLLOW_REASON_ERROR
+    finally:
+        notifier.close()
+        follower.close()
+        current = _active_follows.get(user_id)
+        if current and current[2] == message_id:
+            _active_follows.pop(user_id, None)
+
+    header = loc.FOLLOW_STOPPED_HEADER.format(name=file_name, reason=reason)
+    await _edit_follow_message(context, chat_id, message_id, _render_follow_text(file_name, follower.visible_lines(), header), with_stop_button=False)
+    logger.info(f"User {user_id} stopped following {file_path} ({reason}).")
+
+def _log_follow_failure(task: "asyncio.Task[None]") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Follow task failed: {task.exception()}", exc_info=task.exception())
+
+async def stop_all_follows() -> None:
+    """Ends every live follow (with its final edit). Called on shutdown, before the bot stops."""
+    global _shutting_down
+    _shutting_down = True
+    tasks = [task for task, _, _ in _active_follows.values()]
+    _active_follows.clear()
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"Stopped {len(tasks)} live follow(s) for shutdown.")
+
+def _cancel_follow(user_id: int) -> bool:
+    current = _active_follows.pop(user_id, None)
+    if not current:
+        return False
+    current[0].cancel()
+    return True
+
+
+async def handle_follow_mode_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if context.user_data.get(UD_KEY_CLICK_MODE) == CLICK_MODE_FOLLOW:
+        context.user_data[UD_KEY_CLICK_MODE] = CLICK_MODE_DOWNLOAD
+        await answer_query(query, loc.ALERT_FOLLOW_MODE_OFF)
+    else:
+        context.user_data[UD_KEY_CLICK_MODE] = CLICK_MODE_FOLLOW
+        await answer_query(query, loc.ALERT_FOLLOW_MODE_ON)
+    render_coalescer.submit(update, context, lambda: refresh_current_folder(update, context))
+
+async def handle_follow_item(update: Update, context: ContextTypes.DEFAULT_TYPE, item_index: int):
+    query = update.callback_query
+
+    item = get_item_from_context(context, UD_KEY_VIEW_ITEMS, item_index)
+    if not item or not item.get("path"):
+        logger.warning(f"Item not found at index {item_index} for CB {CB_PREFIX_FOLLOW_ITEM}{item_index}")
+        await answer_query(query, loc.STALE_DATA_ERROR, show_alert=True)
+        return
+    file_path = _resolve_previewable(item["path"])
+    if not file_path:
+        await answer_query(query, loc.ERROR_NOT_A_FILE, show_alert=True)
+        return
+    try:
+        is_binary = await asyncio.to_thread(looks_binary, file_path)
+    except OSError as e:
+        logger.error(f"Cannot read {file_path} for follow: {e}")
+        await answer_query(query, loc.ERROR_SEND_PERMISSION, show_alert=True)
+        return
+    if is_binary:
+        await answer_query(query, loc.ERROR_PREVIEW_BINARY, show_alert=True)
+        return
+
+    await answer_query(query, loc.BUTTON_STARTING_FOLLOW.format(name=item.get('name', 'Unknown')))
+    defer(update, context, _start_follow(update, context, file_path))
+
+async def _start_follow(update: Update, context: ContextTypes.DEFAULT_TYPE, file_path: Path):
+    user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    _cancel_follow(user_id) # One live message per user; the previous one gets its final edit
+    file_name = escape_html(file_path.name)
+    follow_message = await context.bot.send_message(
+        chat_id=chat_id,
+        text=_render_follow_text(file_name, [], loc.FOLLOW_HEADER.format(name=file_name)),
+        reply_markup=_stop_markup(),
+        parse_mode=constants.ParseMode.HTML,
+    )
+    # A plain task, not application.create_task: Application.stop() awaits those, which would hold
+    # shutdown for up to FOLLOW_TIMEOUT. stop_all_follows() ends these instead.
+    task = asyncio.create_task(_follow_loop(context, user_id, chat_id, follow_message.message_id, file_path))
+    task.add_done_callback(_log_follow_failure)
+    _active_follows[user_id] = (task, chat_id, follow_message.message_id)
+
+async def handle_follow_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    user_id = update.effective_user.id
+    current = _active_follows.get(user_id)
+    if current and query.message and current[2] == query.message.message_id:
+        await answer_query(query, loc.BUTTON_FOLLOW_STOPPING)
+        _cancel_follow(user_id)
+        return
+    # Follow already ended (timeout, restart, newer follow): just drop the stale button
+    await answer_query(query, loc.ERROR_FOLLOW_ENDED, show_alert=True)
+    try:
+        await query.edit_message_reply_markup(reply_markup=None)
+    except BadRequest as e:
+        logger.debug(f"Could not remove stale follow button: {e}")
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
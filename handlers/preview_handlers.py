@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Handlers for the inline text preview (head / tail / any page of a file).
+File reads go through utils.preview_utils in a worker thread, so even
+multi-GB logs don't block the event loop.
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from telegram import Update, CallbackQuery, constants, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from telegram.error import BadRequest
+
+from config import (
+    START_DIRECTORY_PATH, PREVIEW_LINES_PER_PAGE, PREVIEW_MAX_CHARS,
+    CB_PREFIX_PREVIEW_ITEM, CB_PREFIX_PREVIEW_PAGE, CB_PREFIX_PREVIEW_CLOSE,
+    UD_KEY_VIEW_ITEMS, UD_KEY_CLICK_MODE, UD_KEY_PREVIEW_PATHS,
+    CLICK_MODE_DOWNLOAD, CLICK_MODE_PREVIEW
+)
+import localization as loc
+from utils.helpers import get_item_from_context, escape_html, create_callback_data, format_size
+from utils.preview_utils import read_lines, read_tail, looks_binary
+from utils.callback_ack import answer_query, defer, render_coalescer
+from .common_handlers import refresh_current_folder
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_TAIL_PAYLOAD = "t"
+MAX_TRACKED_PREVIEWS = 5 # Open preview messages remembered per user
+
+
+def _resolve_previewable(path_str: str) -> Optional[Path]:
+    """Resolves a stored path and checks it is a file inside START_DIRECTORY."""
+    try:
+        target_path = Path(path_str).resolve()
+        if not (target_path == START_DIRECTORY_PATH or \
+                str(target_path).startswith(str(START_DIRECTORY_PATH) + os.sep)):
+            logger.error(f"SECURITY: Preview path '{path_str}' (resolves to '{target_path}') is outside allowed root.")
+            return None
+        return target_path if target_path.is_file() else None
+    except Exception as path_err:
+        logger.error(f"Error resolving preview path '{path_str}': {path_err}")
+        return None
+
+def _build_preview_page(file_path: Path, payload: str) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """Reads the requested page and builds the message text and navigation keyboard. Blocking."""
+    file_size = file_path.stat().st_size
+    if payload == PREVIEW_TAIL_PAYLOAD:
+        lines, start_line = read_tail(file_path, PREVIEW_LINES_PER_PAGE)
+        total_lines = start_line + len(lines) if start_line is not None else None
+    else:
+        lines, start_line, total_lines = read_lines(file_path, max(0, int(payload)), PREVIEW_LINES_PER_PAGE)
+
+    # Keep whole lines only, within the message size budget
+    shown_lines: List[str] = []
+    used_chars = 0
+    for line in (lines if start_line is not None else reversed(lines)):
+        escaped_line = escape_html(line)
+        if shown_lines and used_chars + len(escaped_line) + 1 > PREVIEW_MAX_CHARS:
+            break
+        shown_lines.append(escaped_line)
+        used_chars += len(escaped_line) + 1
+    if start_line is None:
+        shown_lines.reverse()
+
+    text = loc.PREVIEW_HEADER.format(name=escape_html(file_path.name)) + "\n"
+    if start_line is None:
+        text += loc.PREVIEW_TAIL_INFO.format(count=len(shown_lines), size=format_size(file_size))
+    else:
+        text += loc.PREVIEW_LINES_INFO.format(
+            first=start_line + 1, last=start_line + len(shown_lines),
+            total=total_lines if total_lines is not None else "?", size=format_size(file_size)
+        )
+    text += f"\n<pre>{chr(10).join(shown_lines)}</pre>" if shown_lines else f"\n{loc.PREVIEW_EMPTY_FILE}"
+
+    nav_row: List[InlineKeyboardButton] = []
+    def add_button(label: str, target_payload: str):
+        callback_data = create_callback_data(CB_PREFIX_PREVIEW_PAGE, target_payload)
+        if callback_data:
+            nav_row.append(InlineKeyboardButton(label, callback_data=callback_data))
+
+    if start_line is None or start_line > 0:
+        add_button("⏮", "0")
+    if start_line is not None and start_line > 0:
+        add_button("⏪", str(max(0, start_line - 10 * PREVIEW_LINES_PER_PAGE)))
+        add_button("◀️", str(max(0, start_line - PREVIEW_LINES_PER_PAGE)))
+    at_end = total_lines is not None and start_line is not None and start_line + len(shown_lines) >= total_lines
+    if start_line is not None and not at_end and shown_lines:
+        add_button("▶️", str(start_line + len(shown_lines)))
+        add_button("⏩", str(start_line + 10 * PREVIEW_LINES_PER_PAGE))
+    if start_line is not None and not at_end:
+        add_button("⏭", PREVIEW_TAIL_PAYLOAD)
+
+    keyboard = [nav_row] if nav_row else []
+    keyboard.append([InlineKeyboardButton(loc.BUTTON_PREVIEW_CLOSE, callback_data=CB_PREFIX_PREVIEW_CLOSE)])
+    return text, InlineKeyboardMarkup(keyboard)
+
+def _remember_preview(context: ContextTypes.DEFAULT_TYPE, message_id: int, file_path: Path):
+    preview_paths = context.user_data.setdefault(UD_KEY_PREVIEW_PATHS, {})
+    preview_paths[message_id] = str(file_path)
+    while len(preview_paths) > MAX_TRACKED_PREVIEWS:
+        preview_paths.pop(next(iter(preview_paths)))
+
+
+async def handle_preview_mode_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if context.user_data.get(UD_KEY_CLICK_MODE) == CLICK_MODE_PREVIEW:
+        context.user_data[UD_KEY_CLICK_MODE] = CLICK_MODE_DOWNLOAD
+        await answer_query(query, loc.ALERT_PREVIEW_MODE_OFF)
+    else:
+        context.user_data[UD_KEY_CLICK_MODE] = CLICK_MODE_PREVIEW
+        await answer_query(query, loc.ALERT_PREVIEW_MODE_ON)
+    render_coalescer.submit(update, context, lambda: refresh_current_folder(update, context))
+
+async def handle_preview_item(update: Update, context: ContextTypes.DEFAULT_TYPE, item_index: int):
+    query = update.callback_query
+    chat_id = update.effective_chat.id
+
+    item = get_item_from_context(context, UD_KEY_VIEW_ITEMS, item_index)
+    if not item or not item.get("path"):
+        logger.warning(f"Item not found at index {item_index} for CB {CB_PREFIX_PREVIEW_ITEM}{item_index}")
+        await answer_query(query, loc.STALE_DATA_ERROR, show_alert=True)
+        return
+    file_path = _resolve_previewable(item["path"])
+    if not file_path:
+        await answer_query(query, loc.ERROR_NOT_A_FILE, show_alert=True)
+        return
+    try:
+        is_binary = await asyncio.to_thread(looks_binary, file_path)
+    except OSError as e:
+        logger.error(f"Cannot read {file_path} for preview: {e}")
+        await answer_query(query, loc.ERROR_SEND_PERMISSION, show_alert=True)
+        return
+    if is_binary:
+        await answer_query(query, loc.ERROR_PREVIEW_BINARY, show_alert=True)
+        return
+
+    await answer_query(query, loc.BUTTON_OPENING_PREVIEW.format(name=escape_html(item.get('name', 'Unknown'))))
+    logger.info(f"User {update.effective_user.id} previewing {file_path}")
+    defer(update, context, _send_preview(context, chat_id, file_path))
+
+async def _send_preview(context: ContextTypes.DEFAULT_TYPE, chat_id: int, file_path: Path):
+    text, markup = await asyncio.to_thread(_build_preview_page, file_path, "0")
+    preview_message = await context.bot.send_message(
+        chat_id=chat_id, text=text, reply_markup=markup, parse_mode=constants.ParseMode.HTML
+    )
+    _remember_preview(context, preview_message.message_id, file_path)
+
+async def handle_preview_page(update: Update, context: ContextTypes.DEFAULT_TYPE, payload: str):
+    query = update.callback_query
+    if payload != PREVIEW_TAIL_PAYLOAD and not payload.isdigit():
+        await answer_query(query, loc.INVALID_INDEX_ERROR, show_alert=True)
+        return
+    path_str = context.user_data.get(UD_KEY_PREVIEW_PATHS, {}).get(query.message.message_id) if query.message else None
+    file_path = _resolve_previewable(path_str) if path_str else None
+    if not file_path:
+        await answer_query(query, loc.ERROR_PREVIEW_STALE, show_alert=True)
+        return
+
+    await answer_query(query, loc.BUTTON_LOADING_TAIL if payload == PREVIEW_TAIL_PAYLOAD else loc.BUTTON_LOADING_LINES)
+    defer(update, context, _show_preview_page(query, file_path, payload))
+
+async def _show_preview_page(query: CallbackQuery, file_path: Path, payload: str):
+    text, markup = await asyncio.to_thread(_build_preview_page, file_path, payload)
+    try:
+        await query.edit_message_text(text=text, reply_markup=markup, parse_mode=constants.ParseMode.HTML)
+    except BadRequest as e:
+        if "Message is not modified" not in str(e):
+            raise
+
+async def handle_preview_close(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await answer_query(query)
+    if query.message:
+        context.user_data.get(UD_KEY_PREVIEW_PATHS, {}).pop(query.message.message_id, None)
+        try:
+            await query.delete_message()
+        except Exception as e_del:
+            logger.warning(f"Could not delete preview message: {e_del}")
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
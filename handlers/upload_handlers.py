@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Handler for documents sent to the bot: stores them into the folder the
+user is currently browsing. Big files are received in the background
+through the transfer scheduler, so the update handler returns at once.
+"""
+import logging
+import os
+
+import httpx
+from telegram import Update, constants
+from telegram.ext import ContextTypes
+from telegram.error import NetworkError
+
+from config import UPLOADS_ENABLED, MAX_UPLOAD_SIZE, UPLOAD_BACKGROUND_THRESHOLD
+import localization as loc
+from utils.auth_utils import is_authorized
+from utils.helpers import get_safe_path, escape_html, format_size, handle_unauthorized_access
+from utils.transfer_utils import receive_file_to_directory, sanitize_upload_name, transfer_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+async def handle_document_upload(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Saves a received document into UD_KEY_CURRENT_PATH without overwriting existing files."""
+    if not await is_authorized(update, context):
+        await handle_unauthorized_access(update, context)
+        return
+
+    message = update.message
+    user_id = update.effective_user.id
+    if not UPLOADS_ENABLED:
+        await message.reply_text(loc.ERROR_UPLOADS_DISABLED, parse_mode=constants.ParseMode.HTML)
+        return
+
+    document = message.document
+    file_size = document.file_size or 0
+    if file_size > MAX_UPLOAD_SIZE:
+        await message.reply_text(
+            loc.ERROR_UPLOAD_TOO_LARGE.format(size=format_size(file_size), limit=format_size(MAX_UPLOAD_SIZE)),
+            parse_mode=constants.ParseMode.HTML
+        )
+        return
+
+    # get_safe_path applies the same START_DIRECTORY containment as set_safe_path
+    target_dir = get_safe_path(context)
+    display_dir = escape_html(str(target_dir))
+    if not os.access(target_dir, os.W_OK | os.X_OK):
+        logger.warning(f"User {user_id} tried to upload into non-writable {target_dir}")
+        await message.reply_text(loc.ERROR_UPLOAD_PERMISSION.format(path=display_dir), parse_mode=constants.ParseMode.HTML)
+        return
+
+    file_name = sanitize_upload_name(document.file_name, fallback=f"upload_{document.file_unique_id}")
+    logger.info(f"User {user_id} uploading '{file_name}' ({file_size} bytes) into {target_dir}")
+    status_message = await message.reply_text(
+        loc.UPLOAD_RECEIVING.format(name=escape_html(file_name)), parse_mode=constants.ParseMode.HTML
+    )
+
+    async def receive() -> None:
+        try:
+            saved_path = await receive_file_to_directory(context, document.file_id, target_dir, file_name)
+            result_text = loc.UPLOAD_SAVED.format(
+                name=escape_html(saved_path.name), path=display_dir, size=format_size(file_size)
+            )
+        except PermissionError as e:
+            logger.error(f"Permission denied saving upload into {target_dir}: {e}")
+            result_text = loc.ERROR_UPLOAD_PERMISSION.format(path=display_dir)
+        except (NetworkError, httpx.HTTPError) as e:
+            logger.error(f"Downloading upload '{file_name}' from Telegram failed: {e}")
+            result_text = loc.ERROR_UPLOAD_NETWORK
+        except OSError as e:
+            logger.error(f"OS error saving upload '{file_name}' into {target_dir}: {e}")
+            result_text = loc.ERROR_UPLOAD_OS.format(error=escape_html(e.strerror or str(e)))
+        try:
+            await status_message.edit_text(result_text, parse_mode=constants.ParseMode.HTML)
+        except Exception as e_edit:
+            logger.warning(f"Could not update upload status message: {e_edit}")
+
+    if file_size > UPLOAD_BACKGROUND_THRESHOLD:
+        transfer_scheduler.submit(context.application, receive(), update=update)
+    else:
+        await receive()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -40,6 +40,10 @@ HELP_TEXT = """
 📁 <b>Fɪʟᴇs & Fᴏʟᴅᴇʀs:</b>
  - Cʟɪᴄᴋ ᴀ ғᴏʟᴅᴇʀ ɴᴀᴍᴇ (<code>📁</code> ᴏʀ <code>🔗</code>) ᴛᴏ ᴏᴘᴇɴ ɪᴛ.
  - Cʟɪᴄᴋ ᴀ ғɪʟᴇ ɴᴀᴍᴇ (ᴇ.ɢ. <code>📝</code>, <code>🖼️</code>, <code>🔗</code>) ᴛᴏ ᴅᴏᴡɴʟᴏᴀᴅ ɪᴛ.
+ - Tᴀᴘ <code>👁 Pʀᴇᴠɪᴇᴡ</code>, ᴛʜᴇɴ ᴀ ғɪʟᴇ, ᴛᴏ ʀᴇᴀᴅ ɪᴛ ɪɴʟɪɴᴇ ᴘᴀɢᴇ ʙʏ ᴘᴀɢᴇ (⏮ ʜᴇᴀᴅ, ⏭ ᴛᴀɪʟ) ᴡɪᴛʜᴏᴜᴛ ᴅᴏᴡɴʟᴏᴀᴅɪɴɢ ɪᴛ.
+ - Tᴀᴘ <code>📡 Fᴏʟʟᴏᴡ</code>, ᴛʜᴇɴ ᴀ ʟᴏɢ ғɪʟᴇ, ᴛᴏ ᴡᴀᴛᴄʜ ɴᴇᴡ ʟɪɴᴇs ʟɪᴠᴇ ɪɴ ᴏɴᴇ ᴍᴇssᴀɢᴇ ᴜɴᴛɪʟ ʏᴏᴜ ᴘʀᴇss <code>⏹ Sᴛᴏᴘ</code>.
+ - Tᴀᴘ <code>☑️ Sᴇʟᴇᴄᴛ</code> ᴛᴏ ᴛɪᴄᴋ sᴇᴠᴇʀᴀʟ ғɪʟᴇs (ᴀᴄʀᴏss ᴘᴀɢᴇs ᴀɴᴅ ғᴏʟᴅᴇʀs), ᴛʜᴇɴ <code>📤 Sᴇɴᴅ</code> ᴛᴏ ɢᴇᴛ ᴛʜᴇᴍ ᴀs ɢʀᴏᴜᴘᴇᴅ ᴀʟʙᴜᴍs.
+ - Sᴇɴᴅ ᴀ ᴅᴏᴄᴜᴍᴇɴᴛ ᴛᴏ ᴛʜᴇ ʙᴏᴛ ᴛᴏ sᴀᴠᴇ ɪᴛ ɪɴᴛᴏ ᴛʜᴇ ғᴏʟᴅᴇʀ ʏᴏᴜ ᴀʀᴇ ʙʀᴏᴡsɪɴɢ.
 
 🔍 <b>Aᴜᴛᴏᴍᴀᴛɪᴄ Sᴇᴀʀᴄʜ:</b>
  - Tᴏ sᴇᴀʀᴄʜ, sɪᴍᴘʟʏ ᴛʏᴘᴇ ʏᴏᴜʀ ǫᴜᴇʀʏ ɪɴ ᴛʜᴇ ᴄʜᴀᴛ ᴡʜᴇɴ ᴠɪᴇᴡɪɴɢ ᴀ ғᴏʟᴅᴇʀ.
@@ -70,7 +74,6 @@ BUTTON_GO_ROOT = "🏠 Gᴏɪɴɢ ᴛᴏ ʀᴏᴏᴛ..."
 BUTTON_OPENING_FOLDER = "📂 Oᴘᴇɴɪɴɢ: {name}"
 BUTTON_PREPARING_FILE = "⏳ Pʀᴇᴘᴀʀɪɴɢ: {name}"
 ALERT_ALREADY_ROOT = "🏠 Yᴏᴜ ᴀʀᴇ ᴀʟʀᴇᴀᴅʏ ɪɴ ᴛʜᴇ ʀᴏᴏᴛ ᴅɪʀᴇᴄᴛᴏʀʏ."
-ALERT_CALLBACK_CONTEXT = "📍 {name}\n📄 Pᴀɢᴇ {page}" # {name} and {page} should be HTML escaped before formatting
 BUTTON_BACK = "⬅️ Bᴀᴄᴋ"
 BUTTON_ROOT = "🏠 Rᴏᴏᴛ"
 # BUTTON_SEARCH_HERE = "🔍 Sᴇᴀʀᴄʜ Hᴇʀᴇ" # Removed
@@ -91,6 +94,70 @@ ERROR_SEND_UNEXPECTED = "❌ Uɴᴇxᴘᴇᴄᴛᴇᴅ ᴇʀʀᴏʀ ᴡʜɪʟᴇ
 ERROR_OS_CHECK_BEFORE_SEND = "🚫 OS ᴇʀʀᴏʀ ᴄʜᴇᴄᴋɪɴɢ ғɪʟᴇ ʙᴇғᴏʀᴇ sᴇɴᴅ."
 ERROR_SEND_NOT_A_VALID_FILE = "❌ <b>Eʀʀᴏʀ:</b> Tʜᴇ sᴘᴇᴄɪғɪᴇᴅ ᴘᴀᴛʜ ɪs ɴᴏᴛ ᴀ ᴠᴀʟɪᴅ ғɪʟᴇ ᴏʀ ɴᴏ ʟᴏɴɢᴇʀ ᴇxɪsᴛs."
 
+# --- Receiving Uploads ---
+UPLOAD_RECEIVING = "⬇️ Rᴇᴄᴇɪᴠɪɴɢ ғɪʟᴇ: <code>{name}</code>\n<i>Pʟᴇᴀsᴇ ᴡᴀɪᴛ...</i>"
+UPLOAD_SAVED = "✅ Sᴀᴠᴇᴅ ᴀs <code>{name}</code> ɪɴ <code>{path}</code> ({size})."
+ERROR_UPLOADS_DISABLED = "🚫 Uᴘʟᴏᴀᴅs ᴀʀᴇ ᴅɪsᴀʙʟᴇᴅ ᴏɴ ᴛʜɪs ʙᴏᴛ."
+ERROR_UPLOAD_TOO_LARGE = "🐘 <b>Eʀʀᴏʀ:</b> Fɪʟᴇ ɪs ᴛᴏᴏ ʟᴀʀɢᴇ ᴛᴏ ʀᴇᴄᴇɪᴠᴇ ({size}, ʟɪᴍɪᴛ {limit})."
+ERROR_UPLOAD_PERMISSION = "🚫 <b>Eʀʀᴏʀ:</b> Cᴏᴜʟᴅ ɴᴏᴛ sᴀᴠᴇ ᴛʜᴇ ғɪʟᴇ: ᴘᴇʀᴍɪssɪᴏɴ ᴅᴇɴɪᴇᴅ ɪɴ <code>{path}</code>."
+ERROR_UPLOAD_OS = "❌ <b>Eʀʀᴏʀ:</b> Cᴏᴜʟᴅ ɴᴏᴛ sᴀᴠᴇ ᴛʜᴇ ғɪʟᴇ: {error}"
+ERROR_UPLOAD_NETWORK = "⏳ Dᴏᴡɴʟᴏᴀᴅ ғʀᴏᴍ Tᴇʟᴇɢʀᴀᴍ ғᴀɪʟᴇᴅ. Pʟᴇᴀsᴇ sᴇɴᴅ ᴛʜᴇ ғɪʟᴇ ᴀɢᴀɪɴ."
+
+# --- Multi-Select ---
+BUTTON_SELECT_MODE = "☑️ Sᴇʟᴇᴄᴛ"
+BUTTON_SEND_SELECTED = "📤 Sᴇɴᴅ ({count})"
+BUTTON_CLEAR_SELECTION = "🧹 Cʟᴇᴀʀ"
+BUTTON_EXIT_SELECT_MODE = "✖️ Exɪᴛ"
+SELECT_MODE_CAPTION = "☑️ <b>Sᴇʟᴇᴄᴛɪᴏɴ ᴍᴏᴅᴇ:</b> {count} ғɪʟᴇ(s) sᴇʟᴇᴄᴛᴇᴅ. Tᴀᴘ ғɪʟᴇs ᴛᴏ ᴛɪᴄᴋ ᴛʜᴇᴍ, ᴛʜᴇɴ ᴘʀᴇss Sᴇɴᴅ."
+ALERT_SELECT_MODE_ON = "☑️ Sᴇʟᴇᴄᴛɪᴏɴ ᴍᴏᴅᴇ ᴏɴ. Tᴀᴘ ғɪʟᴇs ᴛᴏ sᴇʟᴇᴄᴛ ᴛʜᴇᴍ."
+ALERT_SELECT_MODE_OFF = "Sᴇʟᴇᴄᴛɪᴏɴ ᴍᴏᴅᴇ ᴏғғ."
+ALERT_ITEM_SELECTED = "✅ Sᴇʟᴇᴄᴛᴇᴅ: {name}"
+ALERT_ITEM_UNSELECTED = "➖ Uɴsᴇʟᴇᴄᴛᴇᴅ: {name}"
+ALERT_SELECTION_LIMIT = "⚠️ Yᴏᴜ ᴄᴀɴ sᴇʟᴇᴄᴛ ᴜᴘ ᴛᴏ {limit} ғɪʟᴇs ᴀᴛ ᴏɴᴄᴇ."
+ALERT_NOTHING_SELECTED = "⚠️ Nᴏ ғɪʟᴇs sᴇʟᴇᴄᴛᴇᴅ."
+ALERT_SELECTION_CLEARED = "🧹 Sᴇʟᴇᴄᴛɪᴏɴ ᴄʟᴇᴀʀᴇᴅ."
+BUTTON_SENDING_SELECTED = "⏳ Sᴇɴᴅɪɴɢ sᴇʟᴇᴄᴛᴇᴅ ғɪʟᴇs..."
+SENDING_SELECTED_FILES = "⬆️ Sᴇɴᴅɪɴɢ {count} ғɪʟᴇ(s) ɪɴ {batches} ʙᴀᴛᴄʜ(ᴇs)..."
+SEND_SELECTED_SUMMARY = "✅ Sᴇɴᴛ {sent} ᴏғ {count} sᴇʟᴇᴄᴛᴇᴅ ғɪʟᴇ(s)."
+SEND_SELECTED_FAILED = "⚠️ Fᴀɪʟᴇᴅ ᴛᴏ sᴇɴᴅ:"
+
+# --- Text Preview ---
+BUTTON_PREVIEW_MODE = "👁 Pʀᴇᴠɪᴇᴡ"
+BUTTON_EXIT_PREVIEW_MODE = "✖️ Exɪᴛ Pʀᴇᴠɪᴇᴡ"
+PREVIEW_MODE_CAPTION = "👁 <b>Pʀᴇᴠɪᴇᴡ ᴍᴏᴅᴇ:</b> ᴛᴀᴘ ᴀ ғɪʟᴇ ᴛᴏ ʀᴇᴀᴅ ɪᴛ ʜᴇʀᴇ."
+ALERT_PREVIEW_MODE_ON = "👁 Pʀᴇᴠɪᴇᴡ ᴍᴏᴅᴇ ᴏɴ. Tᴀᴘ ᴀ ᴛᴇxᴛ ғɪʟᴇ ᴛᴏ ᴠɪᴇᴡ ɪᴛ."
+ALERT_PREVIEW_MODE_OFF = "Pʀᴇᴠɪᴇᴡ ᴍᴏᴅᴇ ᴏғғ."
+BUTTON_OPENING_PREVIEW = "👁 Oᴘᴇɴɪɴɢ ᴘʀᴇᴠɪᴇᴡ: {name}"
+BUTTON_LOADING_LINES = "📄 Lᴏᴀᴅɪɴɢ ʟɪɴᴇs..."
+BUTTON_LOADING_TAIL = "⏭ Lᴏᴀᴅɪɴɢ ᴛʜᴇ ᴇɴᴅ ᴏғ ᴛʜᴇ ғɪʟᴇ..."
+BUTTON_PREVIEW_CLOSE = "✖️ Cʟᴏsᴇ"
+PREVIEW_HEADER = "👁 <b>Pʀᴇᴠɪᴇᴡ:</b> <code>{name}</code>"
+PREVIEW_LINES_INFO = "📄 Lɪɴᴇs {first}–{last} ᴏғ {total} · {size}"
+PREVIEW_TAIL_INFO = "📄 Lᴀsᴛ {count} ʟɪɴᴇs · {size}"
+PREVIEW_EMPTY_FILE = "<i>(ᴇᴍᴘᴛʏ ғɪʟᴇ)</i>"
+ERROR_PREVIEW_BINARY = "⚠️ Tʜɪs ʟᴏᴏᴋs ʟɪᴋᴇ ᴀ ʙɪɴᴀʀʏ ғɪʟᴇ. Pʀᴇᴠɪᴇᴡ ᴡᴏʀᴋs ғᴏʀ ᴛᴇxᴛ ғɪʟᴇs ᴏɴʟʏ."
+ERROR_PREVIEW_STALE = "⚠️ Tʜɪs ᴘʀᴇᴠɪᴇᴡ ɪs ᴏᴜᴛᴅᴀᴛᴇᴅ. Oᴘᴇɴ ᴛʜᴇ ғɪʟᴇ ᴀɢᴀɪɴ."
+
+# --- Live Follow ---
+BUTTON_FOLLOW_MODE = "📡 Fᴏʟʟᴏᴡ"
+BUTTON_EXIT_FOLLOW_MODE = "✖️ Exɪᴛ Fᴏʟʟᴏᴡ"
+FOLLOW_MODE_CAPTION = "📡 <b>Fᴏʟʟᴏᴡ ᴍᴏᴅᴇ:</b> ᴛᴀᴘ ᴀ ʟᴏɢ ғɪʟᴇ ᴛᴏ ᴡᴀᴛᴄʜ ɴᴇᴡ ʟɪɴᴇs ʟɪᴠᴇ."
+ALERT_FOLLOW_MODE_ON = "📡 Fᴏʟʟᴏᴡ ᴍᴏᴅᴇ ᴏɴ. Tᴀᴘ ᴀ ғɪʟᴇ ᴛᴏ ᴡᴀᴛᴄʜ ɪᴛ ʟɪᴠᴇ."
+ALERT_FOLLOW_MODE_OFF = "Fᴏʟʟᴏᴡ ᴍᴏᴅᴇ ᴏғғ."
+BUTTON_STARTING_FOLLOW = "📡 Fᴏʟʟᴏᴡɪɴɢ: {name}"
+BUTTON_FOLLOW_STOP = "⏹ Sᴛᴏᴘ"
+BUTTON_FOLLOW_STOPPING = "⏹ Sᴛᴏᴘᴘɪɴɢ..."
+FOLLOW_HEADER = "📡 <b>Fᴏʟʟᴏᴡɪɴɢ:</b> <code>{name}</code>"
+FOLLOW_STATUS = "🕒 Uᴘᴅᴀᴛᴇᴅ {time} · sᴛᴏᴘs ɪɴ {minutes} ᴍɪɴ"
+FOLLOW_STOPPED_HEADER = "⏹ <b>Sᴛᴏᴘᴘᴇᴅ ғᴏʟʟᴏᴡɪɴɢ</b> <code>{name}</code> ({reason})."
+FOLLOW_REASON_USER = "sᴛᴏᴘᴘᴇᴅ ʙʏ ʏᴏᴜ"
+FOLLOW_REASON_TIMEOUT = "ᴛɪᴍᴇᴅ ᴏᴜᴛ"
+FOLLOW_REASON_GONE = "ғɪʟᴇ ʀᴇᴍᴏᴠᴇᴅ"
+FOLLOW_REASON_SHUTDOWN = "ʙᴏᴛ ʀᴇsᴛᴀʀᴛɪɴɢ"
+FOLLOW_REASON_ERROR = "sᴛᴏᴘᴘᴇᴅ ᴀғᴛᴇʀ ᴀɴ ᴇʀʀᴏʀ"
+FOLLOW_NO_LINES = "<i>(ɴᴏ ʟɪɴᴇs ʏᴇᴛ)</i>"
+ERROR_FOLLOW_ENDED = "⚠️ Tʜɪs ғᴏʟʟᴏᴡ ʜᴀs ᴀʟʀᴇᴀᴅʏ ᴇɴᴅᴇᴅ."
+
 
 # --- Search (Automatic Text Search) ---
 SEARCH_PERFORMING = "⏳ Sᴇᴀʀᴄʜɪɴɢ ғᴏʀ <code>{term}</code> ɪɴ <code>{path}</code>..."
@@ -138,6 +205,50 @@ ADMIN_USER_ALREADY_ACCEPTED_NOTIFICATION = "ℹ️ Usᴇʀ {user_mention} (<code
 ADMIN_USER_REJECTED_NOTIFICATION = "🚫 Usᴇʀ {user_mention} (<code>{user_id}</code>) ᴀᴄᴄᴇss ʀᴇᴊᴇᴄᴛᴇᴅ (ɴᴏ ᴀᴄᴛɪᴏɴ ᴛᴀᴋᴇɴ)."
 ADMIN_CANNOT_SELF_MODIFY = "⚠️ Aᴅᴍɪɴ ᴄᴀɴɴᴏᴛ ᴍᴏᴅɪғʏ ᴛʜᴇɪʀ ᴏᴡɴ ᴀᴜᴛʜᴏʀɪᴢᴀᴛɪᴏɴ sᴛᴀᴛᴜs ᴛʜʀᴏᴜɢʜ ᴛʜɪs ᴍᴇᴛʜᴏᴅ."
 ERROR_ADDING_USER = "❌ Eʀʀᴏʀ ᴀᴅᴅɪɴɢ ᴜsᴇʀ ᴛᴏ ᴀᴜᴛʜᴏʀɪᴢᴀᴛɪᴏɴ ʟɪsᴛ."
+ADMIN_ONLY_COMMAND = "⛔ Tʜɪs ᴄᴏᴍᴍᴀɴᴅ ɪs ғᴏʀ ᴛʜᴇ Aᴅᴍɪɴ ᴏɴʟʏ."
+
+# Periodic summary of repeated attempts (one line per sender)
+ADMIN_UNAUTHORIZED_DIGEST_HEADER = (
+    "🔔 <b>Uɴᴀᴜᴛʜᴏʀɪᴢᴇᴅ Aᴄᴄᴇss Sᴜᴍᴍᴀʀʏ</b>\n"
+    "{attempts} ᴀᴛᴛᴇᴍᴘᴛ(s) ғʀᴏᴍ {users} ᴜsᴇʀ(s) ɪɴ ᴛʜᴇ ʟᴀsᴛ {minutes} ᴍɪɴ:\n"
+)
+ADMIN_UNAUTHORIZED_DIGEST_LINE = "👤 {user_mention} (<code>{user_id}</code>): {count}× — <code>{message_text}</code>"
+ADMIN_UNAUTHORIZED_DIGEST_SILENCED = " 🔇 ɴᴏ ʟᴏɴɢᴇʀ ᴀɴsᴡᴇʀᴇᴅ"
+ADMIN_UNAUTHORIZED_DIGEST_MORE = "… ᴀɴᴅ {count} ᴍᴏʀᴇ ᴜsᴇʀ(s)"
+BUTTON_DIGEST_ACCEPT = "✅ {user_id}"
+BUTTON_DIGEST_REJECT = "❌ {user_id}"
+
+# --- Admin Statistics (/stats) ---
+STATS_TITLE = "📊 <b>Bᴏᴛ Sᴛᴀᴛɪsᴛɪᴄs</b>"
+STATS_NOT_AVAILABLE = "ɴ/ᴀ"
+STATS_UPTIME = "⏱️ <b>Uᴘᴛɪᴍᴇ:</b> {uptime}  🧠 <b>RSS:</b> {rss}"
+STATS_SESSIONS = (
+    "👥 <b>Sᴇssɪᴏɴs:</b> {sessions} ({with_lists} ᴡɪᴛʜ ᴄᴀᴄʜᴇᴅ ʟɪsᴛs)\n"
+    "💾 <b>Sᴇssɪᴏɴ ᴍᴇᴍᴏʀʏ:</b> ~{memory} ᴏғ {budget}"
+)
+STATS_CACHES = (
+    "🗂️ <b>Cᴀᴄʜᴇs</b> (sɪᴢᴇ, ʜɪᴛ ʀᴀᴛɪᴏ)\n"
+    "  ғᴏʟᴅᴇʀ ʟɪsᴛɪɴɢs: {listings}, {listing_ratio}\n"
+    "  sᴇᴀʀᴄʜ ʀᴇsᴜʟᴛs: {searches} ({search_items} ɪᴛᴇᴍs)\n"
+    "  ғɪʟᴇ ɪᴅs: {file_ids}/{file_ids_max}, {file_id_ratio}\n"
+    "  ᴘʀᴇᴠɪᴇᴡ ɪɴᴅᴇxᴇs: {line_indexes}/{line_indexes_max}, {line_index_ratio}"
+)
+STATS_TRANSFERS = "📤 <b>Tʀᴀɴsғᴇʀs:</b> {active} ᴀᴄᴛɪᴠᴇ, {queued} ǫᴜᴇᴜᴇᴅ"
+STATS_API = "🌐 <b>Bᴏᴛ API:</b> {per_minute} ᴄᴀʟʟs/ᴍɪɴ, {rate_limited}× 429, {errors} ᴇʀʀᴏʀs, ᴘ50 {p50} / ᴘ95 {p95} ᴍs"
+STATS_HANDLERS = "⚙️ <b>Hᴀɴᴅʟᴇʀs:</b> {calls} ᴄᴀʟʟs, {errors} ᴇʀʀᴏʀs, ᴘ50 {p50} / ᴘ95 {p95} ᴍs"
+STATS_LOOP = "🔄 <b>Eᴠᴇɴᴛ ʟᴏᴏᴘ ʟᴀɢ:</b> {last_ms} ᴍs ɴᴏᴡ, {max_ms} ᴍs ᴍᴀx; {blocks} ʙʟᴏᴄᴋ(s) ᴏᴠᴇʀ {threshold_ms} ᴍs"
+STATS_LOOP_BLOCK = "  ⚠️ {duration_ms} ᴍs, {minutes_ago} ᴍɪɴ ᴀɢᴏ: <code>{stack}</code>"
+
+# --- Periodic top-errors report (Admin) ---
+ERROR_REPORT_HEADER = "🧯 <b>Tᴏᴘ ᴇʀʀᴏʀs ɪɴ ᴛʜᴇ ʟᴀsᴛ {minutes} ᴍɪɴ:</b> {total} ᴇʀʀᴏʀ(s), {distinct} ᴅɪsᴛɪɴᴄᴛ"
+ERROR_REPORT_LINE = "<b>{count}×</b> <code>{type}</code> ᴀᴛ <code>{location}</code> (ᴛᴏᴛᴀʟ {total})\n<code>{template}</code>"
+
+# --- Profiling (/profile) ---
+PROFILE_USAGE = "ℹ️ Usᴀɢᴇ: <code>/profile &lt;seconds&gt; [cprofile|sample]</code>"
+PROFILE_STARTED = "⏱️ Pʀᴏғɪʟɪɴɢ ғᴏʀ {seconds}s (<code>{mode}</code>). Tʜᴇ sᴜᴍᴍᴀʀʏ ᴡɪʟʟ ʙᴇ sᴇɴᴛ ʜᴇʀᴇ."
+PROFILE_BUSY = "⏳ A ᴘʀᴏғɪʟᴇ ɪs ᴀʟʀᴇᴀᴅʏ ʙᴇɪɴɢ ᴄᴀᴘᴛᴜʀᴇᴅ, ᴛʀʏ ᴀɢᴀɪɴ ᴡʜᴇɴ ɪᴛ ғɪɴɪsʜᴇs."
+PROFILE_DONE_CAPTION = "⏱️ Pʀᴏғɪʟᴇ: {mode}, {seconds}s" # Plain text (document caption)
+PROFILE_FAILED = "❌ Pʀᴏғɪʟɪɴɢ ғᴀɪʟᴇᴅ, sᴇᴇ ᴛʜᴇ ʟᴏɢ."
 
 # Made by: Zaky1million 😊♥️
 # For contact or project requests: https://t.me/Zaky1million
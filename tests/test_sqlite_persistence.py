@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of utils.sqlite_persistence: the one-time import of a PicklePersistence
+file (Bot references included), compact user rows written by
+utils.sessions.compact_session and loaded per user, and the batched flush of
+changed rows (unchanged rows are not written again).
+
+Run from the repository root:  python -m pytest tests  (or python tests/test_sqlite_persistence.py)
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config exits without these; the values are never used here
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:test")
+os.environ.setdefault("ADMIN_USER_ID", "1")
+
+from telegram import Bot # noqa: E402
+from telegram.ext import PersistenceInput, PicklePersistence # noqa: E402
+
+from config import (  # noqa: E402
+    BD_KEY_FILE_ID_CACHE, START_DIRECTORY_PATH, UD_KEY_CURRENT_PATH, UD_KEY_CURRENT_PAGE, UD_KEY_VIEW_ITEMS
+)
+from utils import metrics # noqa: E402
+from utils.sessions import compact_session # noqa: E402
+from utils.sqlite_persistence import SQLitePersistence # noqa: E402
+
+STORE = PersistenceInput(bot_data=True, chat_data=True, user_data=True, callback_data=False)
+TOKEN = "123:test"
+
+
+def open_persistence(directory: Path, **kwargs) -> SQLitePersistence:
+    persistence = SQLitePersistence(filepath=directory / "state.sqlite3", store_data=STORE, **kwargs)
+    persistence.set_bot(Bot(TOKEN))
+    return persistence
+
+
+async def write_legacy_pickle(path: Path) -> None:
+    """What PicklePersistence left behind: one file, Bot objects stored as persistent ids."""
+    legacy = PicklePersistence(path, store_data=STORE, single_file=True)
+    bot = Bot(TOKEN)
+    legacy.set_bot(bot)
+    await legacy.update_bot_data({
+        BD_KEY_FILE_ID_CACHE: {"/srv/a.txt": {"file_id": "A"}, "/srv/b.txt": {"file_id": "B"}},
+        "banner_file_id": "BANNER",
+    })
+    await legacy.update_user_data(7, {UD_KEY_CURRENT_PAGE: 3, "bot": bot})
+    await legacy.update_chat_data(-100, {"note": "group"})
+    await legacy.flush()
+
+
+async def run_legacy_import(directory: Path) -> None:
+    legacy_path = directory / "bot_persistence.pickle"
+    await write_legacy_pickle(legacy_path)
+
+    persistence = open_persistence(directory, legacy_pickle=legacy_path)
+    bot_data = await persistence.get_bot_data()
+    assert bot_data == {
+        BD_KEY_FILE_ID_CACHE: {"/srv/a.txt": {"file_id": "A"}, "/srv/b.txt": {"file_id": "B"}},
+        "banner_file_id": "BANNER",
+    }, bot_data
+    user_data = await persistence.get_user_data()
+    assert user_data[7][UD_KEY_CURRENT_PAGE] == 3, user_data
+    assert user_data[7]["bot"] is persistence.bot # Persistent id mapped to the current bot
+    assert (await persistence.get_chat_data()) == {-100: {"note": "group"}}
+    assert persistence.row_counts() == {"bot_data": 1, "cache_entries": 2, "user_data": 1, "chat_data": 1, "conversations": 0}
+    await persistence.flush()
+
+    # Imported once: a second start reads the database and leaves the pickle alone
+    legacy_path.write_bytes(b"not a pickle anymore")
+    reopened = open_persistence(directory, legacy_pickle=legacy_path)
+    assert (await reopened.get_bot_data())["banner_file_id"] == "BANNER"
+    assert reopened.row_counts()["cache_entries"] == 2
+    await reopened.flush()
+
+
+async def run_compact_user_rows(directory: Path) -> None:
+    persistence = open_persistence(directory, compact_user_data=compact_session)
+    await persistence.get_user_data()
+    browsing = {
+        UD_KEY_CURRENT_PATH: str(START_DIRECTORY_PATH / "docs" / "reports"),
+        UD_KEY_CURRENT_PAGE: 2,
+        UD_KEY_VIEW_ITEMS: [{"name": f"file{i}.txt"} for i in range(50)], # Never persisted
+    }
+    await persistence.update_user_data(1, browsing)
+    await persistence.update_user_data(2, {UD_KEY_VIEW_ITEMS: []}) # Nothing worth keeping: no row
+    await persistence.flush()
+
+    reopened = open_persistence(directory, compact_user_data=compact_session)
+    assert (await reopened.get_user_data()) == {} # Loaded per user, on their first update
+    stored = await reopened.load_user_data(1)
+    assert stored[:4] == ("docs/reports", 2, None, None), stored
+    assert await reopened.load_user_data(2) is None
+
+    # Same compact form again (same second, so the same last-active stamp): nothing written
+    with mock.patch("utils.sessions.time.time", return_value=stored[4] + 60):
+        await reopened.update_user_data(1, browsing) # New last-active stamp: one row
+        rows_before = metrics.get_counter("persistence_rows_written")
+        browsing[UD_KEY_VIEW_ITEMS] = [] # Only the dropped list changed
+        await reopened.update_user_data(1, browsing)
+        assert metrics.get_counter("persistence_rows_written") == rows_before
+
+    browsing.pop(UD_KEY_CURRENT_PATH) # Session gone: the row is deleted
+    await reopened.update_user_data(1, browsing)
+    assert await reopened.load_user_data(1) is None
+    await reopened.flush()
+
+
+async def run_batched_flush(directory: Path) -> None:
+    persistence = open_persistence(directory, batch_size=3)
+    bot_data = await persistence.get_bot_data()
+    bot_data[BD_KEY_FILE_ID_CACHE] = {f"/srv/{i}.bin": {"file_id": f"F{i}"} for i in range(10)}
+    bot_data["banner_file_id"] = "BANNER"
+
+    batches_before = metrics.get_counter("persistence_batches")
+    rows_before = metrics.get_counter("persistence_rows_written")
+    await persistence.update_bot_data(bot_data)
+    assert metrics.get_counter("persistence_rows_written") - rows_before == 11
+    assert metrics.get_counter("persistence_batches") - batches_before == 4 # 11 rows, 3 per transaction
+
+    # One entry changed, one removed: two rows, the rest is skipped as unchanged
+    bot_data[BD_KEY_FILE_ID_CACHE]["/srv/0.bin"] = {"file_id": "NEW"}
+    del bot_data[BD_KEY_FILE_ID_CACHE]["/srv/9.bin"]
+    rows_before = metrics.get_counter("persistence_rows_written")
+    await persistence.update_bot_data(bot_data)
+    assert metrics.get_counter("persistence_rows_written") - rows_before == 2
+    await persistence.flush()
+
+    reopened = open_persistence(directory)
+    reloaded = await reopened.get_bot_data()
+    cache = reloaded[BD_KEY_FILE_ID_CACHE]
+    assert len(cache) == 9 and cache["/srv/0.bin"] == {"file_id": "NEW"}, cache
+    assert list(cache)[-1] == "/srv/0.bin" # Rewritten last, so most recent in the cache's order
+    assert reloaded["banner_file_id"] == "BANNER"
+    await reopened.flush()
+    assert not Path(f"{reopened.filepath}-wal").exists() or Path(f"{reopened.filepath}-wal").stat().st_size == 0
+
+
+def run(scenario) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(scenario(Path(directory)))
+
+
+def test_legacy_pickle_import() -> None:
+    run(run_legacy_import)
+
+
+def test_compact_user_rows() -> None:
+    run(run_compact_user_rows)
+
+
+def test_batched_flush() -> None:
+    run(run_batched_flush)
+
+
+if __name__ == "__main__":
+    test_legacy_pickle_import()
+    test_compact_user_rows()
+    test_batched_flush()
+    print("SQLite persistence OK.")
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end check of webhook mode: serve_webhook runs against a stub Bot API
+(an AsyncHttpServer answering getMe, setWebhook and deleteWebhook), an
+update posted with the secret token reaches a handler, requests with a
+wrong or missing token are rejected with 403, and shutdown does not wait
+for the client's idle keep-alive connection.
+
+Run from the repository root:  python -m pytest tests  (or python tests/test_webhook.py)
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config exits without these; the values are never used here
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:test")
+os.environ.setdefault("ADMIN_USER_ID", "1")
+
+import httpx # noqa: E402
+from telegram import Update # noqa: E402
+from telegram.ext import Application, ContextTypes, TypeHandler # noqa: E402
+
+from utils import webhook # noqa: E402
+from utils.http_server import AsyncHttpServer, HttpRequest, HttpResponse # noqa: E402
+
+TOKEN = "123:stub"
+SECRET = "webhook-test-secret"
+SHUTDOWN_TIMEOUT = 5.0 # Seconds; a hang here means an open connection held the server
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def stub_bot_api(calls: list) -> AsyncHttpServer:
+    """Answers the Bot API methods serve_webhook and Application.initialize() use."""
+    results = {
+        "getMe": {"id": 123, "is_bot": True, "first_name": "Stub", "username": "stub_bot"},
+        "setWebhook": True,
+        "deleteWebhook": True,
+    }
+    server = AsyncHttpServer("127.0.0.1", 0)
+    for method, result in results.items():
+        async def answer(request: HttpRequest, method: str = method, result: object = result) -> HttpResponse:
+            calls.append(method)
+            return HttpResponse(200, json.dumps({"ok": True, "result": result}).encode(), "application/json")
+        server.add_route("POST", f"/bot{TOKEN}/{method}", answer)
+    return server
+
+
+def text_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": 1, "date": 0, "text": "hello",
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Tester"},
+        },
+    }
+
+
+async def run_webhook_roundtrip() -> None:
+    api_calls: list = []
+    api = stub_bot_api(api_calls)
+    await api.start()
+
+    port = free_port()
+    webhook.WEBHOOK_LISTEN, webhook.WEBHOOK_PORT, webhook.WEBHOOK_SECRET_TOKEN = "127.0.0.1", port, SECRET
+    webhook.WEBHOOK_URL = "https://example.invalid/telegram-webhook"
+
+    received: list = []
+    handled = asyncio.Event()
+
+    async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        received.append(update.update_id)
+        handled.set()
+
+    application = (
+        Application.builder().token(TOKEN)
+        .base_url(f"http://127.0.0.1:{api.bound_port}/bot")
+        .updater(None)
+        .build()
+    )
+    application.add_handler(TypeHandler(Update, record_update))
+
+    stop_event = asyncio.Event()
+    serving = asyncio.create_task(webhook.serve_webhook(application, stop_event))
+    url = f"http://127.0.0.1:{port}{webhook.WEBHOOK_PATH}"
+    try:
+        async with httpx.AsyncClient() as client: # Keeps its connection alive across the requests below
+            for _ in range(50): # Until the webhook server listens
+                try:
+                    await client.get(url)
+                    break
+                except httpx.ConnectError:
+                    await asyncio.sleep(0.05)
+
+            rejected = await client.post(url, json=text_update(1), headers={webhook.SECRET_HEADER: "wrong"})
+            assert rejected.status_code == 403, rejected.status_code
+            missing = await client.post(url, json=text_update(2))
+            assert missing.status_code == 403, missing.status_code
+
+            accepted = await client.post(url, json=text_update(3), headers={webhook.SECRET_HEADER: SECRET})
+            assert accepted.status_code == 200, accepted.status_code
+            await asyncio.wait_for(handled.wait(), timeout=5)
+            assert received == [3], received # The rejected updates never reached a handler
+            assert "setWebhook" in api_calls, api_calls
+
+            stop_event.set() # While the client's connection is still open
+            await asyncio.wait_for(serving, timeout=SHUTDOWN_TIMEOUT)
+    finally:
+        if not serving.done():
+            stop_event.set()
+            serving.cancel()
+        await api.stop()
+
+
+def test_webhook_roundtrip() -> None:
+    asyncio.run(run_webhook_roundtrip())
+
+
+if __name__ == "__main__":
+    test_webhook_roundtrip()
+    print("Webhook round trip OK.")
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
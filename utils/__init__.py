@@ -3,12 +3,12 @@
 
 from .auth_utils import is_authorized, add_authorized_user, load_authorized_users, save_authorized_users
 from .helpers import (
-    escape_html, truncate_filename, get_file_emoji,
+    escape_html, truncate_filename, get_file_emoji, format_size,
     get_safe_path, set_safe_path, create_callback_data,
     store_list_in_context, get_item_from_context,
-    send_or_edit_photo_message, handle_unauthorized_access
+    send_or_edit_photo_message, handle_unauthorized_access, send_with_banner
 )
-from .markup import generate_file_list_markup, create_navigation_buttons
+from .markup import generate_file_list_markup, create_navigation_buttons, create_mode_buttons
 from .search_utils import perform_search
 
 # Made by: Zaky1million 😊♥️
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Throttling of unauthorized access attempts. Each sender has a token bucket
+for the "access denied" replies they get, and after UNAUTH_SILENCE_AFTER
+attempts they get no reply at all. The admin is alerted at once only for a
+sender's first attempt (and at most UNAUTH_ADMIN_ALERTS_PER_HOUR times);
+everything else is collected and sent as one summary every
+UNAUTH_DIGEST_INTERVAL seconds, with accept/reject buttons per sender.
+"""
+import asyncio
+import html
+import logging
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, constants
+from telegram.ext import Application
+
+from config import (
+    ADMIN_USER_ID, CB_PREFIX_ACCEPT_USER, CB_PREFIX_REJECT_USER,
+    UNAUTH_REPLIES_PER_HOUR, UNAUTH_REPLY_BURST, UNAUTH_SILENCE_AFTER,
+    UNAUTH_ADMIN_ALERTS_PER_HOUR, UNAUTH_DIGEST_INTERVAL, UNAUTH_DIGEST_MAX_USERS,
+    UNAUTH_TRACKED_SENDERS, UNAUTH_FORGET_AFTER
+)
+import localization as loc
+from . import metrics
+from .rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TEXT_LENGTH = 40 # Characters of a sender's last message shown in the summary
+
+
+def _silenced(attempts: int) -> bool:
+    """The one place the silence threshold is compared: the first UNAUTH_SILENCE_AFTER attempts may get replies."""
+    return attempts > UNAUTH_SILENCE_AFTER
+
+
+class AttemptDecision(NamedTuple):
+    reply_to_sender: bool # Send the "access denied" message
+    alert_admin: bool # Send the full alert with buttons now (otherwise it goes into the next summary)
+    attempts: int # Attempts of this sender so far
+
+
+class _Sender:
+    __slots__ = ("user_id", "display_name", "attempts", "pending", "last_text", "last_seen", "reply_bucket")
+
+    def __init__(self, user_id: int, display_name: str):
+        self.user_id = user_id
+        self.display_name = display_name
+        self.attempts = 0
+        self.pending = 0 # Attempts not reported to the admin yet
+        self.last_text = ""
+        self.last_seen = 0.0
+        # A rate of 0 (or less) means no replies at all, not just none after the burst
+        self.reply_bucket = TokenBucket(max(UNAUTH_REPLIES_PER_HOUR, 0) / 3600, UNAUTH_REPLY_BURST if UNAUTH_REPLIES_PER_HOUR > 0 else 0)
+
+
+class UnauthorizedAccessGuard:
+    def __init__(self, admin_id: int = ADMIN_USER_ID, digest_interval: float = UNAUTH_DIGEST_INTERVAL):
+        self.admin_id = admin_id
+        self.digest_interval = digest_interval
+        self._senders: "OrderedDict[int, _Sender]" = OrderedDict() # Least recently seen first
+        self._admin_alerts = TokenBucket(max(UNAUTH_ADMIN_ALERTS_PER_HOUR, 0) / 3600, max(UNAUTH_ADMIN_ALERTS_PER_HOUR, 0))
+        self._digest_task: Optional["asyncio.Task[None]"] = None
+
+    def record(self, user_id: int, display_name: str, text: str) -> AttemptDecision:
+        """Counts one attempt and decides who hears about it. No I/O."""
+        now = time.monotonic()
+        sender = self._senders.get(user_id)
+        if sender is None:
+            sender = self._senders[user_id] = _Sender(user_id, display_name)
+            while len(self._senders) > UNAUTH_TRACKED_SENDERS:
+                self._senders.popitem(last=False)
+        else:
+            self._senders.move_to_end(user_id)
+        sender.display_name = display_name
+        sender.attempts += 1
+        sender.last_text = text
+        sender.last_seen = now
+        metrics.increment("unauthorized_attempts")
+
+        alert_admin = sender.attempts == 1 and self._admin_alerts.delay(now) == 0
+        if alert_admin:
+            self._admin_alerts.take()
+        else:
+            sender.pending += 1
+
+        if _silenced(sender.attempts):
+            reply_to_sender = False
+            metrics.increment("unauthorized_silenced")
+        else:
+            reply_to_sender = sender.reply_bucket.delay(now) == 0
+            if reply_to_sender:
+                sender.reply_bucket.take()
+            else:
+                metrics.increment("unauthorized_replies_throttled")
+        return AttemptDecision(reply_to_sender, alert_admin, sender.attempts)
+
+    def is_silenced(self, user_id: int) -> bool:
+        """True if the sender's next attempt gets no reply (asked before that attempt is recorded)."""
+        sender = self._senders.get(user_id)
+        return sender is not None and _silenced(sender.attempts + 1)
+
+    def forget(self, user_id: int) -> None:
+        """Drops a sender's history (after the admin accepted them)."""
+        self._senders.pop(user_id, None)
+
+    def _prune(self, now: float) -> None:
+        while self._senders:
+            oldest = next(iter(self._senders.values()))
+            if now - oldest.last_seen < UNAUTH_FORGET_AFTER:
+                break
+            self._senders.popitem(last=False)
+
+    def build_digest(self) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+        """Summary of the attempts since the previous one, or None if there were none. Resets the counts."""
+        now = time.monotonic()
+        reported = sorted((s for s in self._senders.values() if s.pending), key=lambda s: s.pending, reverse=True)
+        if not reported:
+            self._prune(now)
+            return None
+
+        lines: List[str] = [loc.ADMIN_UNAUTHORIZED_DIGEST_HEADER.format(
+            attempts=sum(s.pending for s in reported), users=len(reported),
+            minutes=max(1, round(self.digest_interval / 60))
+        )]
+        keyboard: List[List[InlineKeyboardButton]] = []
+        for sender in reported[:UNAUTH_DIGEST_MAX_USERS]:
+            text = sender.last_text
+            if len(text) > DIGEST_TEXT_LENGTH:
+                text = text[:DIGEST_TEXT_LENGTH - 1] + "…"
+            line = loc.ADMIN_UNAUTHORIZED_DIGEST_LINE.format(
+                user_mention=f"<a href='tg://user?id={sender.user_id}'>{html.escape(sender.display_name, quote=False)}</a>",
+                user_id=sender.user_id,
+                count=sender.pending,
+                message_text=html.escape(text, quote=False) if text else "N/A"
+            )
+            if _silenced(sender.attempts + 1):
+                line += loc.ADMIN_UNAUTHORIZED_DIGEST_SILENCED
+            lines.append(line)
+            keyboard.append([
+                InlineKeyboardButton(loc.BUTTON_DIGEST_ACCEPT.format(user_id=sender.user_id), callback_data=f"{CB_PREFIX_ACCEPT_USER}{sender.user_id}"),
+                InlineKeyboardButton(loc.BUTTON_DIGEST_REJECT.format(user_id=sender.user_id), callback_data=f"{CB_PREFIX_REJECT_USER}{sender.user_id}"),
+            ])
+        if len(reported) > UNAUTH_DIGEST_MAX_USERS:
+            lines.append(loc.ADMIN_UNAUTHORIZED_DIGEST_MORE.format(count=len(reported) - UNAUTH_DIGEST_MAX_USERS))
+
+        for sender in reported:
+            sender.pending = 0
+        self._prune(now)
+        return "\n".join(lines), InlineKeyboardMarkup(keyboard)
+
+    async def send_digest(self, application: Application) -> bool:
+        digest = self.build_digest()
+        if digest is None or not self.admin_id:
+            return False
+        text, reply_markup = digest
+        try:
+            await application.bot.send_message(
+                chat_id=self.admin_id, text=text, reply_markup=reply_markup, parse_mode=constants.ParseMode.HTML
+            )
+        except Exception as e:
+            logger.error(f"Failed to send unauthorized access summary to Admin {self.admin_id}: {e}")
+            return False
+        metrics.increment("unauthorized_digests_sent")
+        return True
+
+    async def _digest_loop(self, application: Application) -> None:
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            await self.send_digest(application)
+
+    def start(self, application: Application) -> None:
+        if self._digest_task is None or self._digest_task.done():
+            self._digest_task = asyncio.create_task(self._digest_loop(application))
+
+    async def stop(self) -> None:
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+            try:
+                await self._digest_task
+            except asyncio.CancelledError:
+                pass
+            self._digest_task = None
+
+
+unauthorized_guard = UnauthorizedAccessGuard()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -1,96 +1,214 @@
 # -*- coding: utf-8 -*-
 """
-Utility functions for managing authorized users.
+Authorization of users. `auth_service` keeps the allowlist (admin plus the
+IDs in AUTHORIZED_USERS_FILE) as an immutable frozenset, so the check done
+on every update is a set lookup without any I/O. The JSON file is the only
+source of truth: changes are written atomically (temp file + rename) and
+edits made to the file while the bot runs are picked up automatically.
 """
+import asyncio
 import json
 import logging
+import os
+import tempfile
+import time
 from pathlib import Path
-from typing import Set, Optional
+from typing import FrozenSet, Iterable, Optional, Tuple
 
 from telegram import Update
-from telegram.ext import ContextTypes
+from telegram.ext import Application, ContextTypes
 
 from config import ADMIN_USER_ID, AUTHORIZED_USERS_FILE
+from .follow_utils import ChangeNotifier
 
 logger = logging.getLogger(__name__)
 
-def load_authorized_users(context: ContextTypes.DEFAULT_TYPE) -> Set[int]:
-    """Loads authorized user IDs from the JSON file into bot_data."""
-    if 'authorized_ids' in context.bot_data:
-        return context.bot_data['authorized_ids']
+LEGACY_BOT_DATA_KEY = 'authorized_ids' # Where older versions kept a copy of the IDs (PicklePersistence)
+WATCH_TIMEOUT = 60.0 # Seconds between checks when no change notification arrives
 
-    auth_file = Path(AUTHORIZED_USERS_FILE)
-    user_ids: Set[int] = set()
-    if auth_file.exists():
+
+class AuthService:
+    def __init__(self, file_path: Path = Path(AUTHORIZED_USERS_FILE), admin_id: int = ADMIN_USER_ID):
+        self.file_path = file_path
+        self.admin_id = admin_id
+        self._authorized_ids: FrozenSet[int] = frozenset()
+        self._allowed: FrozenSet[int] = frozenset({admin_id})
+        self._file_signature: Optional[Tuple[int, int]] = None # (mtime_ns, size) of the file last read or written
+        self._watch_task: Optional["asyncio.Task[None]"] = None
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def authorized_ids(self) -> FrozenSet[int]:
+        """Additional (non-admin) authorized user IDs."""
+        return self._authorized_ids
+
+    def is_allowed(self, user_id: int) -> bool:
+        return user_id in self._allowed
+
+    def _swap(self, user_ids: FrozenSet[int]) -> None:
+        self._authorized_ids = user_ids
+        self._allowed = user_ids | {self.admin_id}
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat_result = self.file_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat_result.st_mtime_ns, stat_result.st_size
+
+    def _read_file(self) -> Optional[FrozenSet[int]]:
+        """IDs stored in the file; None if it is missing or unreadable (the current set is then kept)."""
         try:
-            with open(auth_file, 'r', encoding='utf-8') as f:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                if isinstance(data, list): # Legacy format
-                    user_ids = set(filter(lambda x: isinstance(x, int), data))
-                elif isinstance(data, dict) and "authorized_ids" in data: # New format
-                     user_ids = set(filter(lambda x: isinstance(x, int), data.get("authorized_ids", [])))
-                else: # Also new format, simple list
-                     user_ids = set(filter(lambda x: isinstance(x, int), data))
-
-
-            logger.info(f"Loaded {len(user_ids)} additional authorized user IDs from {AUTHORIZED_USERS_FILE}.")
-        except json.JSONDecodeError:
-            logger.error(f"Error decoding JSON from {AUTHORIZED_USERS_FILE}. File might be corrupted.")
-            # Create new if corrupted
-            with open(auth_file, 'w', encoding='utf-8') as f:
-                json.dump({"authorized_ids": []}, f, indent=2)
-            logger.info(f"Created a new empty {AUTHORIZED_USERS_FILE}.")
-        except Exception as e:
-            logger.error(f"Failed to load {AUTHORIZED_USERS_FILE}: {e}")
-    else:
-        logger.warning(f"{AUTHORIZED_USERS_FILE} not found. Creating a new one.")
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.error(f"Error decoding JSON from {self.file_path}: {e}. Keeping the current authorized users.")
+            return None
+        except OSError as e:
+            logger.error(f"Failed to read {self.file_path}: {e}")
+            return None
+        if isinstance(data, dict): # {"authorized_ids": [...]}
+            data = data.get("authorized_ids", [])
+        if not isinstance(data, list): # Legacy format is a plain list
+            logger.error(f"Unexpected content in {self.file_path}. Keeping the current authorized users.")
+            return None
+        return frozenset(x for x in data if isinstance(x, int) and not isinstance(x, bool))
+
+    def _write_file(self, user_ids: FrozenSet[int]) -> bool:
+        """Writes to a temporary file next to the real one, then renames it over it."""
+        directory = self.file_path.parent
         try:
-            with open(auth_file, 'w', encoding='utf-8') as f:
-                json.dump({"authorized_ids": []}, f, indent=2)
-            logger.info(f"Created a new empty {AUTHORIZED_USERS_FILE}.")
-        except Exception as e:
-            logger.error(f"Could not create {AUTHORIZED_USERS_FILE}: {e}")
-
-    context.bot_data['authorized_ids'] = user_ids
-    return user_ids
-
-def save_authorized_users(context: ContextTypes.DEFAULT_TYPE):
-    """Saves the current set of authorized user IDs from bot_data to the JSON file."""
-    user_ids: Set[int] = context.bot_data.get('authorized_ids', set())
-    auth_file = Path(AUTHORIZED_USERS_FILE)
-    try:
-        with open(auth_file, 'w', encoding='utf-8') as f:
-            json.dump({"authorized_ids": sorted(list(user_ids))}, f, indent=2)
-        logger.info(f"Saved {len(user_ids)} additional authorized user IDs to {AUTHORIZED_USERS_FILE}.")
-    except Exception as e:
-        logger.error(f"Failed to save {AUTHORIZED_USERS_FILE}: {e}")
-
-def add_authorized_user(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> bool:
-    """Adds a user ID to the authorized list and saves."""
-    if not isinstance(user_id, int):
-        logger.warning(f"Attempted to add non-integer user_id: {user_id}")
-        return False
-    user_ids = load_authorized_users(context) # Ensure it's loaded
-    if user_id not in user_ids:
-        user_ids.add(user_id)
-        context.bot_data['authorized_ids'] = user_ids
-        save_authorized_users(context)
+            fd, temp_path = tempfile.mkstemp(prefix=f".{self.file_path.name}.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({"authorized_ids": sorted(user_ids)}, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                try:
+                    os.chmod(temp_path, self.file_path.stat().st_mode & 0o7777) # Keep the permissions of the file it replaces
+                except FileNotFoundError:
+                    pass
+                os.replace(temp_path, self.file_path)
+            except BaseException:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.error(f"Failed to save {self.file_path}: {e}")
+            return False
+        self._file_signature = self._signature()
+        return True
+
+    def load(self, legacy_ids: Iterable[int] = ()) -> FrozenSet[int]:
+        """
+        Initial load. IDs found only in `legacy_ids` (the copy older versions kept
+        in bot_data) are merged into the file, so nobody loses access on upgrade.
+        """
+        started = time.perf_counter()
+        self._file_signature = self._signature()
+        file_ids = self._read_file()
+        user_ids = file_ids or frozenset()
+        legacy_only = frozenset(x for x in legacy_ids if isinstance(x, int)) - user_ids
+        if legacy_only:
+            user_ids = user_ids | legacy_only
+            logger.info(f"Merging {len(legacy_only)} authorized user ID(s) from the old persistence file into {self.file_path}.")
+        if legacy_only or (file_ids is None and self._file_signature is None):
+            self._write_file(user_ids)
+        self._swap(user_ids)
+        logger.info(f"Loaded {len(user_ids)} additional authorized user IDs from {self.file_path} in {(time.perf_counter() - started) * 1000:.1f} ms.")
+        return user_ids
+
+    def reload_if_changed(self) -> bool:
+        """Re-reads the file if it changed since it was last read or written. Returns True on reload."""
+        signature = self._signature()
+        if signature is None or signature == self._file_signature:
+            return False
+        started = time.perf_counter()
+        user_ids = self._read_file()
+        if user_ids is None: # Half-written or broken; the next change event retries
+            return False
+        self._file_signature = signature
+        added, removed = user_ids - self._authorized_ids, self._authorized_ids - user_ids
+        self._swap(user_ids)
+        logger.info(
+            f"Reloaded {self.file_path} in {(time.perf_counter() - started) * 1000:.1f} ms: "
+            f"{len(user_ids)} authorized user IDs (+{len(added)} / -{len(removed)})."
+        )
+        return True
+
+    async def add(self, user_id: int) -> bool:
+        """Authorizes `user_id` and saves. False if already authorized or the file couldn't be written."""
+        if not isinstance(user_id, int):
+            logger.warning(f"Attempted to add non-integer user_id: {user_id}")
+            return False
+        async with self._write_lock: # Two approvals at once must not both write the old set plus one ID
+            self.reload_if_changed() # Don't overwrite a manual edit the watcher hasn't seen yet
+            if user_id in self._authorized_ids:
+                logger.info(f"User ID {user_id} is already authorized.")
+                return False
+            user_ids = self._authorized_ids | {user_id}
+            if not await asyncio.to_thread(self._write_file, user_ids): # fsync + rename off the event loop
+                return False
+            self._swap(user_ids)
         logger.info(f"User ID {user_id} added to authorized list.")
         return True
-    logger.info(f"User ID {user_id} is already authorized.")
-    return False # Already authorized
+
+    async def save(self) -> bool:
+        async with self._write_lock:
+            return await asyncio.to_thread(self._write_file, self._authorized_ids)
+
+    async def _watch(self) -> None:
+        notifier = ChangeNotifier(self.file_path)
+        logger.info(f"Watching {self.file_path} for changes ({'inotify' if notifier.uses_inotify else 'polling'}).")
+        try:
+            while True:
+                await notifier.wait(WATCH_TIMEOUT)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.error(f"Reloading {self.file_path} failed: {e}")
+        finally:
+            notifier.close()
+
+    def start_watching(self) -> None:
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+
+auth_service = AuthService()
+
+
+def load_authorized_users(application: Application) -> FrozenSet[int]:
+    """Startup: loads the allowlist and retires the copy older versions kept in bot_data."""
+    legacy_ids = application.bot_data.pop(LEGACY_BOT_DATA_KEY, None) or ()
+    return auth_service.load(legacy_ids)
+
+async def save_authorized_users(context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Writes the current allowlist to the JSON file (atomically, in a worker thread)."""
+    return await auth_service.save()
+
+async def add_authorized_user(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> bool:
+    """Adds a user ID to the authorized list and saves."""
+    return await auth_service.add(user_id)
 
 async def is_authorized(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
-    """Checks if the user sending the update is the admin or in the dynamic authorized list."""
+    """Checks if the user sending the update is the admin or in the authorized list (no I/O)."""
     if not update.effective_user:
         return False
-    user_id = update.effective_user.id
-
-    if user_id == ADMIN_USER_ID:
-        return True
-
-    additional_authorized_ids = load_authorized_users(context)
-    return user_id in additional_authorized_ids
+    return auth_service.is_allowed(update.effective_user.id)
 
 # Made by: Zaky1million 😊♥️
 # For contact or project requests: https://t.me/Zaky1million
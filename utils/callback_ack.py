@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Callback query acknowledgement contract. Every callback query is answered
+exactly once and within CALLBACK_ANSWER_DEADLINE, so the client's spinner
+stops quickly and late answers never fail with "query is too old".
+Heavy work (folder listings, file sends) runs afterwards as an Application
+task, which is awaited on shutdown and reports errors to error_handler.
+Re-renders of the folder view go through `render_coalescer`, so a burst of
+taps renders only the last target. Serialized deferred work and renders run
+under the user's lock of PerUserUpdateProcessor, like the user's updates.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Coroutine, Dict, Optional, Tuple
+
+from telegram import CallbackQuery, Update
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+from config import CALLBACK_ANSWER_DEADLINE, CALLBACK_COALESCE_WINDOW
+from . import metrics
+from .update_processor import PerUserUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+ANSWERED_IDS_MAX = 2048 # Query ids remembered so repeated answers become no-ops
+
+_answered_ids: "OrderedDict[str, None]" = OrderedDict()
+_render_tails: Dict[int, "asyncio.Task[Any]"] = {} # user_id -> last deferred render of that user
+
+
+def is_answered(query: CallbackQuery) -> bool:
+    return query.id in _answered_ids
+
+def _mark_answered(query: CallbackQuery) -> None:
+    _answered_ids[query.id] = None
+    while len(_answered_ids) > ANSWERED_IDS_MAX:
+        _answered_ids.popitem(last=False)
+
+async def answer_query(
+    query: CallbackQuery, text: Optional[str] = None, show_alert: bool = False, source: str = "handler"
+) -> bool:
+    """
+    Answers `query` unless it was already answered. Returns False when the
+    answer was skipped or Telegram refused it (query too old).
+    """
+    if is_answered(query):
+        if text:
+            logger.debug(f"Callback {query.id} already answered; dropped text '{text}'.")
+        return False
+    _mark_answered(query) # Before the await, so a concurrent deadline answer can't double up
+    try:
+        await query.answer(text=text, show_alert=show_alert)
+    except BadRequest as e:
+        metrics.increment("callback_answers_failed")
+        logger.debug(f"Answering callback {query.id} failed (likely too old): {e}")
+        return False
+    metrics.increment("callback_answers", source=source)
+    return True
+
+@asynccontextmanager
+async def answer_deadline(query: CallbackQuery, deadline: float = CALLBACK_ANSWER_DEADLINE) -> AsyncIterator[None]:
+    """
+    Wraps the handling of one callback query: if the handler has not answered
+    within `deadline` seconds, an empty answer is sent for it. Whatever is
+    still unanswered when the block exits gets an empty answer too.
+    """
+    started = time.monotonic()
+
+    async def answer_when_late() -> None:
+        await asyncio.sleep(deadline)
+        if not is_answered(query):
+            logger.warning(f"Callback '{query.data}' not answered within {deadline}s; answering empty.")
+            await asyncio.shield(answer_query(query, source="deadline"))
+
+    timer = asyncio.create_task(answer_when_late())
+    try:
+        yield
+    finally:
+        timer.cancel()
+        if not is_answered(query):
+            await answer_query(query, source="fallback")
+        if time.monotonic() - started > deadline:
+            metrics.increment("callback_handling_slow")
+
+def user_lock(update: Update, context: ContextTypes.DEFAULT_TYPE) -> AsyncContextManager[None]:
+    """The per-user lock the user's updates run under, so deferred work never overlaps their next update."""
+    processor = context.application.update_processor
+    if isinstance(processor, PerUserUpdateProcessor):
+        return processor.serialized(update)
+    return nullcontext()
+
+def defer(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, coroutine: Coroutine[Any, Any, Any], serialize: bool = True
+) -> "asyncio.Task[Any]":
+    """
+    Runs `coroutine` as an Application task once the callback was answered.
+    With `serialize`, a user's deferred work runs in click order (renders of the
+    same message must not overtake each other) and under the user's lock, as
+    it reads and writes their user_data. File sends pass serialize=False so
+    they don't hold up browsing; such work must leave user_data alone.
+    """
+    user_id = update.effective_user.id if update.effective_user else None
+    if not serialize or user_id is None:
+        return context.application.create_task(coroutine, update=update)
+
+    previous = _render_tails.get(user_id)
+
+    async def run_in_order() -> Any:
+        started = False
+        try:
+            if previous is not None and not previous.done():
+                await asyncio.wait([previous]) # Its errors were already reported
+            async with user_lock(update, context): # Acquired once the handler that deferred this has returned
+                started = True
+                return await coroutine
+        finally:
+            if not started:
+                coroutine.close() # Cancelled before starting: avoid "never awaited"
+
+    task = context.application.create_task(run_in_order(), update=update)
+    _render_tails[user_id] = task
+
+    def forget(done_task: "asyncio.Task[Any]") -> None:
+        if _render_tails.get(user_id) is done_task:
+            del _render_tails[user_id]
+
+    task.add_done_callback(forget)
+    return task
+
+
+class RenderCoalescer:
+    """
+    At most one folder-view render per user. A newer navigation click cancels
+    the render of an older one, whether it is still waiting or already running.
+    The first click of a burst renders at once; clicks that follow within
+    `window` seconds wait out the window, so a burst ends in a single render.
+    Only the render itself holds the user's lock, not the wait before it.
+    """
+
+    def __init__(self, window: float = CALLBACK_COALESCE_WINDOW):
+        self.window = window
+        self._renders: Dict[int, Tuple["asyncio.Task[Any]", Optional[int], float]] = {} # user_id -> (task, target page, submitted at)
+
+    def pending_page(self, user_id: int) -> Optional[int]:
+        """Target page of the user's render that hasn't finished yet (None if idle or unknown)."""
+        current = self._renders.get(user_id)
+        if current and not current[0].done():
+            return current[1]
+        return None
+
+    def submit(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        render: Callable[[], Awaitable[Any]],
+        page: Optional[int] = None
+    ) -> "asyncio.Task[Any]":
+        """
+        Schedules `render()` (a factory, so a render cancelled before it starts
+        never creates its coroutine). `page` is the page the render will show.
+        """
+        user_id = update.effective_user.id
+        now = time.monotonic()
+        previous = self._renders.get(user_id)
+        in_burst = previous is not None and (not previous[0].done() or now - previous[2] < self.window)
+        if previous and not previous[0].done():
+            previous[0].cancel()
+            metrics.increment("callback_renders_coalesced")
+
+        async def run_latest() -> Any:
+            if previous is not None and not previous[0].done():
+                await asyncio.wait([previous[0]]) # Let the cancelled render unwind first
+            if in_burst:
+                await asyncio.sleep(self.window)
+            async with user_lock(update, context):
+                return await render()
+
+        task = context.application.create_task(run_latest(), update=update)
+        self._renders[user_id] = (task, page, now)
+        # Kept for one more window after the render, so the next click still counts as part of the burst
+        task.add_done_callback(
+            lambda done_task: asyncio.get_running_loop().call_later(self.window, self._forget, user_id, done_task)
+        )
+        return task
+
+    def _forget(self, user_id: int, done_task: "asyncio.Task[Any]") -> None:
+        current = self._renders.get(user_id)
+        if current and current[0] is done_task:
+            del self._renders[user_id]
+
+
+render_coalescer = RenderCoalescer()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Table-driven router for callback data. Callback data is a fixed-width
+opcode (CB_PREFIX_* in config, OPCODE_WIDTH characters) followed by the
+payload, so finding the route is one dict lookup instead of a chain of
+prefix comparisons. Each route declares how its payload is parsed and
+which authorization level it needs; the dispatcher enforces both.
+Callback data of older versions (longer, colon-terminated prefixes) is
+accepted through aliases, so buttons already sitting in chats keep working.
+"""
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+OPCODE_WIDTH = 2
+
+AUTH_USER = "user" # Admin or any authorized user
+AUTH_ADMIN = "admin" # ADMIN_USER_ID only
+
+RouteHandler = Callable[..., Awaitable[Any]]
+PayloadParser = Callable[[str], Any]
+
+
+class InvalidPayload(ValueError):
+    """Raised by payload parsers for payloads a route can't use."""
+
+
+def index_payload(payload: str) -> int:
+    """Non-negative integer payload (list indexes, pages, user ids)."""
+    try:
+        value = int(payload)
+    except ValueError:
+        raise InvalidPayload(payload)
+    if value < 0:
+        raise InvalidPayload(payload)
+    return value
+
+def step_payload(payload: str) -> Tuple[bool, int]:
+    """(is_relative, value): "+n" / "-n" is a step from the current position, a plain number is absolute."""
+    is_relative = payload[:1] in ("+", "-")
+    try:
+        value = int(payload)
+    except ValueError:
+        raise InvalidPayload(payload)
+    if not is_relative and value < 0:
+        raise InvalidPayload(payload)
+    return is_relative, value
+
+def text_payload(payload: str) -> str:
+    """Raw payload; the handler validates it itself."""
+    return payload
+
+
+class Route(NamedTuple):
+    opcode: str
+    name: str # Used as the metrics label
+    handler: RouteHandler
+    parse_payload: Optional[PayloadParser] # None: the route takes no payload (anything after the opcode is ignored)
+    auth: str
+    repeatable: bool # False: an identical tap right after the previous one is dropped as a double tap
+
+
+class CallbackRouter:
+    def __init__(self):
+        self._routes: Dict[str, Route] = {}
+        self._aliases: Dict[str, List[Tuple[str, str]]] = {} # First OPCODE_WIDTH chars -> [(old prefix, opcode)], longest first
+
+    def register(
+        self,
+        opcode: str,
+        name: str,
+        handler: RouteHandler,
+        parse_payload: Optional[PayloadParser] = None,
+        auth: str = AUTH_USER,
+        repeatable: bool = False
+    ) -> None:
+        """
+        Adds a route. The handler is awaited as handler(update, context), or
+        handler(update, context, parsed_payload) when `parse_payload` is given.
+        """
+        if len(opcode) != OPCODE_WIDTH:
+            raise ValueError(f"Callback opcode '{opcode}' must be {OPCODE_WIDTH} characters long.")
+        if opcode in self._routes:
+            raise ValueError(f"Callback opcode '{opcode}' already registered for '{self._routes[opcode].name}'.")
+        self._routes[opcode] = Route(opcode, name, handler, parse_payload, auth, repeatable)
+
+    def register_alias(self, old_prefix: str, opcode: str) -> None:
+        """Routes callback data starting with `old_prefix` (a former prefix) to the route of `opcode`."""
+        if opcode not in self._routes:
+            raise ValueError(f"Callback alias '{old_prefix}' points to unregistered opcode '{opcode}'.")
+        aliases = self._aliases.setdefault(old_prefix[:OPCODE_WIDTH], [])
+        aliases.append((old_prefix, opcode))
+        aliases.sort(key=lambda alias: len(alias[0]), reverse=True)
+
+    def resolve(self, data: str) -> Optional[Tuple[Route, str]]:
+        """Returns (route, raw payload), or None for unknown callback data."""
+        for old_prefix, opcode in self._aliases.get(data[:OPCODE_WIDTH], ()):
+            if data.startswith(old_prefix):
+                metrics.increment("callback_legacy_data", prefix=old_prefix)
+                return self._routes[opcode], data[len(old_prefix):]
+        route = self._routes.get(data[:OPCODE_WIDTH])
+        if route is None:
+            return None
+        return route, data[OPCODE_WIDTH:]
+
+    @staticmethod
+    def parse(route: Route, raw_payload: str) -> Any:
+        """Parsed payload for `route`; raises InvalidPayload."""
+        return route.parse_payload(raw_payload) if route.parse_payload else None
+
+    @staticmethod
+    async def call(route: Route, update: Any, context: Any, payload: Any) -> None:
+        """Runs the route handler and records its latency, errors and calls in flight."""
+        metrics.add_gauge("callback_route_in_flight", 1, route=route.name)
+        started = time.perf_counter()
+        try:
+            if route.parse_payload:
+                await route.handler(update, context, payload)
+            else:
+                await route.handler(update, context)
+        except Exception:
+            metrics.increment("callback_route_errors", route=route.name)
+            raise
+        finally:
+            metrics.add_gauge("callback_route_in_flight", -1, route=route.name)
+            metrics.observe("callback_route_seconds", time.perf_counter() - started, route=route.name)
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
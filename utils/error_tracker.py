@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Deduplication of errors reaching the global error handler. Each error is
+fingerprinted by its type, the innermost frame in the bot's own code and its
+message with the variable parts (numbers, paths, quoted values) masked, and
+counted in an LRU of ERROR_TRACKER_SIZE fingerprints. Per fingerprint and
+ERROR_DEDUP_WINDOW, only the first occurrence is logged with its traceback
+and each chat is told about the failure once. Every ERROR_REPORT_INTERVAL
+seconds the admin gets the most frequent errors since the previous report.
+"""
+import asyncio
+import hashlib
+import html
+import logging
+import os
+import re
+import time
+import traceback
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional, Set
+
+from telegram import constants
+from telegram.ext import Application
+
+from config import ADMIN_USER_ID, ERROR_TRACKER_SIZE, ERROR_DEDUP_WINDOW, ERROR_REPORT_INTERVAL, ERROR_REPORT_TOP_N
+import localization as loc
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_OWN_CODE_PREFIX = str(PROJECT_ROOT) + os.sep
+_LIBRARY_MARKERS = (f"{os.sep}site-packages{os.sep}", f"{os.sep}dist-packages{os.sep}")
+TEMPLATE_LENGTH = 120 # Characters of the message template kept (and shown in the report)
+MAX_NOTIFIED_CHATS = 256 # Chats remembered per fingerprint and window
+
+_MASKS = (
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "'…'"), # Quoted values (file names, callback data)
+    (re.compile(r"(?:[A-Za-z]:)?[\\/][^\s:,;)]+"), "<path>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<n>"),
+)
+
+
+def message_template(error: BaseException) -> str:
+    """str(error) with numbers, paths and quoted values masked, so repeats of one failure look the same."""
+    template = str(error)
+    for pattern, replacement in _MASKS:
+        template = pattern.sub(replacement, template)
+    return template[:TEMPLATE_LENGTH]
+
+
+def is_own_code(filename: str) -> bool:
+    """Whether a code object's co_filename is the bot's own code: under PROJECT_ROOT, not an installed library (a .venv/ inside it)."""
+    return filename.startswith(_OWN_CODE_PREFIX) and not any(marker in filename for marker in _LIBRARY_MARKERS)
+
+
+def error_location(error: BaseException) -> str:
+    """file:function of the innermost traceback frame in the bot's own code (else the innermost frame)."""
+    codes = [frame.f_code for frame, _ in traceback.walk_tb(error.__traceback__)] # No source lines read
+    if not codes:
+        return "?"
+    own = [code for code in codes if is_own_code(code.co_filename)]
+    code = (own or codes)[-1]
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class ErrorOccurrence(NamedTuple):
+    fingerprint: str
+    first_in_window: bool # Log the traceback
+    count_in_window: int
+
+
+class _ErrorStats:
+    __slots__ = ("type_name", "location", "template", "total", "window_start", "window_count", "since_report", "notified_chats")
+
+    def __init__(self, type_name: str, location: str, template: str):
+        self.type_name = type_name
+        self.location = location
+        self.template = template
+        self.total = 0
+        self.window_start = 0.0
+        self.window_count = 0
+        self.since_report = 0
+        self.notified_chats: Set[int] = set()
+
+
+class ErrorTracker:
+    def __init__(
+        self, capacity: int = ERROR_TRACKER_SIZE, window: float = ERROR_DEDUP_WINDOW,
+        admin_id: int = ADMIN_USER_ID, report_interval: float = ERROR_REPORT_INTERVAL
+    ):
+        self.capacity = capacity
+        self.window = window
+        self.admin_id = admin_id
+        self.report_interval = report_interval
+        self._errors: "OrderedDict[str, _ErrorStats]" = OrderedDict() # Least recently seen first
+        self._report_task: Optional["asyncio.Task[None]"] = None
+
+    def record(self, error: BaseException) -> ErrorOccurrence:
+        type_name = type(error).__name__
+        location = error_location(error)
+        template = message_template(error)
+        fingerprint = hashlib.sha1(f"{type_name}|{location}|{template}".encode('utf-8')).hexdigest()[:10]
+
+        stats = self._errors.get(fingerprint)
+        if stats is None:
+            stats = self._errors[fingerprint] = _ErrorStats(type_name, location, template)
+            if len(self._errors) > self.capacity:
+                self._errors.popitem(last=False)
+        else:
+            self._errors.move_to_end(fingerprint)
+
+        now = time.monotonic()
+        first_in_window = stats.window_count == 0 or now - stats.window_start >= self.window
+        if first_in_window:
+            stats.window_start = now
+            stats.window_count = 0
+            stats.notified_chats.clear()
+        stats.total += 1
+        stats.window_count += 1
+        stats.since_report += 1
+        metrics.increment("errors", type=type_name)
+        return ErrorOccurrence(fingerprint, first_in_window, stats.window_count)
+
+    def should_notify(self, fingerprint: str, chat_id: int) -> bool:
+        """True the first time a chat hits this error in the current window."""
+        stats = self._errors.get(fingerprint)
+        if stats is None:
+            return True
+        if chat_id in stats.notified_chats:
+            metrics.increment("error_notifications_suppressed")
+            return False
+        if len(stats.notified_chats) < MAX_NOTIFIED_CHATS:
+            stats.notified_chats.add(chat_id)
+        return True
+
+    def build_report(self) -> Optional[str]:
+        """Top errors since the previous report (and resets the counts); None if there were none."""
+        reported = [(fingerprint, stats) for fingerprint, stats in self._errors.items() if stats.since_report]
+        if not reported:
+            return None
+        reported.sort(key=lambda item: item[1].since_report, reverse=True)
+        lines = [loc.ERROR_REPORT_HEADER.format(
+            total=sum(stats.since_report for _, stats in reported), distinct=len(reported),
+            minutes=max(1, round(self.report_interval / 60))
+        )]
+        for fingerprint, stats in reported[:ERROR_REPORT_TOP_N]:
+            lines.append(loc.ERROR_REPORT_LINE.format(
+                count=stats.since_report, type=html.escape(stats.type_name, quote=False), location=html.escape(stats.location, quote=False),
+                template=html.escape(stats.template, quote=False), fingerprint=fingerprint, total=stats.total
+            ))
+        for _, stats in reported:
+            stats.since_report = 0
+        return "\n\n".join(lines)
+
+    async def send_report(self, application: Application) -> bool:
+        report = self.build_report()
+        if report is None or not self.admin_id:
+            return False
+        try:
+            await application.bot.send_message(chat_id=self.admin_id, text=report, parse_mode=constants.ParseMode.HTML)
+        except Exception as e:
+            logger.error(f"Failed to send the error report to Admin {self.admin_id}: {e}")
+            return False
+        metrics.increment("error_reports_sent")
+        return True
+
+    async def _report_loop(self, application: Application) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            await self.send_report(application)
+
+    def start(self, application: Application) -> None:
+        if self.report_interval <= 0:
+            return
+        if self._report_task is None or self._report_task.done():
+            self._report_task = asyncio.create_task(self._report_loop(application))
+
+    async def stop(self) -> None:
+        if self._report_task is not None:
+            self._report_task.cancel()
+            try:
+                await self._report_task
+            except asyncio.CancelledError:
+                pass
+            self._report_task = None
+
+
+error_tracker = ErrorTracker()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
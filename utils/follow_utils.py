@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Building blocks for following a growing file (like `tail -F`):
+an inotify-based change notifier (with a polling fallback where inotify
+is unavailable) and a reader that tracks the file offset and survives
+log rotation and truncation.
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+from collections import deque
+from pathlib import Path
+from typing import Deque, List, Optional
+
+from config import FOLLOW_LINES, FOLLOW_MAX_READ_BYTES, FOLLOW_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+_EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, len
+_DIR_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+ROTATION_MARKER = "─── file rotated ───"
+TRUNCATION_MARKER = "─── file truncated ───"
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1 # Raises AttributeError where inotify doesn't exist
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+_libc = _load_libc()
+
+
+class ChangeNotifier:
+    """
+    Wakes up when a file changes. Watches the file's directory with inotify
+    (so a rotated log being replaced by a new file is noticed too) and only
+    reacts to events for that file name. Falls back to fixed-interval polling.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_name = os.fsencode(file_path.name)
+        self._event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._fd: Optional[int] = None
+        if _libc is None:
+            return
+        fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            logger.warning(f"inotify_init1 failed (errno {ctypes.get_errno()}). Polling {file_path} instead.")
+            return
+        if _libc.inotify_add_watch(fd, os.fsencode(str(file_path.parent)), _DIR_WATCH_MASK) < 0:
+            logger.warning(f"inotify_add_watch failed for {file_path.parent} (errno {ctypes.get_errno()}). Polling instead.")
+            os.close(fd)
+            return
+        self._fd = fd
+        self._loop.add_reader(fd, self._on_readable)
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def _on_readable(self) -> None:
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.warning(f"Reading inotify events failed: {e}")
+            return
+        position = 0
+        while position + _EVENT_HEADER.size <= len(buffer):
+            _, mask, _, name_length = _EVENT_HEADER.unpack_from(buffer, position)
+            name = buffer[position + _EVENT_HEADER.size:position + _EVENT_HEADER.size + name_length].rstrip(b"\0")
+            position += _EVENT_HEADER.size + name_length
+            if name == self.file_name or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._event.set()
+
+    async def wait(self, timeout: float) -> None:
+        """Returns after a change (inotify) or after `timeout`/poll interval, whichever is first."""
+        if self._fd is None:
+            timeout = min(timeout, FOLLOW_POLL_INTERVAL)
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+    def close(self) -> None:
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+
+class FileFollower:
+    """
+    Reads what was appended to a file since the last call and keeps the last
+    FOLLOW_LINES lines. Detects rotation (the path now points to another inode)
+    and truncation (the file shrank) and continues from the start of the new content.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self.lines: Deque[str] = deque(maxlen=FOLLOW_LINES)
+        self._partial = b""
+        self._file = None
+        self._inode: Optional[int] = None
+        self.offset = 0
+
+    def _open(self, from_end: bool) -> None:
+        self._file = open(self.file_path, 'rb')
+        stat_result = os.fstat(self._file.fileno())
+        self._inode = stat_result.st_ino
+        self.offset = max(0, stat_result.st_size - FOLLOW_MAX_READ_BYTES) if from_end else 0
+        if self.offset > 0:
+            # Start on a line boundary
+            self._file.seek(self.offset - 1)
+            skipped = self._file.readline()
+            self.offset += len(skipped) - 1
+        self._file.seek(self.offset)
+
+    def _close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _consume(self, data: bytes) -> None:
+        data = self._partial + data
+        *complete_lines, self._partial = data.split(b"\n")
+        for raw_line in complete_lines:
+            self.lines.append(raw_line.decode('utf-8', errors='replace'))
+
+    def _read_available(self) -> bool:
+        stat_result = os.fstat(self._file.fileno())
+        if stat_result.st_size < self.offset:
+            self.lines.append(TRUNCATION_MARKER)
+            self._partial = b""
+            self.offset = 0
+            self._file.seek(0)
+        unread = stat_result.st_size - self.offset
+        if unread <= 0:
+            return False
+        if unread > FOLLOW_MAX_READ_BYTES:
+            # Burst bigger than we could ever show: skip ahead, only the last lines matter
+            self.offset = stat_result.st_size - FOLLOW_MAX_READ_BYTES
+            self._file.seek(self.offset)
+            self._partial = b""
+        data = self._file.read(FOLLOW_MAX_READ_BYTES)
+        self.offset += len(data)
+        self._consume(data)
+        return bool(data)
+
+    def start(self) -> None:
+        """Opens the file near its end and loads the initial tail. Blocking."""
+        self._open(from_end=True)
+        self._read_available()
+
+    def poll(self) -> bool:
+        """Reads new content; returns True if the visible lines changed. Blocking."""
+        changed = self._read_available()
+        try:
+            current_inode = self.file_path.stat().st_ino
+        except FileNotFoundError:
+            return changed # Rotated away and not recreated yet; keep the old handle
+        if current_inode != self._inode:
+            changed = self._read_available() or changed # Drain whatever was written before rotation
+            self._close()
+            self.lines.append(ROTATION_MARKER)
+            self._partial = b""
+            self._open(from_end=False)
+            self._read_available()
+            changed = True
+        return changed
+
+    def visible_lines(self) -> List[str]:
+        lines = list(self.lines)
+        if self._partial:
+            lines.append(self._partial.decode('utf-8', errors='replace'))
+        return lines
+
+    def close(self) -> None:
+        self._close()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
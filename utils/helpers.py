@@ -4,22 +4,26 @@ Utility functions for path handling, text formatting, photo messages, etc.
 """
 
 import os
+import asyncio
 import logging
 import html # Python's html module
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Union, Callable, Awaitable
 
-from telegram import Update, InlineKeyboardMarkup, InputMediaPhoto, constants, InlineKeyboardButton
+from telegram import Update, InlineKeyboardMarkup, InputMediaPhoto, constants, InlineKeyboardButton, Message
 from telegram.ext import ContextTypes
 from telegram.error import BadRequest
 
 from config import (
     START_DIRECTORY_PATH, MAX_FILENAME_DISPLAY_LENGTH,
-    MAX_CALLBACK_DATA_LENGTH, UD_KEY_CURRENT_PATH, BOT_IMAGE_URL,
-    UD_KEY_CURRENT_MESSAGE_ID, ADMIN_USER_ID,
+    MAX_CALLBACK_DATA_LENGTH, UD_KEY_CURRENT_PATH, BOT_IMAGE_URL, BOT_IMAGE_PATH,
+    UD_KEY_CURRENT_MESSAGE_ID, ADMIN_USER_ID, BD_KEY_BANNER_FILE_ID,
     CB_PREFIX_ACCEPT_USER, CB_PREFIX_REJECT_USER, CB_PREFIX_DISMISS_ADMIN_MSG
 )
 import localization as loc
+from . import metrics
+from .message_state import message_state_tracker, MessageState, EDIT_NONE, EDIT_REPLY_MARKUP, EDIT_CAPTION, EDIT_MEDIA
+from .access_guard import unauthorized_guard
 # No more 'is_authorized' import from auth_utils here, it will be imported directly where needed.
 
 logger = logging.getLogger(__name__)
@@ -35,6 +39,13 @@ def truncate_filename(filename: str, max_len: int = MAX_FILENAME_DISPLAY_LENGTH)
         return filename[:max_len-1] + "…"
     return filename
 
+def format_size(num_bytes: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
 def get_file_emoji(filename: str) -> str:
     ext = filename.lower().split('.')[-1] if '.' in filename else ''
     emoji_map = {
@@ -112,6 +123,109 @@ def get_item_from_context(context: ContextTypes.DEFAULT_TYPE, key: str, index: i
     return None
 
 # --- Photo Message Helper ---
+# --- Banner Photo ---
+# The banner is uploaded once (from BOT_IMAGE_PATH or BOT_IMAGE_URL) and then
+# re-sent by file_id, so Telegram doesn't fetch the external URL on every step.
+_BANNER_FILE_ID_ERRORS = ("file identifier", "file reference", "file_reference", "file_id")
+
+_banner_source_cache: Optional[Tuple[str, Union[str, Path]]] = None
+
+def _banner_source() -> Tuple[str, Union[str, Path]]:
+    """
+    Returns (cache key, upload source) for the configured banner image.
+    Computed once per process (a stat of BOT_IMAGE_PATH), not on every render:
+    a replaced image file is picked up on the next restart.
+    """
+    global _banner_source_cache
+    if _banner_source_cache is None:
+        _banner_source_cache = f"url:{BOT_IMAGE_URL}", BOT_IMAGE_URL
+        if BOT_IMAGE_PATH:
+            image_path = Path(BOT_IMAGE_PATH)
+            try:
+                stat_result = image_path.stat()
+                _banner_source_cache = f"path:{image_path.resolve()}:{stat_result.st_size}:{stat_result.st_mtime_ns}", image_path
+            except OSError as e:
+                logger.warning(f"BOT_IMAGE_PATH '{BOT_IMAGE_PATH}' is not readable ({e}). Using BOT_IMAGE_URL.")
+    return _banner_source_cache
+
+async def load_banner_source() -> None:
+    """Computes the banner cache key off the event loop, at startup."""
+    await asyncio.to_thread(_banner_source)
+
+def get_banner_photo(context: ContextTypes.DEFAULT_TYPE) -> Tuple[Union[str, Path], bool]:
+    """Returns (photo to send, whether it is a cached file_id)."""
+    source_key, upload_source = _banner_source()
+    cached = context.bot_data.get(BD_KEY_BANNER_FILE_ID)
+    if cached and cached.get("source") == source_key and cached.get("file_id"):
+        return cached["file_id"], True
+    return upload_source, False
+
+def remember_banner_file_id(context: ContextTypes.DEFAULT_TYPE, message: Any) -> None:
+    """Stores the banner file_id from a sent/edited photo message (bot_data is persisted)."""
+    if not isinstance(message, Message) or not message.photo:
+        return
+    source_key, _ = _banner_source()
+    file_id = message.photo[-1].file_id
+    cached = context.bot_data.get(BD_KEY_BANNER_FILE_ID)
+    if not cached or cached.get("source") != source_key or cached.get("file_id") != file_id:
+        context.bot_data[BD_KEY_BANNER_FILE_ID] = {"source": source_key, "file_id": file_id}
+        logger.info(f"Banner photo cached as file_id for {source_key}.")
+
+async def send_with_banner(
+    context: ContextTypes.DEFAULT_TYPE,
+    send_call: Callable[[Union[str, Path]], Awaitable[Any]]
+) -> Any:
+    """
+    Calls `send_call(photo)` with the cached banner file_id (or the upload source).
+    If Telegram rejects the cached file_id, it is dropped and the banner is uploaded again.
+    """
+    photo, from_cache = get_banner_photo(context)
+    try:
+        result = await send_call(photo)
+    except BadRequest as e:
+        if not from_cache or not any(marker in str(e).lower() for marker in _BANNER_FILE_ID_ERRORS):
+            raise
+        logger.warning(f"Cached banner file_id rejected ({e}). Uploading the banner again.")
+        context.bot_data.pop(BD_KEY_BANNER_FILE_ID, None)
+        photo, _ = get_banner_photo(context)
+        result = await send_call(photo)
+    remember_banner_file_id(context, result)
+    return result
+
+async def _edit_photo_message(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: int,
+    message_id: int,
+    caption: str,
+    reply_markup: Optional[InlineKeyboardMarkup],
+    new_state: MessageState
+) -> None:
+    """Applies the cheapest edit that makes the message show `new_state`. Raises like the bot API calls."""
+    edit_call = message_state_tracker.plan(chat_id, message_id, new_state)
+    if edit_call != EDIT_NONE:
+        # Unknown until the edit returns: if it is cancelled (a coalesced render) or fails, the next plan is a full edit
+        message_state_tracker.forget(chat_id, message_id)
+    if edit_call == EDIT_NONE:
+        logger.debug(f"Photo message {message_id} already up to date, no API call.")
+    elif edit_call == EDIT_REPLY_MARKUP:
+        await context.bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=reply_markup)
+    elif edit_call == EDIT_CAPTION:
+        await context.bot.edit_message_caption(
+            chat_id=chat_id, message_id=message_id, caption=caption,
+            reply_markup=reply_markup, parse_mode=constants.ParseMode.HTML
+        )
+    else:
+        await send_with_banner(context, lambda photo: context.bot.edit_message_media(
+            chat_id=chat_id,
+            message_id=message_id,
+            media=InputMediaPhoto(media=photo, caption=caption, parse_mode=constants.ParseMode.HTML),
+            reply_markup=reply_markup
+        ))
+    metrics.increment("message_edits", method=edit_call)
+    if edit_call != EDIT_MEDIA:
+        metrics.increment("message_edits_avoided", replaced_by=edit_call) # edit_message_media calls saved
+    message_state_tracker.remember(chat_id, message_id, new_state)
+
 async def send_or_edit_photo_message(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
@@ -120,33 +234,31 @@ async def send_or_edit_photo_message(
     reply_markup: Optional[InlineKeyboardMarkup],
     edit_existing: bool = True
 ) -> Optional[int]:
-    photo_url_to_use = BOT_IMAGE_URL
     message_id_to_edit = context.user_data.get(UD_KEY_CURRENT_MESSAGE_ID) if edit_existing else None
     new_message_id = None
+    new_state = message_state_tracker.fingerprint(_banner_source()[0], caption, reply_markup)
 
     if message_id_to_edit and update.callback_query: # Only edit if triggered by a callback (button press)
         try:
-            media = InputMediaPhoto(media=photo_url_to_use, caption=caption, parse_mode=constants.ParseMode.HTML)
-            await context.bot.edit_message_media(
-                chat_id=chat_id,
-                message_id=message_id_to_edit,
-                media=media,
-                reply_markup=reply_markup
-            )
+            await _edit_photo_message(context, chat_id, message_id_to_edit, caption, reply_markup, new_state)
             logger.debug(f"Photo message {message_id_to_edit} edited.")
             new_message_id = message_id_to_edit
         except BadRequest as e:
             if "Message is not modified" in str(e):
                 logger.debug(f"Photo message {message_id_to_edit} not modified.")
+                message_state_tracker.remember(chat_id, message_id_to_edit, new_state)
                 new_message_id = message_id_to_edit
             elif "message to edit not found" in str(e).lower():
                 logger.warning(f"Photo message {message_id_to_edit} to edit not found. Will send new.")
+                message_state_tracker.forget(chat_id, message_id_to_edit)
                 message_id_to_edit = None # Force send new
             else:
                 logger.warning(f"BadRequest editing photo message {message_id_to_edit}: {e}. Will send new.")
+                message_state_tracker.forget(chat_id, message_id_to_edit)
                 message_id_to_edit = None # Force send new
         except Exception as e: # Other errors during edit
             logger.error(f"Error editing photo message {message_id_to_edit}: {e}. Will send new.")
+            message_state_tracker.forget(chat_id, message_id_to_edit)
             message_id_to_edit = None # Force send new
     else: # Not editing or not a callback context
         message_id_to_edit = None
@@ -163,14 +275,15 @@ async def send_or_edit_photo_message(
                  logger.warning(f"Could not delete old message {old_msg_id_for_del} after edit failed: {del_e}")
         
         try:
-            sent_message = await context.bot.send_photo(
+            sent_message = await send_with_banner(context, lambda photo: context.bot.send_photo(
                 chat_id=chat_id,
-                photo=photo_url_to_use,
+                photo=photo,
                 caption=caption,
                 reply_markup=reply_markup,
                 parse_mode=constants.ParseMode.HTML
-            )
+            ))
             new_message_id = sent_message.message_id
+            message_state_tracker.remember(chat_id, new_message_id, new_state)
             logger.debug(f"New photo message {new_message_id} sent.")
         except Exception as e:
             logger.error(f"Failed to send new photo message: {e}")
@@ -201,21 +314,27 @@ async def handle_unauthorized_access(update: Update, context: ContextTypes.DEFAU
     elif update.callback_query and update.callback_query.data:
         attempted_message_text = f"Callback: {update.callback_query.data}"
 
-    logger.warning(
-        f"UNAUTHORIZED ACCESS ATTEMPT by {user_info}. Message: '{escape_html(attempted_message_text)}'"
-    )
-
-    try:
-        await send_or_edit_photo_message(
-            update, context, chat_id,
-            caption=loc.ACCESS_DENIED_PHOTO,
-            reply_markup=None,
-            edit_existing=False # Always send new message to unauthorized user
+    # Repeated attempts are throttled: fewer replies to the sender, one summary for the admin
+    decision = unauthorized_guard.record(user.id, user.full_name or str(user.id), attempted_message_text)
+    if decision.reply_to_sender or decision.alert_admin:
+        logger.warning(
+            f"UNAUTHORIZED ACCESS ATTEMPT by {user_info} (attempt {decision.attempts}). Message: '{escape_html(attempted_message_text)}'"
         )
-    except Exception as e:
-        logger.error(f"Failed to send access denied message to user {user.id}: {e}")
+    else:
+        logger.debug(f"Unauthorized attempt {decision.attempts} by {user.id}; left for the admin summary.")
 
-    if ADMIN_USER_ID: # From config
+    if decision.reply_to_sender:
+        try:
+            await send_or_edit_photo_message(
+                update, context, chat_id,
+                caption=loc.ACCESS_DENIED_PHOTO,
+                reply_markup=None,
+                edit_existing=False # Always send new message to unauthorized user
+            )
+        except Exception as e:
+            logger.error(f"Failed to send access denied message to user {user.id}: {e}")
+
+    if ADMIN_USER_ID and decision.alert_admin: # From config
         admin_message_caption = loc.ADMIN_UNAUTHORIZED_ATTEMPT.format(
             user_mention=user_mention,
             user_id=user.id,
@@ -235,13 +354,13 @@ async def handle_unauthorized_access(update: Update, context: ContextTypes.DEFAU
         admin_reply_markup_val = InlineKeyboardMarkup([admin_buttons_row]) if admin_buttons_row else None
 
         try:
-            await context.bot.send_photo( # Send as new message to admin
+            await send_with_banner(context, lambda photo: context.bot.send_photo( # Send as new message to admin
                 chat_id=ADMIN_USER_ID,
-                photo=BOT_IMAGE_URL,
+                photo=photo,
                 caption=admin_message_caption,
                 reply_markup=admin_reply_markup_val,
                 parse_mode=constants.ParseMode.HTML
-            )
+            ))
         except Exception as e:
             logger.error(f"Failed to send unauthorized attempt notification to Admin {ADMIN_USER_ID}: {e}")
 
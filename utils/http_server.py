@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+A small HTTP/1.1 server on top of asyncio streams, used for the webhook
+endpoint (and other internal endpoints) without extra dependencies.
+Supports keep-alive and Content-Length bodies only, which is all
+Telegram's webhook delivery needs.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUEST_LINE = 8192
+MAX_HEADERS = 100
+MAX_BODY_SIZE = 1024 * 1024 # Updates are small; anything bigger is rejected
+KEEP_ALIVE_TIMEOUT = 75.0 # Seconds an idle connection is kept open
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+class HttpRequest(NamedTuple):
+    method: str
+    path: str
+    query: Dict[str, list]
+    headers: Dict[str, str] # Lower-case names
+    body: bytes
+
+
+class HttpResponse(NamedTuple):
+    status: int
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+
+
+RouteHandler = Callable[[HttpRequest], Awaitable[HttpResponse]]
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int):
+        self.status = status
+
+
+class AsyncHttpServer:
+    """Routes requests by exact (method, path) to async handlers."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._routes: Dict[Tuple[str, str], RouteHandler] = {}
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._connections: Set["asyncio.Task[None]"] = set()
+
+    def add_route(self, method: str, path: str, handler: RouteHandler) -> None:
+        self._routes[(method.upper(), path)] = handler
+
+    @property
+    def bound_port(self) -> Optional[int]:
+        """The real port (useful when started with port 0)."""
+        if not self._server or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"HTTP server listening on {self.host}:{self.bound_port} ({', '.join(p for _, p in self._routes)}).")
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close() # No new connections from here on
+        # Open (idle keep-alive) connections first: wait_closed() waits for them on newer Pythons
+        for connection_task in list(self._connections):
+            connection_task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server:
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[HttpRequest, bool]]:
+        """Reads one request. Returns None when the client closed the connection."""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=KEEP_ALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        if not request_line:
+            return None
+        if len(request_line) > MAX_REQUEST_LINE:
+            raise _BadRequest(400)
+        try:
+            method, target, version = request_line.decode('latin-1').strip().split(" ", 2)
+        except ValueError:
+            raise _BadRequest(400)
+
+        headers: Dict[str, str] = {}
+        while True:
+            header_line = await reader.readline()
+            if header_line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS or len(header_line) > MAX_REQUEST_LINE:
+                raise _BadRequest(400)
+            name, _, value = header_line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            content_length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise _BadRequest(400)
+        if content_length < 0:
+            raise _BadRequest(400)
+        if content_length > MAX_BODY_SIZE:
+            raise _BadRequest(413)
+        body = await reader.readexactly(content_length) if content_length else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        url = urlsplit(target)
+        return HttpRequest(method.upper(), url.path, parse_qs(url.query), headers, body), keep_alive
+
+    async def _dispatch(self, request: HttpRequest) -> HttpResponse:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            known_path = any(path == request.path for _, path in self._routes)
+            return HttpResponse(405 if known_path else 404)
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.exception(f"Error handling {request.method} {request.path}: {e}")
+            return HttpResponse(500)
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, response: HttpResponse, keep_alive: bool) -> None:
+        head = (
+            f"HTTP/1.1 {response.status} {_REASONS.get(response.status, 'Unknown')}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            f"Content-Length: {len(response.body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + response.body)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection_task = asyncio.current_task()
+        self._connections.add(connection_task)
+        try:
+            while True:
+                try:
+                    parsed = await self._read_request(reader)
+                except _BadRequest as e:
+                    self._write_response(writer, HttpResponse(e.status), keep_alive=False)
+                    await writer.drain()
+                    break
+                if parsed is None:
+                    break
+                request, keep_alive = parsed
+                response = await self._dispatch(request)
+                self._write_response(writer, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass # Client went away or sent garbage
+        except asyncio.CancelledError:
+            pass # Server stopping
+        finally:
+            self._connections.discard(connection_task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Non-blocking logging. Loggers only put records on a bounded in-memory queue
+(QueueHandler); a QueueListener thread formats them and writes the rotating
+log file and the console. Tracebacks are formatted on that thread as well.
+INFO/DEBUG records of hot-path loggers can be sampled (LOG_SAMPLING) before
+they are even queued. LOG_FORMAT=json writes one JSON object per line.
+"""
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import LOG_FILE_NAME, LOG_FORMAT, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE, LOG_SAMPLING
+from . import metrics
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+TEXT_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+CONSOLE_FORMAT = "%(levelname)s: %(name)s - %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parse_sampling(spec: str) -> Dict[str, int]:
+    """'handlers.common_handlers=10,foo=5' -> {'handlers.common_handlers': 10, 'foo': 5} (keep 1 record in N)."""
+    rates: Dict[str, int] = {}
+    for entry in spec.split(","):
+        name, _, rate = entry.strip().partition("=")
+        try:
+            if name and int(rate) > 1:
+                rates[name] = int(rate)
+        except ValueError:
+            print(f"WARNING: ignoring invalid LOG_SAMPLING entry '{entry}'", file=sys.stderr)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in N INFO/DEBUG records of the configured loggers (and their children); WARNING and above always pass."""
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, Iterator[int]] = {}
+        self._resolved: Dict[str, Optional[Tuple[str, int]]] = {} # Logger name -> configured (prefix, rate), cached
+
+    def _rule_for(self, name: str) -> Optional[Tuple[str, int]]:
+        if name not in self._resolved:
+            matches = [prefix for prefix in self.rates if name == prefix or name.startswith(prefix + ".")]
+            prefix = max(matches, key=len) if matches else None
+            self._resolved[name] = (prefix, self.rates[prefix]) if prefix else None
+        return self._resolved[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rule = self._rule_for(record.name)
+        if rule is None:
+            return True
+        prefix, rate = rule
+        counter = self._counters.get(prefix)
+        if counter is None:
+            counter = self._counters[prefix] = itertools.count()
+        if next(counter) % rate == 0:
+            return True
+        metrics.increment("log_records_sampled_out", logger=prefix)
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them (the stdlib version formats,
+    tracebacks included, on the caller's thread) and drops them when the
+    queue is full rather than blocking the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage() # Arguments may be mutated after the call returns
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("log_records_dropped")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg and, if any, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(
+    level: int = logging.INFO, log_file: str = LOG_FILE_NAME, log_format: str = LOG_FORMAT, sampling: str = LOG_SAMPLING,
+    console: bool = True
+) -> logging.handlers.QueueListener:
+    """Replaces the root logger's handlers with the queue pipeline and starts the listener thread."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    if log_format == "json":
+        file_handler.setFormatter(JsonLinesFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATE_FORMAT))
+    handlers: List[logging.Handler] = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(logging.WARNING)
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sampling(sampling)))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging) # Writes whatever is still queued
+    return _listener
+
+
+def stop_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Event loop watchdog. A task wakes up every LOOP_LAG_INTERVAL seconds and
+records how late it was woken (the scheduling lag every handler sees at that
+moment). While a wake-up is overdue by more than LOOP_BLOCK_THRESHOLD, a
+helper thread samples the event loop thread's stack, so a blocking call
+(a large scandir, a synchronous search, ...) is reported with the code that
+made it. Metrics are only written from the loop thread, once it runs again.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from types import FrameType
+from typing import Deque, List, NamedTuple, Optional
+
+from config import LOOP_LAG_INTERVAL, LOOP_BLOCK_THRESHOLD, LOOP_BLOCK_EVENTS_KEPT
+from . import metrics
+from .error_tracker import is_own_code
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.05 # Seconds between stack samples while the loop is blocked
+MAX_SAMPLES_PER_BLOCK = 100
+STACK_DEPTH = 6 # Frames of the bot's own code kept per sample
+
+
+class BlockEvent(NamedTuple):
+    at: float # Unix time the block ended
+    duration: float # Seconds the loop was unresponsive
+    stack: str # Most frequent sampled stack, innermost frame first
+
+
+def format_stack(frame: Optional[FrameType]) -> str:
+    """Innermost frames of the bot's own code (plus the innermost frame overall) as 'file:function:line ← ...'."""
+    labels: List[str] = []
+    innermost = True
+    while frame is not None and len(labels) < STACK_DEPTH:
+        code = frame.f_code
+        if innermost or is_own_code(code.co_filename):
+            labels.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        innermost = False
+        frame = frame.f_back
+    return " ← ".join(labels) or "?"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = LOOP_BLOCK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.events: Deque[BlockEvent] = deque(maxlen=LOOP_BLOCK_EVENTS_KEPT)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.blocks = 0
+        self._tick_due = 0.0 # Monotonic time the next wake-up is expected
+        self._samples: List[str] = []
+        self._samples_lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+        self._stop_sampler = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def _sample_loop_thread(self) -> None:
+        """Helper thread: samples the loop thread's stack while a wake-up is overdue."""
+        while not self._stop_sampler.wait(SAMPLE_INTERVAL):
+            if time.monotonic() - self._tick_due < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = format_stack(frame)
+            del frame
+            with self._samples_lock:
+                if len(self._samples) < MAX_SAMPLES_PER_BLOCK:
+                    self._samples.append(stack)
+
+    def _record(self, lag: float) -> None:
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        metrics.observe("event_loop_lag_seconds", lag)
+        with self._samples_lock:
+            samples, self._samples = self._samples, []
+        if lag < self.threshold:
+            return
+        stack = Counter(samples).most_common(1)[0][0] if samples else "?"
+        self.blocks += 1
+        self.events.append(BlockEvent(time.time(), lag, stack))
+        metrics.increment("event_loop_blocks")
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms in {stack} ({len(samples)} sample(s)).")
+
+    async def _tick_loop(self) -> None:
+        while True:
+            self._tick_due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, time.monotonic() - self._tick_due))
+
+    def stats(self) -> dict:
+        """Figures for /stats."""
+        return {
+            "last_lag": self.last_lag, "max_lag": self.max_lag, "blocks": self.blocks,
+            "threshold": self.threshold, "recent": list(self.events),
+        }
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident() # Called from the event loop thread
+        self._tick_due = time.monotonic() + self.interval
+        self._stop_sampler.clear()
+        self._sampler = threading.Thread(target=self._sample_loop_thread, name="loop-watchdog", daemon=True)
+        self._sampler.start()
+        self._task = asyncio.create_task(self._tick_loop())
+
+    async def stop(self) -> None:
+        self._stop_sampler.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._sampler is not None:
+            await asyncio.to_thread(self._sampler.join)
+            self._sampler = None
+
+
+loop_monitor = LoopMonitor()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -16,7 +16,10 @@ from config import (
     START_DIRECTORY_PATH, MAX_BUTTONS_PER_ROW, ITEMS_PER_PAGE,
     CB_PREFIX_NAV_DIR, CB_PREFIX_NAV_FILE, CB_PREFIX_NAV_PAGE, CB_PREFIX_NAV_PARENT,
     CB_PREFIX_NAV_ROOT, CB_PREFIX_NOOP,
-    UD_KEY_VIEW_ITEMS, UD_KEY_CURRENT_PAGE
+    CB_PREFIX_SELECT_MODE, CB_PREFIX_SELECT_ITEM, CB_PREFIX_SEND_SELECTED, CB_PREFIX_CLEAR_SELECTION,
+    CB_PREFIX_PREVIEW_MODE, CB_PREFIX_PREVIEW_ITEM, CB_PREFIX_FOLLOW_MODE, CB_PREFIX_FOLLOW_ITEM,
+    UD_KEY_VIEW_ITEMS, UD_KEY_VIEW_SIGNATURE, UD_KEY_CURRENT_PAGE, UD_KEY_TOTAL_PAGES, UD_KEY_CLICK_MODE, UD_KEY_SELECTED_FILES,
+    CLICK_MODE_DOWNLOAD, CLICK_MODE_SELECT, CLICK_MODE_PREVIEW, CLICK_MODE_FOLLOW
 )
 import localization as loc
 from .helpers import (
@@ -59,7 +62,7 @@ def create_navigation_buttons(
     if total_pages > 1:
         pagination_row = []
         if current_page > 0:
-            cb_prev = create_callback_data(CB_PREFIX_NAV_PAGE, current_page - 1)
+            cb_prev = create_callback_data(CB_PREFIX_NAV_PAGE, "-1") # Relative, so rapid taps add up
             if cb_prev: pagination_row.append(InlineKeyboardButton(loc.BUTTON_PREV_PAGE, callback_data=cb_prev))
         else: # Placeholder for alignment
              pagination_row.append(InlineKeyboardButton(" ", callback_data=CB_PREFIX_NOOP))
@@ -68,7 +71,7 @@ def create_navigation_buttons(
         pagination_row.append(InlineKeyboardButton(page_indicator_text, callback_data=CB_PREFIX_NOOP))
 
         if current_page < total_pages - 1:
-            cb_next = create_callback_data(CB_PREFIX_NAV_PAGE, current_page + 1)
+            cb_next = create_callback_data(CB_PREFIX_NAV_PAGE, "+1")
             if cb_next: pagination_row.append(InlineKeyboardButton(loc.BUTTON_NEXT_PAGE, callback_data=cb_next))
         else: # Placeholder for alignment
              pagination_row.append(InlineKeyboardButton(" ", callback_data=CB_PREFIX_NOOP))
@@ -78,12 +81,112 @@ def create_navigation_buttons(
             
     return buttons
 
+def create_mode_buttons(click_mode: str, selected_count: int) -> List[List[InlineKeyboardButton]]:
+    """Creates the row that switches what tapping a file does (download / multi-select / preview / follow)."""
+    if click_mode == CLICK_MODE_SELECT:
+        return [[
+            InlineKeyboardButton(loc.BUTTON_SEND_SELECTED.format(count=selected_count), callback_data=CB_PREFIX_SEND_SELECTED),
+            InlineKeyboardButton(loc.BUTTON_CLEAR_SELECTION, callback_data=CB_PREFIX_CLEAR_SELECTION),
+            InlineKeyboardButton(loc.BUTTON_EXIT_SELECT_MODE, callback_data=CB_PREFIX_SELECT_MODE),
+        ]]
+    if click_mode == CLICK_MODE_PREVIEW:
+        return [[InlineKeyboardButton(loc.BUTTON_EXIT_PREVIEW_MODE, callback_data=CB_PREFIX_PREVIEW_MODE)]]
+    if click_mode == CLICK_MODE_FOLLOW:
+        return [[InlineKeyboardButton(loc.BUTTON_EXIT_FOLLOW_MODE, callback_data=CB_PREFIX_FOLLOW_MODE)]]
+    return [[
+        InlineKeyboardButton(loc.BUTTON_SELECT_MODE, callback_data=CB_PREFIX_SELECT_MODE),
+        InlineKeyboardButton(loc.BUTTON_PREVIEW_MODE, callback_data=CB_PREFIX_PREVIEW_MODE),
+        InlineKeyboardButton(loc.BUTTON_FOLLOW_MODE, callback_data=CB_PREFIX_FOLLOW_MODE),
+    ]]
+
+def folder_signature(path: Path) -> Optional[int]:
+    """Modification time (ns) of a folder: it changes whenever an entry is added, removed or renamed. None if unreadable."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def scan_folder(path: Path) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Lists a folder (sorted: folders first, then by name) and returns (items, signature).
+    Only touches the disk, so it can run in a worker thread. Raises like os.scandir.
+    """
+    if not (path == START_DIRECTORY_PATH or str(path).startswith(str(START_DIRECTORY_PATH) + os.sep)):
+        raise PermissionError(f"Attempt to list directory outside START_DIRECTORY: {path}")
+
+    signature = folder_signature(path) # Before listing: a change during the scandir makes the next check fail
+    all_items: List[Dict[str, Any]] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                is_symlink = entry.is_symlink()
+                is_file = entry.is_file(follow_symlinks=False)
+                effective_is_dir = False
+                effective_is_file = False
+                target_path_str = entry.path
+
+                if is_symlink:
+                    try:
+                        target_path_resolved = Path(entry.path).resolve() # Don't use strict=True for symlinks that might be broken but still listable
+                        if target_path_resolved == START_DIRECTORY_PATH or str(target_path_resolved).startswith(str(START_DIRECTORY_PATH) + os.sep):
+                            if target_path_resolved.exists():
+                                 effective_is_dir = target_path_resolved.is_dir()
+                                 effective_is_file = target_path_resolved.is_file()
+                            target_path_str = str(target_path_resolved) # Use resolved path for symlink actions if valid
+                        # If symlink points outside, it's handled by path validation later. Here, just record it.
+                    except OSError as sym_e: # Catches FileNotFoundError if broken symlink during resolve
+                        logger.debug(f"Symlink '{entry.path}' seems broken or inaccessible: {sym_e}. Will be marked.")
+                        # effective_is_dir/file remain False. Button will be non-actionable or show warning.
+                    except Exception as sym_e_gen:
+                         logger.warning(f"Unexpected error resolving symlink {entry.path}: {sym_e_gen}")
+
+                else: # Not a symlink
+                    effective_is_dir = is_dir
+                    effective_is_file = is_file
+                
+                # For symlinks, entry.path is the link path, target_path_str is what it resolves to (or link path if broken/invalid)
+                all_items.append({
+                    "name": entry.name,
+                    "path": target_path_str, # This is the path that will be acted upon
+                    "is_dir": effective_is_dir,
+                    "is_file": effective_is_file,
+                    "is_symlink": is_symlink,
+                    "original_link_path": entry.path if is_symlink else None # Store original link path for info
+                })
+            except OSError as e:
+                logger.warning(f"OS error accessing metadata for {entry.path}: {e}. Skipping.")
+            except Exception as e:
+                logger.warning(f"Unexpected error processing entry {entry.name} in {path}: {e}. Skipping.")
+    
+    all_items.sort(key=lambda x: (not x["is_dir"], x["name"].lower()))
+    return all_items, signature
+
+def store_folder_view(
+    context: ContextTypes.DEFAULT_TYPE, all_items: List[Dict[str, Any]], signature: Optional[int], page: int
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Keeps the items of `page` in user_data as the current view. Returns (items of the page, page, total pages)."""
+    total_items = len(all_items)
+    total_pages = math.ceil(total_items / ITEMS_PER_PAGE) if ITEMS_PER_PAGE > 0 else 1
+    validated_page = max(0, min(page, total_pages - 1))
+
+    start_index = validated_page * ITEMS_PER_PAGE
+    end_index = start_index + ITEMS_PER_PAGE
+    items_for_this_page = all_items[start_index:end_index]
+    
+    store_list_in_context(context, UD_KEY_VIEW_ITEMS, items_for_this_page)
+    context.user_data[UD_KEY_VIEW_SIGNATURE] = signature
+    context.user_data[UD_KEY_CURRENT_PAGE] = validated_page
+    context.user_data[UD_KEY_TOTAL_PAGES] = total_pages
+    return items_for_this_page, validated_page, total_pages
+
 def generate_file_list_markup(
     context: ContextTypes.DEFAULT_TYPE, path: Path, page: int = 0
 ) -> Tuple[Optional[InlineKeyboardMarkup], str]:
     """
     Generates the InlineKeyboardMarkup and message text (caption) for directory contents.
-    Stores items for current view in context.user_data[UD_KEY_VIEW_ITEMS].
+    Stores items for current view in context.user_data[UD_KEY_VIEW_ITEMS]
+    (and the folder's signature in UD_KEY_VIEW_SIGNATURE).
     Returns (markup, caption_text).
     """
     buttons: List[List[InlineKeyboardButton]] = []
@@ -91,66 +194,12 @@ def generate_file_list_markup(
     total_pages = 1
     items_for_this_page: List[Dict[str, Any]] = []
     validated_page = 0
+    click_mode = context.user_data.get(UD_KEY_CLICK_MODE, CLICK_MODE_DOWNLOAD)
+    selected_paths = set(context.user_data.get(UD_KEY_SELECTED_FILES, []))
 
     try:
-        if not (path == START_DIRECTORY_PATH or str(path).startswith(str(START_DIRECTORY_PATH) + os.sep)):
-            raise PermissionError(f"Attempt to list directory outside START_DIRECTORY: {path}")
-
-        all_items: List[Dict[str, Any]] = []
-        with os.scandir(path) as it:
-            for entry in it:
-                try:
-                    is_dir = entry.is_dir(follow_symlinks=False)
-                    is_symlink = entry.is_symlink()
-                    is_file = entry.is_file(follow_symlinks=False)
-                    effective_is_dir = False
-                    effective_is_file = False
-                    target_path_str = entry.path
-
-                    if is_symlink:
-                        try:
-                            target_path_resolved = Path(entry.path).resolve() # Don't use strict=True for symlinks that might be broken but still listable
-                            if target_path_resolved == START_DIRECTORY_PATH or str(target_path_resolved).startswith(str(START_DIRECTORY_PATH) + os.sep):
-                                if target_path_resolved.exists():
-                                     effective_is_dir = target_path_resolved.is_dir()
-                                     effective_is_file = target_path_resolved.is_file()
-                                target_path_str = str(target_path_resolved) # Use resolved path for symlink actions if valid
-                            # If symlink points outside, it's handled by path validation later. Here, just record it.
-                        except OSError as sym_e: # Catches FileNotFoundError if broken symlink during resolve
-                            logger.debug(f"Symlink '{entry.path}' seems broken or inaccessible: {sym_e}. Will be marked.")
-                            # effective_is_dir/file remain False. Button will be non-actionable or show warning.
-                        except Exception as sym_e_gen:
-                             logger.warning(f"Unexpected error resolving symlink {entry.path}: {sym_e_gen}")
-
-                    else: # Not a symlink
-                        effective_is_dir = is_dir
-                        effective_is_file = is_file
-                    
-                    # For symlinks, entry.path is the link path, target_path_str is what it resolves to (or link path if broken/invalid)
-                    all_items.append({
-                        "name": entry.name,
-                        "path": target_path_str, # This is the path that will be acted upon
-                        "is_dir": effective_is_dir,
-                        "is_file": effective_is_file,
-                        "is_symlink": is_symlink,
-                        "original_link_path": entry.path if is_symlink else None # Store original link path for info
-                    })
-                except OSError as e:
-                    logger.warning(f"OS error accessing metadata for {entry.path}: {e}. Skipping.")
-                except Exception as e:
-                    logger.warning(f"Unexpected error processing entry {entry.name} in {path}: {e}. Skipping.")
-        
-        all_items.sort(key=lambda x: (not x["is_dir"], x["name"].lower()))
-        total_items = len(all_items)
-        total_pages = math.ceil(total_items / ITEMS_PER_PAGE) if ITEMS_PER_PAGE > 0 else 1
-        validated_page = max(0, min(page, total_pages - 1))
-
-        start_index = validated_page * ITEMS_PER_PAGE
-        end_index = start_index + ITEMS_PER_PAGE
-        items_for_this_page = all_items[start_index:end_index]
-        
-        store_list_in_context(context, UD_KEY_VIEW_ITEMS, items_for_this_page)
-        context.user_data[UD_KEY_CURRENT_PAGE] = validated_page
+        all_items, signature = scan_folder(path)
+        items_for_this_page, validated_page, total_pages = store_folder_view(context, all_items, signature, page)
 
         row: List[InlineKeyboardButton] = []
         for index, item in enumerate(items_for_this_page):
@@ -164,6 +213,14 @@ def generate_file_list_markup(
             elif item["is_file"]:
                 emoji = "🔗" if item["is_symlink"] else get_file_emoji(item['name'])
                 callback_prefix = CB_PREFIX_NAV_FILE
+                if click_mode == CLICK_MODE_SELECT:
+                    callback_prefix = CB_PREFIX_SELECT_ITEM
+                    if item["path"] in selected_paths:
+                        emoji = "✅"
+                elif click_mode == CLICK_MODE_PREVIEW:
+                    callback_prefix = CB_PREFIX_PREVIEW_ITEM
+                elif click_mode == CLICK_MODE_FOLLOW:
+                    callback_prefix = CB_PREFIX_FOLLOW_ITEM
             elif item["is_symlink"]: # Symlink that isn't a valid dir or file (e.g. broken, points outside)
                 emoji = "⚠️🔗" # Warning symlink
                 callback_prefix = CB_PREFIX_NOOP # Make it non-actionable or show info on click
@@ -211,17 +268,12 @@ def generate_file_list_markup(
         except Exception: pass
         return (InlineKeyboardMarkup(buttons) if buttons else None), error_message
 
-    # --- Add navigation buttons to the main item buttons ---
-    nav_buttons = create_navigation_buttons(path, validated_page, total_pages)
-    buttons.extend(nav_buttons)
-
     if not items_for_this_page and validated_page == 0 and not error_message:
-        empty_button_row = [InlineKeyboardButton(loc.FOLDER_EMPTY, callback_data=CB_PREFIX_NOOP)]
-        # Insert before nav buttons if nav buttons exist
-        if nav_buttons:
-            buttons.insert(len(buttons) - len(nav_buttons), empty_button_row)
-        else:
-            buttons.append(empty_button_row)
+        buttons.append([InlineKeyboardButton(loc.FOLDER_EMPTY, callback_data=CB_PREFIX_NOOP)])
+
+    # --- Add mode and navigation buttons after the item buttons ---
+    buttons.extend(create_mode_buttons(click_mode, len(selected_paths)))
+    buttons.extend(create_navigation_buttons(path, validated_page, total_pages))
 
     keyboard = InlineKeyboardMarkup(buttons) if buttons else None
     
@@ -231,6 +283,12 @@ def generate_file_list_markup(
     if total_pages > 1:
         page_num_str = escape_html(loc.PAGE_NUMBER.format(current=validated_page + 1, total=total_pages))
         caption_text += f"\n{page_num_str}"
+    if click_mode == CLICK_MODE_SELECT:
+        caption_text += "\n" + loc.SELECT_MODE_CAPTION.format(count=len(selected_paths))
+    elif click_mode == CLICK_MODE_PREVIEW:
+        caption_text += "\n" + loc.PREVIEW_MODE_CAPTION
+    elif click_mode == CLICK_MODE_FOLLOW:
+        caption_text += "\n" + loc.FOLLOW_MODE_CAPTION
 
     if error_message: # Prepend error to path info or replace
         caption_text = f"{error_message}\n\n{caption_text}" if not loc.ERROR_NOT_FOUND in error_message and not loc.ERROR_PERMISSION_DENIED in error_message else error_message
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Remembers what each bot photo message currently shows (banner, caption,
+keyboard), as short hashes, so an update can use the cheapest edit call:
+nothing, edit_message_reply_markup, edit_message_caption or, only when
+the photo itself changes or the state is unknown, edit_message_media.
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from telegram import InlineKeyboardMarkup
+
+from config import MESSAGE_STATE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+EDIT_NONE = "none"
+EDIT_REPLY_MARKUP = "edit_message_reply_markup"
+EDIT_CAPTION = "edit_message_caption"
+EDIT_MEDIA = "edit_message_media"
+
+
+class MessageState(NamedTuple):
+    photo: str
+    caption: str
+    reply_markup: str
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class MessageStateTracker:
+    """LRU map of (chat_id, message_id) -> MessageState of the last content we sent."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._states: "OrderedDict[Tuple[int, int], MessageState]" = OrderedDict()
+
+    @staticmethod
+    def fingerprint(photo_key: str, caption: str, reply_markup: Optional[InlineKeyboardMarkup]) -> MessageState:
+        return MessageState(
+            photo=_digest(photo_key),
+            caption=_digest(caption or ""),
+            reply_markup=_digest(reply_markup.to_json() if reply_markup else ""),
+        )
+
+    def plan(self, chat_id: int, message_id: int, new_state: MessageState) -> str:
+        """Returns the cheapest EDIT_* call that turns the known state into `new_state`."""
+        old_state = self._states.get((chat_id, message_id))
+        if old_state is None or old_state.photo != new_state.photo:
+            return EDIT_MEDIA
+        if old_state.caption != new_state.caption:
+            return EDIT_CAPTION # Also carries the new keyboard
+        if old_state.reply_markup != new_state.reply_markup:
+            return EDIT_REPLY_MARKUP
+        return EDIT_NONE
+
+    def remember(self, chat_id: int, message_id: int, state: MessageState) -> None:
+        key = (chat_id, message_id)
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_entries:
+            self._states.popitem(last=False)
+
+    def forget(self, chat_id: int, message_id: int) -> None:
+        self._states.pop((chat_id, message_id), None)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+message_state_tracker = MessageStateTracker(MESSAGE_STATE_MAX_ENTRIES)
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Lightweight in-process metrics for operational visibility: counters,
+gauges and latency histograms. All are plain dict entries keyed by name and
+an optional set of labels, so updating them on hot paths costs next to
+nothing. `render_prometheus()` formats everything in the Prometheus text
+format (served by utils.metrics_endpoint when METRICS_PORT is set).
+"""
+import functools
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+NAMESPACE = "filebot" # Prefix of the exported metric names
+
+_counters: Dict[MetricKey, float] = {}
+_gauges: Dict[MetricKey, float] = {}
+_histograms: Dict[MetricKey, List[float]] = {} # Per bucket counts, then +Inf count, sum
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def _make_key(name: str, labels: Dict[str, Any]) -> MetricKey:
+    if not labels:
+        return (name, ())
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+def increment(name: str, amount: float = 1, **labels: Any) -> None:
+    """Adds `amount` to the counter `name` (with optional labels)."""
+    key = _make_key(name, labels)
+    _counters[key] = _counters.get(key, 0) + amount
+
+def get_counter(name: str, **labels: Any) -> float:
+    """Returns the current value of a counter, 0 if it was never incremented."""
+    return _counters.get(_make_key(name, labels), 0)
+
+def get_counter_total(name: str) -> float:
+    """Returns the sum of a counter across all of its label combinations."""
+    return sum(value for (metric_name, _), value in _counters.items() if metric_name == name)
+
+def snapshot_counters() -> Dict[MetricKey, float]:
+    """Returns a copy of all counters."""
+    return dict(_counters)
+
+def add_gauge(name: str, amount: float, **labels: Any) -> None:
+    """Moves the gauge `name` up or down (e.g. requests in flight)."""
+    key = _make_key(name, labels)
+    _gauges[key] = _gauges.get(key, 0) + amount
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    _gauges[_make_key(name, labels)] = value
+
+def get_gauge(name: str, **labels: Any) -> float:
+    return _gauges.get(_make_key(name, labels), 0)
+
+def _observe_key(key: MetricKey, value: float) -> None:
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = [0.0] * (len(LATENCY_BUCKETS) + 2)
+    histogram[bisect_left(LATENCY_BUCKETS, value)] += 1
+    histogram[-1] += value
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Records `value` (seconds) in the histogram `name`."""
+    _observe_key(_make_key(name, labels), value)
+
+def get_histogram_count(name: str) -> float:
+    """Observations in a histogram across all of its label combinations."""
+    return sum(sum(histogram[:-1]) for (metric_name, _), histogram in _histograms.items() if metric_name == name)
+
+def quantile(name: str, q: float, **labels: Any) -> Optional[float]:
+    """
+    Estimated `q` quantile (0..1) of a histogram, interpolated within its
+    bucket like Prometheus' histogram_quantile(). Without labels, all label
+    combinations are merged. None if nothing was observed.
+    """
+    if labels:
+        histogram = _histograms.get(_make_key(name, labels))
+        counts = histogram[:-1] if histogram else []
+    else:
+        counts = [0.0] * (len(LATENCY_BUCKETS) + 1)
+        for (metric_name, _), histogram in list(_histograms.items()):
+            if metric_name == name:
+                counts = [total + count for total, count in zip(counts, histogram)]
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0.0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            if i == len(LATENCY_BUCKETS): # +Inf bucket: the largest finite bound is the best estimate
+                return LATENCY_BUCKETS[-1]
+            lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+            return lower + (LATENCY_BUCKETS[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return LATENCY_BUCKETS[-1]
+
+def track(kind: str, **labels: Any) -> Callable[[F], F]:
+    """
+    Decorator for coroutine functions: records `<kind>_seconds` (histogram),
+    `<kind>_errors` (counter) and `<kind>_in_flight` (gauge) with `labels`.
+    """
+    seconds_key = _make_key(f"{kind}_seconds", labels)
+    in_flight_key = _make_key(f"{kind}_in_flight", labels)
+    errors_name = f"{kind}_errors"
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            _gauges[in_flight_key] = _gauges.get(in_flight_key, 0) + 1
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                increment(errors_name, **labels)
+                raise
+            finally:
+                _gauges[in_flight_key] -= 1
+                _observe_key(seconds_key, time.perf_counter() - started)
+        return wrapper # type: ignore[return-value]
+    return decorator
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], le: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in labels]
+    if le:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+
+    def grouped(values: Dict[MetricKey, Any]) -> Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], Any]]]:
+        groups: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], Any]]] = {}
+        for (name, labels), value in list(values.items()):
+            groups.setdefault(name, []).append((labels, value))
+        return groups
+
+    for name, samples in sorted(grouped(_counters).items()):
+        metric = f"{NAMESPACE}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{_format_labels(labels)} {value:g}" for labels, value in samples)
+    for name, samples in sorted(grouped(_gauges).items()):
+        metric = f"{NAMESPACE}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(f"{metric}{_format_labels(labels)} {value:g}" for labels, value in samples)
+    for name, samples in sorted(grouped(_histograms).items()):
+        metric = f"{NAMESPACE}_{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for labels, histogram in samples:
+            cumulative = 0.0
+            for bound, count in zip(LATENCY_BUCKETS, histogram):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_format_labels(labels, f'{bound:g}')} {cumulative:g}")
+            cumulative += histogram[len(LATENCY_BUCKETS)]
+            lines.append(f"{metric}_bucket{_format_labels(labels, '+Inf')} {cumulative:g}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram[-1]:g}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {cumulative:g}")
+    return "\n".join(lines) + "\n"
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
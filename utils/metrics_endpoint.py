@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Optional Prometheus scrape endpoint: `GET /metrics` on METRICS_LISTEN:METRICS_PORT.
+Disabled (no server, no port) when METRICS_PORT is 0. Metrics are recorded
+either way; this only exposes them.
+"""
+import logging
+from typing import Optional
+
+from config import METRICS_LISTEN, METRICS_PORT
+from . import metrics
+from .http_server import AsyncHttpServer, HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def handle_scrape(request: HttpRequest) -> HttpResponse:
+    return HttpResponse(200, metrics.render_prometheus().encode('utf-8'), CONTENT_TYPE)
+
+
+class MetricsEndpoint:
+    def __init__(self, host: str = METRICS_LISTEN, port: int = METRICS_PORT):
+        self.host = host
+        self.port = port
+        self._server: Optional[AsyncHttpServer] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.port > 0
+
+    async def start(self) -> None:
+        if not self.enabled or self._server is not None:
+            return
+        server = AsyncHttpServer(self.host, self.port)
+        server.add_route("GET", METRICS_PATH, handle_scrape)
+        try:
+            await server.start()
+        except OSError as e: # Port taken: the bot keeps running without the endpoint
+            logger.error(f"Could not start the metrics endpoint on {self.host}:{self.port}: {e}")
+            return
+        self._server = server
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            await self._server.stop()
+            self._server = None
+
+
+metrics_endpoint = MetricsEndpoint()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
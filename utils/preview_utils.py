@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Fast text preview of (possibly huge) files through mmap.
+A sparse newline index (one checkpoint every INDEX_STRIDE lines) is built
+lazily and cached per file, so jumping to any line only scans from the
+nearest checkpoint instead of reading the file from the start.
+"""
+import mmap
+import re
+import threading
+import logging
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from config import LINE_INDEX_CACHE_MAX_FILES, PREVIEW_MAX_LINE_LENGTH
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+INDEX_STRIDE = 1024 # Lines between two checkpoints
+_STRIDE_PATTERN = re.compile(rb'(?:[^\n]*\n){%d}' % INDEX_STRIDE) # Skips a whole stride in C
+_LINE_PATTERN = re.compile(rb'[^\n]*\n')
+BINARY_SNIFF_BYTES = 8192
+
+
+class LineIndex:
+    """Checkpointed line-start offsets for one version of a file."""
+
+    def __init__(self, path: Path, signature: Tuple[int, int, int, int]):
+        self.path = path
+        self.signature = signature # (st_dev, st_ino, st_size, st_mtime_ns)
+        self.checkpoints = array('Q', [0]) # checkpoints[i] = byte offset of line i * INDEX_STRIDE
+        self.total_lines: Optional[int] = None # Known once the index reached EOF
+        self.lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self.signature[2]
+
+    def _extend(self, mm: mmap.mmap, until_checkpoint: Optional[int]) -> None:
+        """Adds checkpoints up to `until_checkpoint` (or EOF if None)."""
+        while self.total_lines is None and (until_checkpoint is None or len(self.checkpoints) <= until_checkpoint):
+            position = self.checkpoints[-1]
+            stride_match = _STRIDE_PATTERN.match(mm, position, self.size)
+            if stride_match and stride_match.end() < self.size:
+                self.checkpoints.append(stride_match.end())
+                continue
+            # Fewer than INDEX_STRIDE lines left (or exactly at EOF): count the rest.
+            remaining_lines = mm[position:self.size].count(b'\n')
+            if self.size > position and mm[self.size - 1:self.size] != b'\n':
+                remaining_lines += 1 # Last line without trailing newline
+            self.total_lines = (len(self.checkpoints) - 1) * INDEX_STRIDE + remaining_lines
+
+    def offset_of_line(self, mm: mmap.mmap, line_no: int) -> Optional[int]:
+        """Byte offset where `line_no` (0-based) starts, or None past EOF."""
+        with self.lock:
+            self._extend(mm, line_no // INDEX_STRIDE)
+            if self.total_lines is not None and line_no >= self.total_lines:
+                return None
+            checkpoint_no = min(line_no // INDEX_STRIDE, len(self.checkpoints) - 1)
+            position = self.checkpoints[checkpoint_no]
+        for _ in range(line_no - checkpoint_no * INDEX_STRIDE):
+            line_match = _LINE_PATTERN.match(mm, position, self.size)
+            if not line_match:
+                return None
+            position = line_match.end()
+        return position if position < self.size else None
+
+    def ensure_complete(self, mm: mmap.mmap) -> int:
+        with self.lock:
+            self._extend(mm, None)
+            return self.total_lines
+
+
+_index_cache: "OrderedDict[str, LineIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _get_line_index(path: Path, signature: Tuple[int, int, int, int]) -> LineIndex:
+    """Returns the cached index for this file version, reusing checkpoints if the file was only appended to."""
+    key = str(path)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None and index.signature != signature:
+            same_file = index.signature[:2] == signature[:2]
+            if same_file and signature[2] > index.size:
+                # Appended: existing line starts are still valid, only the tail must be rescanned.
+                grown_index = LineIndex(path, signature)
+                grown_index.checkpoints = array('Q', (offset for offset in index.checkpoints if offset < index.size))
+                index = grown_index
+                metrics.increment("line_index_cache", result="grown")
+            else:
+                index = None
+        elif index is not None:
+            metrics.increment("line_index_cache", result="hit")
+        if index is None:
+            index = LineIndex(path, signature)
+            metrics.increment("line_index_cache", result="miss")
+        _index_cache[key] = index
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > LINE_INDEX_CACHE_MAX_FILES:
+            _index_cache.popitem(last=False)
+        return index
+
+
+def line_index_cache_size() -> int:
+    return len(_index_cache)
+
+
+def _decode_lines(raw: bytes) -> List[str]:
+    lines = raw.decode('utf-8', errors='replace').split('\n')
+    return [line if len(line) <= PREVIEW_MAX_LINE_LENGTH else line[:PREVIEW_MAX_LINE_LENGTH - 1] + "…" for line in lines]
+
+
+def looks_binary(path: Path) -> bool:
+    with open(path, 'rb') as f:
+        return b'\x00' in f.read(BINARY_SNIFF_BYTES)
+
+
+def read_lines(path: Path, start_line: int, count: int) -> Tuple[List[str], int, Optional[int]]:
+    """
+    Returns (lines, actual_start_line, total_lines_if_known) for `count` lines
+    starting at `start_line`. If `start_line` is past EOF, the last page is returned.
+    Blocking: run it in a worker thread for big files.
+    """
+    stat_result = path.stat()
+    if stat_result.st_size == 0:
+        return [], 0, 0
+    signature = (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+    index = _get_line_index(path, signature)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = min(index.size, len(mm)) # The file may have grown since stat()
+        start_offset = index.offset_of_line(mm, start_line)
+        if start_offset is None:
+            total_lines = index.ensure_complete(mm)
+            start_line = max(0, total_lines - count)
+            start_offset = index.offset_of_line(mm, start_line) or 0
+        end_offset = start_offset
+        for _ in range(count):
+            line_match = _LINE_PATTERN.match(mm, end_offset, size)
+            if not line_match:
+                end_offset = size # Last line without trailing newline
+                break
+            end_offset = line_match.end()
+        raw = mm[start_offset:end_offset]
+    lines = _decode_lines(raw.rstrip(b'\n')) if raw else []
+    if end_offset >= size and index.total_lines is None:
+        with index.lock: # Reached EOF: the line count is now known without a full scan
+            index.total_lines = start_line + len(lines)
+    return lines, start_line, index.total_lines
+
+
+def read_tail(path: Path, count: int) -> Tuple[List[str], Optional[int]]:
+    """
+    Returns (last `count` lines, their 0-based start line if the index knows it).
+    Scans backwards from EOF, so it never reads the whole file.
+    """
+    stat_result = path.stat()
+    if stat_result.st_size == 0:
+        return [], 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm)
+        if mm[end - 1:end] == b'\n':
+            end -= 1
+        start = end
+        for _ in range(count):
+            newline_pos = mm.rfind(b'\n', 0, start)
+            if newline_pos < 0:
+                start = 0
+                break
+            start = newline_pos
+        else:
+            start += 1 # Skip the newline that ends the line before the tail
+        raw = mm[start:end]
+
+    key = str(path)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+    start_line = None
+    if index is not None and index.total_lines is not None and index.signature[2:] == (stat_result.st_size, stat_result.st_mtime_ns):
+        start_line = max(0, index.total_lines - count)
+    return _decode_lines(raw), start_line
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+On-demand profiling of the running bot, started by the admin's /profile
+command or by SIGUSR1. Two modes:
+- "cprofile": deterministic cProfile of the event loop thread, where every
+  handler runs. Slows handlers down noticeably while it is on. Saved as a
+  .pstats file (load it with pstats or snakeviz).
+- "sample": a helper thread records the stack of every thread every
+  PROFILE_SAMPLE_INTERVAL seconds. Cheap, and also sees work done in
+  asyncio.to_thread. Saved in collapsed-stack format (flamegraph.pl, speedscope).
+Either way a plain-text summary of the PROFILE_TOP_N hottest functions is
+sent to the admin as a document.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import List, NamedTuple, Optional
+
+from telegram.ext import Application
+
+from config import (
+    ADMIN_USER_ID, PROFILE_DIR, PROFILE_MAX_SECONDS, PROFILE_SIGNAL_SECONDS, PROFILE_SAMPLE_INTERVAL, PROFILE_TOP_N
+)
+import localization as loc
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MODE_CPROFILE = "cprofile"
+MODE_SAMPLE = "sample"
+MODES = (MODE_CPROFILE, MODE_SAMPLE)
+
+
+class ProfileResult(NamedTuple):
+    mode: str
+    seconds: float
+    data_file: Path # .pstats or .collapsed
+    summary: str
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    """Samples the stacks of all threads from a daemon thread; `stacks` holds collapsed stack -> sample count."""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                labels: List[str] = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(labels))] += 1 # Root first, as flame graph tools expect
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def summary(self, top_n: int) -> str:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:] # Drop the thread name
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for label in set(frames): # Recursion counts once
+                total_counts[label] += count
+        total = sum(self.stacks.values()) or 1
+        lines = [f"{self.samples} sampling rounds, {total} thread stacks, every {self.interval * 1000:g} ms", ""]
+        for title, counts in (("Self time (function on top of the stack)", self_counts), ("Total time (function anywhere in the stack)", total_counts)):
+            lines.append(f"--- {title} ---")
+            lines.append(f"{'samples':>8} {'share':>7}  function")
+            for label, count in counts.most_common(top_n):
+                lines.append(f"{count:>8} {count / total:>7.1%}  {label}")
+            lines.append("")
+        return "\n".join(lines)
+
+
+class Profiler:
+    """Runs one capture at a time and sends the result to the admin."""
+
+    def __init__(self, directory: Path = Path(PROFILE_DIR), top_n: int = PROFILE_TOP_N):
+        self.directory = directory
+        self.top_n = top_n
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def capture(self, seconds: float, mode: str = MODE_CPROFILE) -> ProfileResult:
+        """Profiles the whole process for `seconds` and saves the raw data under `directory`."""
+        await asyncio.to_thread(self.directory.mkdir, parents=True, exist_ok=True)
+        stem = self.directory / f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{mode}"
+        started = time.monotonic()
+        if mode == MODE_SAMPLE:
+            sampler = StackSampler()
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                await asyncio.to_thread(sampler.stop)
+            data_file = stem.with_suffix(".collapsed")
+            await asyncio.to_thread(
+                data_file.write_text, "".join(f"{stack} {count}\n" for stack, count in sampler.stacks.items()), 'utf-8'
+            )
+            summary = sampler.summary(self.top_n)
+        else:
+            profile = cProfile.Profile()
+            profile.enable() # Called from the event loop thread: profiles every handler and callback it runs
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+            data_file = stem.with_suffix(".pstats")
+            summary = await asyncio.to_thread(self._save_pstats, profile, data_file)
+        elapsed = time.monotonic() - started
+        metrics.increment("profiles_captured", mode=mode)
+        logger.info(f"Profile ({mode}, {elapsed:.1f}s) saved to {data_file}.")
+        return ProfileResult(mode, elapsed, data_file, summary)
+
+    def _save_pstats(self, profile: cProfile.Profile, data_file: Path) -> str:
+        """Worker thread: writes the raw stats and returns the summary (both take a while for a long capture)."""
+        profile.dump_stats(data_file)
+        return self._pstats_summary(profile)
+
+    def _pstats_summary(self, profile: cProfile.Profile) -> str:
+        output = io.StringIO()
+        stats = pstats.Stats(profile, stream=output).strip_dirs()
+        for sort_key in (pstats.SortKey.TIME, pstats.SortKey.CUMULATIVE):
+            output.write(f"=== Top {self.top_n} by {sort_key.value} ===\n")
+            stats.sort_stats(sort_key).print_stats(self.top_n)
+        return output.getvalue()
+
+    async def _capture_and_send(self, application: Application, seconds: float, mode: str, chat_id: int) -> None:
+        try:
+            result = await self.capture(seconds, mode)
+            header = f"Profile: {result.mode}, {result.seconds:.1f}s, raw data in {result.data_file}\n\n"
+            await application.bot.send_document(
+                chat_id=chat_id,
+                document=(header + result.summary).encode('utf-8'),
+                filename=result.data_file.with_suffix(".txt").name,
+                caption=loc.PROFILE_DONE_CAPTION.format(mode=result.mode, seconds=f"{result.seconds:.0f}"),
+            )
+        except Exception as e:
+            logger.error(f"Profiling ({mode}, {seconds}s) failed: {e}", exc_info=True)
+            try:
+                await application.bot.send_message(chat_id=chat_id, text=loc.PROFILE_FAILED)
+            except Exception:
+                pass
+
+    def start_capture(self, application: Application, seconds: float, mode: str = MODE_CPROFILE, chat_id: int = ADMIN_USER_ID) -> bool:
+        """Starts a capture in the background; False if one is already running."""
+        if self.running:
+            return False
+        seconds = max(1.0, min(float(seconds), PROFILE_MAX_SECONDS))
+        self._task = asyncio.create_task(self._capture_and_send(application, seconds, mode, chat_id))
+        return True
+
+    def install_signal_handler(self, application: Application) -> None:
+        """SIGUSR1 starts a PROFILE_SIGNAL_SECONDS sampling capture sent to the admin (not on Windows)."""
+        if not hasattr(signal, "SIGUSR1"):
+            return
+
+        def on_signal() -> None:
+            if self.start_capture(application, PROFILE_SIGNAL_SECONDS, MODE_SAMPLE):
+                logger.info(f"SIGUSR1: profiling for {PROFILE_SIGNAL_SECONDS}s.")
+            else:
+                logger.info("SIGUSR1 ignored: a profile capture is already running.")
+
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, on_signal)
+        except (NotImplementedError, RuntimeError) as e:
+            logger.warning(f"Could not install the SIGUSR1 profiling handler: {e}")
+
+    async def stop(self) -> None:
+        if hasattr(signal, "SIGUSR1"):
+            try:
+                asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+            except (NotImplementedError, RuntimeError):
+                pass
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+profiler = Profiler()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Rate limiter for every outgoing Bot API call (plugged into the Application
+builder). Token buckets enforce Telegram's global and per-chat limits,
+interactive calls (edits, answers, small messages) go before bulk uploads,
+an edit that was superseded by a newer edit of the same message while
+waiting is dropped, and RetryAfter (HTTP 429) is waited out and retried.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import (
+    RATE_LIMIT_GLOBAL_PER_SECOND, RATE_LIMIT_PRIVATE_CHAT_PER_SECOND, RATE_LIMIT_GROUP_PER_MINUTE,
+    RATE_LIMIT_CHAT_BURST, RATE_LIMIT_BULK_RESERVE, RATE_LIMIT_MAX_RETRIES
+)
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+JSONDict = Dict[str, Any]
+
+# Uploads that may take long and can wait behind interactive calls
+BULK_ENDPOINTS = frozenset({"sendDocument", "sendMediaGroup", "sendVideo", "sendAudio"})
+# Edits whose newer call fully replaces the older one (same endpoint, same message)
+COALESCIBLE_ENDPOINTS = frozenset({"editMessageText", "editMessageCaption", "editMessageMedia", "editMessageReplyMarkup"})
+MAX_CHAT_BUCKETS = 1024
+BULK_YIELD_DELAY = 0.05 # Seconds a bulk call waits while interactive calls are queued
+
+
+class TokenBucket:
+    """Classic token bucket; `paused_until` blocks it completely after a 429."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float, reserve: float = 0.0) -> float:
+        """Seconds until one token can be taken while leaving `reserve` tokens in the bucket."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        missing = 1 + max(0.0, min(reserve, self.capacity - 1)) - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else math.inf # A rate of 0 never refills
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class TelegramRateLimiter(BaseRateLimiter[int]):
+    """
+    `rate_limit_args` (per call, optional) overrides how many times a
+    RetryAfter is absorbed before it is raised to the caller.
+    """
+
+    def __init__(self, max_retries: int = RATE_LIMIT_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._global_bucket = TokenBucket(RATE_LIMIT_GLOBAL_PER_SECOND, RATE_LIMIT_GLOBAL_PER_SECOND)
+        self._chat_buckets: Dict[Union[int, str], TokenBucket] = {}
+        self._interactive_waiting = 0
+        self._edit_generations: Dict[Tuple[str, Any, Any], int] = {}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _get_chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                now = time.monotonic()
+                for key in [key for key, old_bucket in self._chat_buckets.items() if old_bucket.is_idle(now)]:
+                    del self._chat_buckets[key]
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            if is_group:
+                bucket = TokenBucket(RATE_LIMIT_GROUP_PER_MINUTE / 60.0, RATE_LIMIT_CHAT_BURST)
+            else:
+                bucket = TokenBucket(RATE_LIMIT_PRIVATE_CHAT_PER_SECOND, RATE_LIMIT_CHAT_BURST)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _is_superseded(self, edit_key: Optional[Tuple[str, Any, Any]], generation: int) -> bool:
+        return edit_key is not None and self._edit_generations.get(edit_key) != generation
+
+    async def _acquire(
+        self,
+        chat_bucket: Optional[TokenBucket],
+        interactive: bool,
+        edit_key: Optional[Tuple[str, Any, Any]],
+        generation: int
+    ) -> bool:
+        """Waits for tokens. Returns False if the call was superseded while waiting."""
+        buckets: List[TokenBucket] = [self._global_bucket] + ([chat_bucket] if chat_bucket else [])
+        waited = False
+        blocking_bulk = False # Interactive call waiting for global tokens: bulk calls hold back
+        try:
+            while True:
+                if self._is_superseded(edit_key, generation):
+                    return False
+                now = time.monotonic()
+                if not interactive and self._interactive_waiting:
+                    wait = BULK_YIELD_DELAY
+                else:
+                    # Bulk calls leave some global tokens for interactive ones
+                    global_wait = self._global_bucket.delay(now, 0.0 if interactive else RATE_LIMIT_BULK_RESERVE)
+                    wait = max(global_wait, chat_bucket.delay(now) if chat_bucket else 0.0)
+                    if wait <= 0:
+                        for bucket in buckets:
+                            bucket.take()
+                        return True
+                    if interactive and (global_wait > 0) != blocking_bulk:
+                        blocking_bulk = global_wait > 0
+                        self._interactive_waiting += 1 if blocking_bulk else -1
+                if not waited:
+                    waited = True
+                    metrics.increment("api_throttled", priority="interactive" if interactive else "bulk")
+                await asyncio.sleep(wait)
+        finally:
+            if blocking_bulk:
+                self._interactive_waiting -= 1
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, JSONDict, List[JSONDict]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, JSONDict, List[JSONDict]]:
+        max_retries = self.max_retries if rate_limit_args is None else rate_limit_args
+        interactive = endpoint not in BULK_ENDPOINTS
+
+        chat_id = data.get("chat_id")
+        try:
+            chat_id = int(chat_id) if chat_id is not None else None
+        except (TypeError, ValueError):
+            pass # @channelusername
+        chat_bucket = self._get_chat_bucket(chat_id) if chat_id is not None else None
+
+        edit_key = None
+        generation = 0
+        if endpoint in COALESCIBLE_ENDPOINTS and data.get("message_id") is not None:
+            edit_key = (endpoint, chat_id, data.get("message_id"))
+            generation = self._edit_generations.get(edit_key, 0) + 1
+            self._edit_generations[edit_key] = generation
+
+        try:
+            attempt = 0
+            while True:
+                if not await self._acquire(chat_bucket, interactive, edit_key, generation):
+                    metrics.increment("api_edits_coalesced", endpoint=endpoint)
+                    logger.debug(f"{endpoint} for message {data.get('message_id')} superseded by a newer edit; skipped.")
+                    return True # What Telegram returns for an edit without a message object
+                metrics.increment("api_requests", endpoint=endpoint)
+                try:
+                    return await callback(*args, **kwargs)
+                except RetryAfter as e:
+                    metrics.increment("api_rate_limited", endpoint=endpoint)
+                    # A 429 on a chat-bound call is usually that chat's limit; otherwise stop everything
+                    (chat_bucket or self._global_bucket).pause(float(e.retry_after) + 0.1)
+                    if attempt >= max_retries:
+                        logger.warning(f"{endpoint} still rate limited after {attempt} retries (retry after {e.retry_after}s).")
+                        raise
+                    attempt += 1
+                    logger.info(f"{endpoint} rate limited; retrying in {e.retry_after}s ({attempt}/{max_retries}).")
+        finally:
+            if edit_key is not None and self._edit_generations.get(edit_key) == generation:
+                del self._edit_generations[edit_key]
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
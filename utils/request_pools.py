@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Bot API request object with two separate HTTP connection pools: a small,
+short-timeout "control" pool for answers, edits and messages, and a
+long-timeout "media" pool for file uploads and downloads. A slow upload
+can then never take the connection an answer_callback_query is waiting for.
+"""
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from telegram.request import BaseRequest, HTTPXRequest, RequestData
+
+from config import (
+    CONTROL_POOL_SIZE, CONTROL_POOL_TIMEOUT, CONTROL_READ_TIMEOUT,
+    MEDIA_POOL_SIZE, MEDIA_POOL_TIMEOUT, MEDIA_READ_TIMEOUT
+)
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+POOL_CONTROL = "control"
+POOL_MEDIA = "media"
+
+
+class _PoolUsage:
+    __slots__ = ("size", "in_flight", "peak")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.in_flight = 0
+        self.peak = 0
+
+
+class PooledRequest(BaseRequest):
+    """Routes each call to the control or the media pool (see module docstring)."""
+
+    def __init__(self):
+        self._pools: Dict[str, HTTPXRequest] = {
+            POOL_CONTROL: HTTPXRequest(
+                connection_pool_size=CONTROL_POOL_SIZE,
+                read_timeout=CONTROL_READ_TIMEOUT, write_timeout=CONTROL_READ_TIMEOUT,
+                connect_timeout=5.0, pool_timeout=CONTROL_POOL_TIMEOUT,
+            ),
+            POOL_MEDIA: HTTPXRequest(
+                connection_pool_size=MEDIA_POOL_SIZE,
+                read_timeout=MEDIA_READ_TIMEOUT, write_timeout=MEDIA_READ_TIMEOUT,
+                connect_timeout=30.0, pool_timeout=MEDIA_POOL_TIMEOUT,
+            ),
+        }
+        self._usage: Dict[str, _PoolUsage] = {
+            POOL_CONTROL: _PoolUsage(CONTROL_POOL_SIZE),
+            POOL_MEDIA: _PoolUsage(MEDIA_POOL_SIZE),
+        }
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self._pools[POOL_CONTROL].read_timeout
+
+    async def initialize(self) -> None:
+        for pool in self._pools.values():
+            await pool.initialize()
+
+    async def shutdown(self) -> None:
+        for pool in self._pools.values():
+            await pool.shutdown()
+
+    @staticmethod
+    def _api_method(url: str) -> str:
+        """Metrics label: the Bot API method, or "file" for downloads (whose URL ends in a file path)."""
+        if "/file/bot" in url:
+            return "file"
+        return url.rsplit("/", 1)[-1]
+
+    @staticmethod
+    def _choose_pool(url: str, request_data: Optional[RequestData]) -> str:
+        if "/file/bot" in url: # File download
+            return POOL_MEDIA
+        if request_data is not None and request_data.contains_files:
+            return POOL_MEDIA
+        return POOL_CONTROL
+
+    def pool_stats(self) -> Dict[str, Dict[str, float]]:
+        """Size, in-flight and peak requests and current utilization of each pool."""
+        return {
+            name: {
+                "size": usage.size, "in_flight": usage.in_flight, "peak": usage.peak,
+                "utilization": usage.in_flight / usage.size if usage.size else 0.0,
+            }
+            for name, usage in self._usage.items()
+        }
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        pool_name = self._choose_pool(url, request_data)
+        usage = self._usage[pool_name]
+        metrics.increment("http_requests", pool=pool_name)
+        if usage.in_flight >= usage.size:
+            metrics.increment("http_pool_exhausted", pool=pool_name) # This request waits for a free connection
+        usage.in_flight += 1
+        usage.peak = max(usage.peak, usage.in_flight)
+        metrics.add_gauge("api_requests_in_flight", 1, pool=pool_name)
+        api_method = self._api_method(url)
+        started = time.perf_counter()
+        try:
+            status, payload = await self._pools[pool_name].do_request(
+                url, method, request_data=request_data,
+                read_timeout=read_timeout, write_timeout=write_timeout,
+                connect_timeout=connect_timeout, pool_timeout=pool_timeout,
+            )
+        except Exception as e:
+            metrics.increment("api_errors", method=api_method, error=type(e).__name__)
+            raise
+        finally:
+            usage.in_flight -= 1
+            metrics.add_gauge("api_requests_in_flight", -1, pool=pool_name)
+            metrics.observe("api_request_seconds", time.perf_counter() - started, method=api_method)
+        if status >= 400: # Raised as a telegram.error by the caller
+            metrics.increment("api_errors", method=api_method, error=str(status))
+        return status, payload
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
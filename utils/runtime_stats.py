@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+The admin's /stats report. Everything in it is read from state the bot
+keeps anyway (metrics counters and histograms, cache and queue sizes); the
+only extra work is a sample of the API request counter every
+RATE_SAMPLE_INTERVAL seconds, for the calls-per-minute figure.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from telegram.ext import Application
+
+from config import (
+    BD_KEY_FILE_ID_CACHE, FILE_ID_CACHE_MAX_ENTRIES, LINE_INDEX_CACHE_MAX_FILES, UD_KEY_SEARCH_RESULTS
+)
+import localization as loc
+from . import metrics
+from .helpers import escape_html, format_size
+from .loop_monitor import loop_monitor
+from .preview_utils import line_index_cache_size
+from .sessions import session_manager
+from .transfer_utils import transfer_scheduler
+
+logger = logging.getLogger(__name__)
+
+RATE_SAMPLE_INTERVAL = 10 # Seconds between samples of the API request counter
+RATE_WINDOW_SAMPLES = 7 # Samples kept: the rate covers the last minute
+STATS_RECENT_BLOCKS = 3 # Most recent event loop blocks listed
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (peak RSS where /proc is missing), None if unknown."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # Bytes on macOS, KiB elsewhere
+
+
+def format_duration(seconds: float) -> str:
+    minutes, _ = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h {minutes}m" if days else f"{hours}h {minutes}m"
+
+
+def format_ms(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:.0f}" if seconds is not None else loc.STATS_NOT_AVAILABLE
+
+
+def hit_ratio(counter: str) -> str:
+    """Hits out of all lookups of a cache counter labelled result=hit/miss/..."""
+    hits = metrics.get_counter(counter, result="hit")
+    lookups = metrics.get_counter_total(counter)
+    return f"{hits / lookups:.0%}" if lookups else loc.STATS_NOT_AVAILABLE
+
+
+class RuntimeStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self._api_samples: Deque[Tuple[float, float]] = deque(maxlen=RATE_WINDOW_SAMPLES) # (monotonic time, http_requests total)
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def api_calls_per_minute(self) -> float:
+        now = time.monotonic()
+        total = metrics.get_counter_total("http_requests")
+        since, base = self._api_samples[0] if self._api_samples else (self.started, 0.0)
+        return (total - base) * 60 / max(now - since, 60.0) # Right after start: calls so far, not an extrapolation
+
+    def build_report(self, application: Application) -> str:
+        rss = current_rss()
+        lines = [
+            loc.STATS_TITLE,
+            "",
+            loc.STATS_UPTIME.format(
+                uptime=format_duration(time.monotonic() - self.started),
+                rss=format_size(rss) if rss is not None else loc.STATS_NOT_AVAILABLE
+            ),
+        ]
+
+        session_manager.remeasure(application)
+        sessions = session_manager.stats()
+        lines.append(loc.STATS_SESSIONS.format(
+            sessions=sessions["sessions"], with_lists=sessions["sessions_with_lists"],
+            memory=format_size(sessions["memory_bytes"]), budget=format_size(sessions["memory_budget"])
+        ))
+
+        search_lists = [data[UD_KEY_SEARCH_RESULTS] for data in application.user_data.values() if data.get(UD_KEY_SEARCH_RESULTS)]
+        lines.append(loc.STATS_CACHES.format(
+            listings=sessions["sessions_with_lists"], listing_ratio=hit_ratio("listing_cache"),
+            searches=len(search_lists), search_items=sum(len(results) for results in search_lists),
+            file_ids=len(application.bot_data.get(BD_KEY_FILE_ID_CACHE) or {}), file_ids_max=FILE_ID_CACHE_MAX_ENTRIES,
+            file_id_ratio=hit_ratio("file_id_cache"),
+            line_indexes=line_index_cache_size(), line_indexes_max=LINE_INDEX_CACHE_MAX_FILES,
+            line_index_ratio=hit_ratio("line_index_cache"),
+        ))
+        lines.append(loc.STATS_TRANSFERS.format(active=transfer_scheduler.active, queued=transfer_scheduler.queued))
+
+        lines.append(loc.STATS_API.format(
+            per_minute=f"{self.api_calls_per_minute():.0f}",
+            rate_limited=int(metrics.get_counter_total("api_rate_limited")),
+            errors=int(metrics.get_counter_total("api_errors")),
+            p50=format_ms(metrics.quantile("api_request_seconds", 0.5)),
+            p95=format_ms(metrics.quantile("api_request_seconds", 0.95)),
+        ))
+        lines.append(loc.STATS_HANDLERS.format(
+            calls=int(metrics.get_histogram_count("handler_seconds")),
+            errors=int(metrics.get_counter_total("handler_errors")),
+            p50=format_ms(metrics.quantile("handler_seconds", 0.5)),
+            p95=format_ms(metrics.quantile("handler_seconds", 0.95)),
+        ))
+
+        loop = loop_monitor.stats()
+        lines.append(loc.STATS_LOOP.format(
+            last_ms=format_ms(loop["last_lag"]), max_ms=format_ms(loop["max_lag"]),
+            blocks=loop["blocks"], threshold_ms=format_ms(loop["threshold"])
+        ))
+        for event in loop["recent"][-STATS_RECENT_BLOCKS:]:
+            lines.append(loc.STATS_LOOP_BLOCK.format(
+                duration_ms=format_ms(event.duration), minutes_ago=int((time.time() - event.at) // 60),
+                stack=escape_html(event.stack)
+            ))
+        return "\n".join(lines)
+
+    async def _sample_loop(self) -> None:
+        while True:
+            self._api_samples.append((time.monotonic(), metrics.get_counter_total("http_requests")))
+            await asyncio.sleep(RATE_SAMPLE_INTERVAL)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sample_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+runtime_stats = RuntimeStats()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
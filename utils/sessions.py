@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Browsing sessions that survive restarts. Only a compact form of each user's
+user_data is persisted: the folder (relative to START_DIRECTORY), page,
+click mode, the id of the bot message being browsed in and the folder's
+signature (mtime) when that message was drawn; item lists are rebuilt from
+disk when needed, and a tap on an item of a folder that changed since is
+answered as stale instead of acting on a different item. Sessions are loaded lazily, on the user's
+first update after a start, and sessions idle for longer than SESSION_TTL
+are dropped from memory and from the database.
+The cached item lists (HEAVY_FIELDS) are dropped earlier: after
+SESSION_IDLE_TTL without activity, and from the least recently active users
+whenever all sessions together exceed SESSION_MEMORY_BUDGET.
+"""
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from telegram import Update
+from telegram.ext import Application, ApplicationHandlerStop, ContextTypes
+
+from config import (
+    START_DIRECTORY_PATH, SESSION_TTL, SESSION_EVICT_INTERVAL, SESSION_IDLE_TTL, SESSION_MEMORY_BUDGET, SESSION_SWEEP_INTERVAL,
+    UD_KEY_CURRENT_PATH, UD_KEY_CURRENT_PAGE, UD_KEY_CLICK_MODE, UD_KEY_CURRENT_MESSAGE_ID, UD_KEY_VIEW_ITEMS,
+    UD_KEY_VIEW_SIGNATURE, UD_KEY_SEARCH_RESULTS,
+    CB_PREFIX_NAV_DIR, CB_PREFIX_NAV_FILE, CB_PREFIX_SELECT_ITEM, CB_PREFIX_PREVIEW_ITEM, CB_PREFIX_FOLLOW_ITEM
+)
+import localization as loc
+from . import metrics
+from .auth_utils import auth_service
+from .helpers import get_safe_path, set_safe_path
+from .callback_ack import answer_query
+from .markup import scan_folder, store_folder_view
+
+logger = logging.getLogger(__name__)
+
+# (folder relative to START_DIRECTORY, page, click mode, message id, last activity as unix time, folder signature)
+# Rows written before the signature was added have only the first five fields.
+CompactSession = Tuple[str, int, Optional[str], Optional[int], int, Optional[int]]
+
+# Cached lists that can be dropped at any time: the folder view's are rebuilt from disk
+HEAVY_FIELDS = (UD_KEY_VIEW_ITEMS, UD_KEY_SEARCH_RESULTS)
+
+# Buttons of the folder view that carry an index into UD_KEY_VIEW_ITEMS
+ITEM_INDEX_PREFIXES = (CB_PREFIX_NAV_DIR, CB_PREFIX_NAV_FILE, CB_PREFIX_SELECT_ITEM, CB_PREFIX_PREVIEW_ITEM, CB_PREFIX_FOLLOW_ITEM)
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory used by `value` and everything it contains (bytes)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+def compact_session(user_data: Dict[Any, Any]) -> Optional[CompactSession]:
+    """What is persisted of a user's user_data; None if there is nothing worth keeping."""
+    path_str = user_data.get(UD_KEY_CURRENT_PATH)
+    if not path_str:
+        return None
+    try:
+        relative_path = Path(path_str).relative_to(START_DIRECTORY_PATH).as_posix()
+    except ValueError: # START_DIRECTORY changed since; the session is useless
+        return None
+    return (
+        relative_path,
+        int(user_data.get(UD_KEY_CURRENT_PAGE, 0)),
+        user_data.get(UD_KEY_CLICK_MODE),
+        user_data.get(UD_KEY_CURRENT_MESSAGE_ID),
+        int(time.time()), # Called for users active since the last persistence run
+        user_data.get(UD_KEY_VIEW_SIGNATURE),
+    )
+
+
+class SessionManager:
+    def __init__(
+        self, ttl: float = SESSION_TTL, idle_ttl: float = SESSION_IDLE_TTL, memory_budget: int = SESSION_MEMORY_BUDGET
+    ):
+        self.ttl = ttl
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self._last_active: "OrderedDict[int, float]" = OrderedDict() # user_id -> monotonic time, least recently active first
+        self._sizes: Dict[int, int] = {} # user_id -> estimated bytes of their user_data at the last sweep
+        self._total_size = 0
+        self._heavy: Set[int] = set() # Users holding HEAVY_FIELDS at the last sweep
+        self._active_since_sweep: Set[int] = set()
+        self._unauthorized_since_sweep: Set[int] = set() # Senders without a session whose user_data the sweep drops
+        self._evict_task: Optional["asyncio.Task[None]"] = None
+
+    def touch(self, user_id: int) -> bool:
+        """Records activity; True if this is the user's first update since the session was (re)created."""
+        is_new = user_id not in self._last_active
+        self._last_active[user_id] = time.monotonic()
+        self._last_active.move_to_end(user_id)
+        self._active_since_sweep.add(user_id)
+        return is_new
+
+    async def restore(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Runs before every other handler (group -1): loads the user's persisted
+        session on their first update, and lists the folder again when a button
+        of the folder view is tapped after its item list was dropped. If the
+        folder changed since the view was drawn, an item button is answered
+        with STALE_DATA_ERROR and not handled: its index may now point to
+        another item.
+        """
+        user = update.effective_user
+        if user is None:
+            return
+        if not auth_service.is_allowed(user.id):
+            # No session (not counted in /stats); the user_data dict the Application made for them goes at the next sweep
+            self._unauthorized_since_sweep.add(user.id)
+            return
+        is_new = self.touch(user.id)
+        if is_new and not context.user_data.get(UD_KEY_CURRENT_PATH):
+            await self._load(user.id, context)
+
+        query = update.callback_query
+        message_id = context.user_data.get(UD_KEY_CURRENT_MESSAGE_ID)
+        if query and query.message and message_id and query.message.message_id == message_id:
+            if UD_KEY_VIEW_ITEMS in context.user_data:
+                metrics.increment("listing_cache", result="hit")
+            elif context.user_data.get(UD_KEY_CURRENT_PATH):
+                shown_signature = context.user_data.get(UD_KEY_VIEW_SIGNATURE)
+                try:
+                    all_items, signature = await asyncio.to_thread(scan_folder, get_safe_path(context)) # Disk only
+                except OSError as e: # The handler runs into the same error and reports it
+                    logger.debug(f"Could not list the folder of user {user.id} again: {e}")
+                    return
+                # user_data is only written here, on the event loop (sweep() measures it from the loop too)
+                store_folder_view(context, all_items, signature, context.user_data.get(UD_KEY_CURRENT_PAGE, 0))
+                metrics.increment("listing_cache", result="miss")
+                if (
+                    shown_signature is not None and context.user_data.get(UD_KEY_VIEW_SIGNATURE) != shown_signature
+                    and (query.data or "").startswith(ITEM_INDEX_PREFIXES)
+                ):
+                    # Keep the signature of what the message shows, so every item tap on it stays stale until it is redrawn
+                    context.user_data.pop(UD_KEY_VIEW_ITEMS, None)
+                    context.user_data[UD_KEY_VIEW_SIGNATURE] = shown_signature
+                    metrics.increment("listing_cache", result="stale")
+                    await answer_query(query, loc.STALE_DATA_ERROR, show_alert=True)
+                    raise ApplicationHandlerStop
+
+    async def _load(self, user_id: int, context: ContextTypes.DEFAULT_TYPE) -> None:
+        persistence = context.application.persistence
+        stored = await persistence.load_user_data(user_id) if persistence is not None else None
+        if not stored:
+            return
+        relative_path, page, click_mode, message_id = stored[:4]
+        signature = stored[5] if len(stored) > 5 else None
+        set_safe_path(context, START_DIRECTORY_PATH / relative_path)
+        context.user_data[UD_KEY_CURRENT_PAGE] = page
+        if click_mode:
+            context.user_data[UD_KEY_CLICK_MODE] = click_mode
+        if message_id:
+            context.user_data[UD_KEY_CURRENT_MESSAGE_ID] = message_id
+        if signature is not None:
+            context.user_data[UD_KEY_VIEW_SIGNATURE] = signature
+        metrics.increment("sessions_restored")
+        logger.debug(f"Restored session of user {user_id}: '{relative_path}', page {page}.")
+
+    def _measure(self, user_id: int, user_data: Optional[Dict[Any, Any]]) -> None:
+        size = estimate_size(user_data) if user_data else 0
+        self._total_size += size - self._sizes.get(user_id, 0)
+        self._sizes[user_id] = size
+        if user_data and any(field in user_data for field in HEAVY_FIELDS):
+            self._heavy.add(user_id)
+        else:
+            self._heavy.discard(user_id)
+
+    def _forget(self, user_id: int) -> None:
+        self._total_size -= self._sizes.pop(user_id, 0)
+        self._heavy.discard(user_id)
+        self._active_since_sweep.discard(user_id)
+
+    def _drop_heavy_fields(self, user_id: int, user_data: Optional[Dict[Any, Any]], reason: str) -> None:
+        if user_data:
+            for field in HEAVY_FIELDS:
+                user_data.pop(field, None)
+        self._measure(user_id, user_data)
+        metrics.increment("sessions_heavy_evicted", reason=reason)
+
+    def remeasure(self, application: Application) -> None:
+        """Updates the size estimates of sessions used since they were last measured."""
+        for user_id in self._active_since_sweep:
+            self._measure(user_id, application.user_data.get(user_id))
+        self._active_since_sweep.clear()
+
+    def sweep(self, application: Application) -> None:
+        """
+        Drops the user_data of unauthorized senders, re-measures the sessions
+        used since the previous sweep, then drops the cached lists of idle
+        sessions and, while over the memory budget, of the least recently
+        active ones.
+        """
+        for user_id in self._unauthorized_since_sweep:
+            if user_id not in self._last_active: # Not authorized since
+                application.drop_user_data(user_id)
+        self._unauthorized_since_sweep.clear()
+        self.remeasure(application)
+        idle_cutoff = time.monotonic() - self.idle_ttl
+        for user_id, last_active in self._last_active.items(): # Least recently active first
+            if last_active > idle_cutoff:
+                break
+            if user_id in self._heavy:
+                self._drop_heavy_fields(user_id, application.user_data.get(user_id), "idle")
+
+        if self._total_size > self.memory_budget:
+            for user_id in list(self._last_active):
+                if self._total_size <= self.memory_budget:
+                    break
+                if user_id in self._heavy:
+                    self._drop_heavy_fields(user_id, application.user_data.get(user_id), "budget")
+            if self._total_size > self.memory_budget:
+                logger.warning(
+                    f"Sessions use ~{self._total_size // 1024} KiB after dropping cached lists "
+                    f"(budget {self.memory_budget // 1024} KiB)."
+                )
+
+    def stats(self) -> Dict[str, int]:
+        """Figures for /stats (sizes as of the last remeasure())."""
+        return {
+            "sessions": len(self._last_active),
+            "sessions_with_lists": len(self._heavy),
+            "memory_bytes": self._total_size,
+            "memory_budget": self.memory_budget,
+        }
+
+    def evict_idle(self, application: Application) -> int:
+        """Drops sessions idle for longer than the TTL from memory; the persistence then deletes their rows."""
+        cutoff = time.monotonic() - self.ttl
+        evicted = 0
+        while self._last_active:
+            user_id, last_active = next(iter(self._last_active.items()))
+            if last_active > cutoff:
+                break
+            del self._last_active[user_id]
+            self._forget(user_id)
+            application.drop_user_data(user_id)
+            evicted += 1
+        if evicted:
+            metrics.increment("sessions_evicted", evicted)
+            logger.info(f"Evicted {evicted} idle session(s).")
+        return evicted
+
+    async def _evict_loop(self, application: Application) -> None:
+        last_storage_cleanup = 0.0
+        while True:
+            try:
+                self.evict_idle(application)
+                self.sweep(application)
+                if application.persistence is not None and time.monotonic() - last_storage_cleanup >= SESSION_EVICT_INTERVAL:
+                    last_storage_cleanup = time.monotonic()
+                    await application.persistence.delete_user_data_before(time.time() - self.ttl)
+            except Exception as e:
+                logger.error(f"Session eviction failed: {e}")
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+
+    def start(self, application: Application) -> None:
+        if self._evict_task is None or self._evict_task.done():
+            self._evict_task = asyncio.create_task(self._evict_loop(application))
+
+    async def stop(self) -> None:
+        if self._evict_task is not None:
+            self._evict_task.cancel()
+            try:
+                await self._evict_task
+            except asyncio.CancelledError:
+                pass
+            self._evict_task = None
+
+
+session_manager = SessionManager()
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
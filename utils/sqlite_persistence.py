@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+Persistence on a SQLite database in WAL mode, replacing PicklePersistence
+(which re-pickles and rewrites everything on each run). Every user, chat and
+top-level bot_data key is its own row, and bot_data caches listed in
+CACHE_TABLE_KEYS (e.g. the file_id cache) are stored one entry per row.
+When the Application hands over its data, only rows whose pickled value
+changed since they were last written are queued, and the queue is written
+in transactions of at most PERSISTENCE_BATCH_SIZE rows.
+An existing .pickle from PicklePersistence is imported once on first start.
+With `compact_user_data`, only that function's result is stored per user
+and user_data is not loaded at startup; see load_user_data().
+"""
+import asyncio
+import io
+import json
+import logging
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from telegram import Bot
+from telegram.ext import BasePersistence, PersistenceInput
+
+from config import BD_KEY_FILE_ID_CACHE, PERSISTENCE_BATCH_SIZE, PERSISTENCE_UPDATE_INTERVAL
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+# bot_data keys holding a dict of independent entries; each entry gets its own row
+CACHE_TABLE_KEYS = frozenset({BD_KEY_FILE_ID_CACHE})
+
+# Kinds of queued rows
+_KIND_BOT = "bot"
+_KIND_CACHE = "cache"
+_KIND_USER = "user"
+_KIND_CHAT = "chat"
+_KIND_CONVERSATION = "conversation"
+_KIND_META = "meta"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB);
+CREATE TABLE IF NOT EXISTS bot_data (key TEXT PRIMARY KEY, value BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS cache_entries (cache TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, PRIMARY KEY (cache, key));
+CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS chat_data (chat_id INTEGER PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS conversations (name TEXT NOT NULL, key TEXT NOT NULL, state BLOB NOT NULL, PRIMARY KEY (name, key));
+"""
+
+# (upsert, delete) statements per kind; delete takes the key columns only
+_STATEMENTS = {
+    _KIND_BOT: ("INSERT OR REPLACE INTO bot_data (key, value) VALUES (?, ?)", "DELETE FROM bot_data WHERE key = ?"),
+    _KIND_CACHE: (
+        # REPLACE gives the row a new rowid, so ORDER BY rowid keeps the cache's recency order
+        "INSERT OR REPLACE INTO cache_entries (cache, key, value) VALUES (?, ?, ?)",
+        "DELETE FROM cache_entries WHERE cache = ? AND key = ?"
+    ),
+    _KIND_USER: (
+        "INSERT OR REPLACE INTO user_data (user_id, data, updated_at) VALUES (?, ?, ?)", "DELETE FROM user_data WHERE user_id = ?"
+    ),
+    _KIND_CHAT: (
+        "INSERT OR REPLACE INTO chat_data (chat_id, data, updated_at) VALUES (?, ?, ?)", "DELETE FROM chat_data WHERE chat_id = ?"
+    ),
+    _KIND_CONVERSATION: (
+        "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)", "DELETE FROM conversations WHERE name = ? AND key = ?"
+    ),
+    _KIND_META: ("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", "DELETE FROM meta WHERE name = ?"),
+}
+
+RowId = Tuple[str, Tuple[Any, ...]] # (kind, key columns)
+QueuedRow = Tuple[RowId, Optional[Tuple[Any, ...]]] # Row and the values to write, None: delete
+
+
+_BOT_REFERENCE = "bot" # Persistent id stored in place of a Bot object (Bots refuse to be pickled)
+
+
+class _BotPickler(pickle.Pickler):
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        return _BOT_REFERENCE if isinstance(obj, Bot) else None
+
+
+def _dumps(value: Any) -> bytes:
+    try:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except pickle.PicklingError: # Holds a Bot (e.g. imported from PicklePersistence): the slower pickler replaces it
+        buffer = io.BytesIO()
+        _BotPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+        return buffer.getvalue()
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Bot objects are stored as persistent ids (here and by PicklePersistence); map them back to the current bot."""
+
+    def __init__(self, bot: Any, *args: Any, **kwargs: Any):
+        self._bot = bot
+        super().__init__(*args, **kwargs)
+
+    def persistent_load(self, pid: Any) -> Any:
+        return self._bot
+
+
+class SQLitePersistence(BasePersistence[Dict[Any, Any], Dict[Any, Any], Dict[Any, Any]]):
+    def __init__(
+        self,
+        filepath: Path,
+        store_data: Optional[PersistenceInput] = None,
+        update_interval: float = PERSISTENCE_UPDATE_INTERVAL,
+        legacy_pickle: Optional[Path] = None,
+        batch_size: int = PERSISTENCE_BATCH_SIZE,
+        compact_user_data: Optional[Callable[[Dict[Any, Any]], Any]] = None
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = Path(filepath)
+        self.legacy_pickle = Path(legacy_pickle) if legacy_pickle else None
+        self.batch_size = batch_size
+        self.compact_user_data = compact_user_data # Returns what is stored for a user (None: nothing)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._write_lock = asyncio.Lock() # One thread at a time uses the connection
+        self._pending: "OrderedDict[RowId, Optional[Tuple[Any, ...]]]" = OrderedDict() # Row -> values to write, None: delete
+        self._written: Dict[str, Dict[Tuple[Any, ...], int]] = {kind: {} for kind in _STATEMENTS} # Kind -> key -> hash of the pickled value in the database
+
+    # --- Connection & migration (run in a worker thread) ---
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.filepath, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL") # Durable across app crashes; WAL is synced at checkpoints
+            connection.execute("PRAGMA busy_timeout=5000")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._migrate_legacy_pickle()
+        return self._connection
+
+    def _loads(self, blob: bytes) -> Any:
+        try:
+            return pickle.loads(blob)
+        except pickle.UnpicklingError: # Persistent id of a Bot, see _dumps()
+            return _LegacyUnpickler(self.bot, io.BytesIO(blob)).load()
+
+    def _meta(self, name: str) -> Any:
+        row = self._connection.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return self._loads(row[0]) if row else None
+
+    def _migrate_legacy_pickle(self) -> None:
+        if self._meta("schema_version") is not None:
+            return
+        rows: List[QueuedRow] = [((_KIND_META, ("schema_version",)), ("schema_version", _dumps(SCHEMA_VERSION)))]
+        if self.legacy_pickle and self.legacy_pickle.is_file():
+            started = time.perf_counter()
+            try:
+                with open(self.legacy_pickle, 'rb') as f:
+                    data = _LegacyUnpickler(self.bot, f).load()
+            except Exception as e:
+                logger.error(f"Could not read {self.legacy_pickle} for migration, starting with empty persistence: {e}")
+                data = {}
+            now = time.time()
+            for key, value in (data.get("bot_data") or {}).items():
+                if key in CACHE_TABLE_KEYS and isinstance(value, dict):
+                    rows.extend(
+                        ((_KIND_CACHE, (key, str(entry_key))), (key, str(entry_key), _dumps(entry))) for entry_key, entry in value.items()
+                    )
+                else:
+                    rows.append(((_KIND_BOT, (str(key),)), (str(key), _dumps(value))))
+            for kind, section in ((_KIND_USER, "user_data"), (_KIND_CHAT, "chat_data")):
+                rows.extend(((kind, (row_id,)), (row_id, _dumps(value), now)) for row_id, value in (data.get(section) or {}).items())
+            for name, states in (data.get("conversations") or {}).items():
+                rows.extend(
+                    ((_KIND_CONVERSATION, (name, json.dumps(list(key)))), (name, json.dumps(list(key)), _dumps(state)))
+                    for key, state in states.items()
+                )
+            if data.get("callback_data") is not None:
+                rows.append(((_KIND_META, ("callback_data",)), ("callback_data", _dumps(data["callback_data"]))))
+            rows.append(((_KIND_META, ("migrated_from",)), ("migrated_from", _dumps(str(self.legacy_pickle)))))
+            logger.info(
+                f"Migrating {self.legacy_pickle} into {self.filepath}: {len(rows) - 2} rows "
+                f"in {(time.perf_counter() - started) * 1000:.1f} ms. The old file is left in place."
+            )
+        self._write_rows(rows)
+
+    def _write_rows(self, rows: List[QueuedRow]) -> None:
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for (kind, key), values in rows:
+                if values is None:
+                    connection.execute(_STATEMENTS[kind][1], key)
+                else:
+                    connection.execute(_STATEMENTS[kind][0], values)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _load(self, query: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        return self._connect().execute(query, params).fetchall()
+
+    async def _read(self, query: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        async with self._write_lock:
+            return await asyncio.to_thread(self._load, query, params)
+
+    # --- Change tracking ---
+    def _stage(self, kind: str, key: Tuple[Any, ...], value: Any, extra: Tuple[Any, ...] = ()) -> None:
+        """Queues the row if its pickled value differs from what the database holds."""
+        blob = _dumps(value)
+        digest = hash(blob)
+        written = self._written[kind]
+        if written.get(key) == digest:
+            return
+        written[key] = digest
+        self._pending[(kind, key)] = key + (blob,) + extra
+        self._pending.move_to_end((kind, key))
+
+    def _stage_delete(self, kind: str, key: Tuple[Any, ...]) -> None:
+        if self._written[kind].pop(key, None) is None and (kind, key) not in self._pending:
+            return
+        self._pending[(kind, key)] = None
+        self._pending.move_to_end((kind, key))
+
+    def _remember(self, kind: str, key: Tuple[Any, ...], blob: bytes) -> None:
+        self._written[kind][key] = hash(blob)
+
+    async def _write_pending(self) -> None:
+        """
+        Writes queued rows, one transaction per batch. Rows queued while a batch
+        is being written join the next batch instead of waiting for the next run.
+        """
+        async with self._write_lock:
+            while self._pending:
+                batch: List[QueuedRow] = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popitem(last=False))
+                started = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                except sqlite3.Error as e:
+                    logger.error(f"Writing {len(batch)} rows to {self.filepath} failed, retrying on the next run: {e}")
+                    metrics.increment("persistence_write_errors")
+                    for row_id, values in reversed(batch):
+                        if row_id not in self._pending: # A newer value queued meanwhile wins
+                            self._pending[row_id] = values
+                            self._pending.move_to_end(row_id, last=False)
+                    return
+                metrics.increment("persistence_batches")
+                metrics.increment("persistence_rows_written", len(batch))
+                metrics.increment("persistence_write_seconds", time.perf_counter() - started)
+
+    def _write_batch(self, batch: List[QueuedRow]) -> None:
+        self._connect()
+        self._write_rows(batch)
+
+    # --- BasePersistence: reads (once, at startup) ---
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        bot_data: Dict[Any, Any] = {}
+        for key, blob in await self._read("SELECT key, value FROM bot_data"):
+            bot_data[key] = self._loads(blob)
+            self._remember(_KIND_BOT, (key,), blob)
+        for cache, key, blob in await self._read("SELECT cache, key, value FROM cache_entries ORDER BY rowid"):
+            bot_data.setdefault(cache, {})[key] = self._loads(blob)
+            self._remember(_KIND_CACHE, (cache, key), blob)
+        return bot_data
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        user_data: Dict[int, Dict[Any, Any]] = {}
+        if self.compact_user_data is not None: # Loaded per user, on demand
+            return user_data
+        for user_id, blob in await self._read("SELECT user_id, data FROM user_data"):
+            user_data[user_id] = self._loads(blob)
+            self._remember(_KIND_USER, (user_id,), blob)
+        return user_data
+
+    async def load_user_data(self, user_id: int) -> Any:
+        """The stored (compact) user data of one user, or None."""
+        rows = await self._read("SELECT data FROM user_data WHERE user_id = ?", (user_id,))
+        if not rows:
+            return None
+        self._remember(_KIND_USER, (user_id,), rows[0][0])
+        return self._loads(rows[0][0])
+
+    async def delete_user_data_before(self, cutoff: float) -> int:
+        """Deletes user rows last written before the unix time `cutoff`. Returns the number deleted."""
+        async with self._write_lock:
+            deleted = await asyncio.to_thread(self._delete_user_rows_before, cutoff)
+        if deleted:
+            logger.info(f"Deleted {len(deleted)} expired user row(s) from {self.filepath}.")
+        for user_id in deleted:
+            self._written[_KIND_USER].pop((user_id,), None)
+        return len(deleted)
+
+    def _delete_user_rows_before(self, cutoff: float) -> List[int]:
+        connection = self._connect()
+        user_ids = [row[0] for row in connection.execute("SELECT user_id FROM user_data WHERE updated_at < ?", (cutoff,))]
+        if user_ids:
+            connection.execute("DELETE FROM user_data WHERE updated_at < ?", (cutoff,))
+        return user_ids
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        chat_data: Dict[int, Dict[Any, Any]] = {}
+        for chat_id, blob in await self._read("SELECT chat_id, data FROM chat_data"):
+            chat_data[chat_id] = self._loads(blob)
+            self._remember(_KIND_CHAT, (chat_id,), blob)
+        return chat_data
+
+    async def get_callback_data(self) -> Optional[Any]:
+        rows = await self._read("SELECT value FROM meta WHERE name = 'callback_data'")
+        return self._loads(rows[0][0]) if rows else None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[Any, ...], object]:
+        conversations: Dict[Tuple[Any, ...], object] = {}
+        for key, blob in await self._read("SELECT key, state FROM conversations WHERE name = ?", (name,)):
+            conversations[tuple(json.loads(key))] = self._loads(blob)
+            self._remember(_KIND_CONVERSATION, (name, key), blob)
+        return conversations
+
+    # --- BasePersistence: updates (queued, then written in batches) ---
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        present = set()
+        for key, value in data.items():
+            if key in CACHE_TABLE_KEYS and isinstance(value, dict):
+                self._stage_cache(key, value)
+                continue
+            present.add(key)
+            self._stage(_KIND_BOT, (str(key),), value)
+        for key in [key for key in self._written[_KIND_BOT] if key[0] not in present]:
+            self._stage_delete(_KIND_BOT, key)
+        for cache in CACHE_TABLE_KEYS - data.keys():
+            self._stage_cache(cache, {})
+        await self._write_pending()
+
+    def _stage_cache(self, cache: str, entries: Dict[Any, Any]) -> None:
+        for entry_key, entry in entries.items():
+            self._stage(_KIND_CACHE, (cache, str(entry_key)), entry)
+        stale = [key for key in self._written[_KIND_CACHE] if key[0] == cache and key[1] not in entries]
+        for key in stale:
+            self._stage_delete(_KIND_CACHE, key)
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        if self.compact_user_data is not None:
+            stored = self.compact_user_data(data)
+            if stored is None:
+                self._stage_delete(_KIND_USER, (user_id,))
+                await self._write_pending()
+                return
+            data = stored
+        self._stage(_KIND_USER, (user_id,), data, (time.time(),))
+        await self._write_pending()
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        self._stage(_KIND_CHAT, (chat_id,), data, (time.time(),))
+        await self._write_pending()
+
+    async def update_callback_data(self, data: Any) -> None:
+        self._stage(_KIND_META, ("callback_data",), data)
+        await self._write_pending()
+
+    async def update_conversation(self, name: str, key: Tuple[Any, ...], new_state: Optional[object]) -> None:
+        row_key = (name, json.dumps(list(key)))
+        if new_state is None:
+            self._stage_delete(_KIND_CONVERSATION, row_key)
+        else:
+            self._stage(_KIND_CONVERSATION, row_key, new_state)
+        await self._write_pending()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._stage_delete(_KIND_USER, (user_id,))
+        await self._write_pending()
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage_delete(_KIND_CHAT, (chat_id,))
+        await self._write_pending()
+
+    # Nothing else writes to the database while the bot runs
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Shutdown: writes what is still queued, checkpoints the WAL and closes the database."""
+        await self._write_pending()
+        async with self._write_lock:
+            if self._connection is not None:
+                connection, self._connection = self._connection, None
+                try:
+                    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                finally:
+                    connection.close()
+
+    def row_counts(self) -> Dict[str, int]:
+        """Rows per table (for diagnostics; runs on the calling thread)."""
+        connection = self._connect()
+        return {
+            table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("bot_data", "cache_entries", "user_data", "chat_data", "conversations")
+        }
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
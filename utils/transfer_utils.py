@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for uploading files to Telegram: retries with exponential backoff,
+flood-control handling, a file_id cache so already delivered files
+can be re-sent without reading and uploading them again, media group
+batching and a small scheduler that pipelines transfers.
+Also receives files sent to the bot, streamed to disk chunk by chunk.
+"""
+import asyncio
+import logging
+import os
+import random
+import shutil
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable, BinaryIO
+from urllib import parse as urllib_parse
+
+import httpx
+
+from telegram import Message, InputMediaPhoto, InputMediaVideo, InputMediaAudio, InputMediaDocument
+from telegram.ext import Application, ContextTypes
+from telegram.error import BadRequest, TimedOut, NetworkError, RetryAfter
+
+from config import (
+    SEND_MAX_RETRIES, SEND_RETRY_BASE_DELAY, SEND_RETRY_MAX_DELAY,
+    FILE_ID_CACHE_MAX_ENTRIES, BD_KEY_FILE_ID_CACHE,
+    MEDIA_GROUP_MAX_SIZE, MAX_PHOTO_UPLOAD_SIZE, TRANSFER_MAX_CONCURRENT, UPLOAD_CHUNK_SIZE
+)
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MEDIA_KIND_PHOTO = "photo"
+MEDIA_KIND_VIDEO = "video"
+MEDIA_KIND_AUDIO = "audio"
+MEDIA_KIND_DOCUMENT = "document"
+
+PHOTO_EXTENSIONS = {'jpg', 'jpeg', 'png', 'webp'}
+VIDEO_EXTENSIONS = {'mp4', 'mov'}
+AUDIO_EXTENSIONS = {'mp3', 'm4a'}
+
+# --- Backoff ---
+def compute_backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with jitter for retry number `attempt` (0-based).
+    Half of the delay is fixed, the other half is random, so parallel
+    retries don't hit the API at the same moment.
+    """
+    delay = min(SEND_RETRY_MAX_DELAY, SEND_RETRY_BASE_DELAY * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+# --- file_id Cache ---
+# file_ids are only valid for the media type they were uploaded as,
+# so every entry remembers the kind ("document", "photo", ...) too.
+def _file_signature(file_path: Path) -> Optional[Dict[str, int]]:
+    try:
+        stat_result = file_path.stat()
+    except OSError:
+        return None
+    return {"size": stat_result.st_size, "mtime_ns": stat_result.st_mtime_ns}
+
+def get_cached_file_id(context: ContextTypes.DEFAULT_TYPE, file_path: Path, kind: str = MEDIA_KIND_DOCUMENT) -> Optional[str]:
+    """Returns the file_id of a previous upload of this exact file version, if any."""
+    cache = context.bot_data.get(BD_KEY_FILE_ID_CACHE)
+    entry = cache.get(str(file_path)) if cache else None
+    if not entry or entry.get("kind", MEDIA_KIND_DOCUMENT) != kind:
+        metrics.increment("file_id_cache", result="miss")
+        return None
+    signature = _file_signature(file_path)
+    if signature is None or signature["size"] != entry.get("size") or signature["mtime_ns"] != entry.get("mtime_ns"):
+        cache.pop(str(file_path), None) # File changed since upload, the old file_id is stale
+        metrics.increment("file_id_cache", result="stale")
+        return None
+    metrics.increment("file_id_cache", result="hit")
+    return entry.get("file_id")
+
+def remember_file_id(context: ContextTypes.DEFAULT_TYPE, file_path: Path, file_id: str, kind: str = MEDIA_KIND_DOCUMENT) -> None:
+    """Stores the file_id of a successful upload, evicting the oldest entries past the limit."""
+    signature = _file_signature(file_path)
+    if signature is None:
+        return
+    cache: Dict[str, Dict[str, Any]] = context.bot_data.setdefault(BD_KEY_FILE_ID_CACHE, {})
+    cache.pop(str(file_path), None) # Re-insert to keep dict order == recency
+    cache[str(file_path)] = {**signature, "kind": kind, "file_id": file_id}
+    while len(cache) > FILE_ID_CACHE_MAX_ENTRIES:
+        cache.pop(next(iter(cache)))
+
+def forget_file_id(context: ContextTypes.DEFAULT_TYPE, file_path: Path) -> None:
+    cache = context.bot_data.get(BD_KEY_FILE_ID_CACHE)
+    if cache:
+        cache.pop(str(file_path), None)
+
+def _extract_file_id(message: Message, kind: str) -> Optional[str]:
+    if kind == MEDIA_KIND_PHOTO and message.photo:
+        return message.photo[-1].file_id
+    media = {
+        MEDIA_KIND_VIDEO: message.video,
+        MEDIA_KIND_AUDIO: message.audio,
+        MEDIA_KIND_DOCUMENT: message.document,
+    }.get(kind)
+    return media.file_id if media else None
+
+# --- Media Groups ---
+def classify_media_kind(file_path: Path) -> str:
+    """Decides how a file is sent inside a media group. Oversized photos go as documents."""
+    ext = file_path.suffix.lower().lstrip('.')
+    if ext in PHOTO_EXTENSIONS:
+        try:
+            if file_path.stat().st_size <= MAX_PHOTO_UPLOAD_SIZE:
+                return MEDIA_KIND_PHOTO
+        except OSError:
+            pass
+        return MEDIA_KIND_DOCUMENT
+    if ext in VIDEO_EXTENSIONS:
+        return MEDIA_KIND_VIDEO
+    if ext in AUDIO_EXTENSIONS:
+        return MEDIA_KIND_AUDIO
+    return MEDIA_KIND_DOCUMENT
+
+def build_media_batches(file_paths: List[Path]) -> List[List[Tuple[Path, str]]]:
+    """
+    Splits files into sendMediaGroup-compatible batches of up to MEDIA_GROUP_MAX_SIZE.
+    Telegram only mixes photos with videos; audio and documents must be grouped
+    with their own kind. Order within each group is preserved.
+    """
+    buckets: Dict[str, List[Tuple[Path, str]]] = {}
+    for file_path in file_paths:
+        kind = classify_media_kind(file_path)
+        group_key = "visual" if kind in (MEDIA_KIND_PHOTO, MEDIA_KIND_VIDEO) else kind
+        buckets.setdefault(group_key, []).append((file_path, kind))
+
+    batches: List[List[Tuple[Path, str]]] = []
+    for items in buckets.values():
+        for start in range(0, len(items), MEDIA_GROUP_MAX_SIZE):
+            batches.append(items[start:start + MEDIA_GROUP_MAX_SIZE])
+    return batches
+
+_INPUT_MEDIA_CLASSES = {
+    MEDIA_KIND_PHOTO: InputMediaPhoto,
+    MEDIA_KIND_VIDEO: InputMediaVideo,
+    MEDIA_KIND_AUDIO: InputMediaAudio,
+    MEDIA_KIND_DOCUMENT: InputMediaDocument,
+}
+
+# --- Sending ---
+# httpx errors (the __cause__ of PTB's TimedOut/NetworkError) raised before any byte of the request was sent
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+def request_not_sent(error: NetworkError) -> bool:
+    """True if the request failed while connecting or waiting for a pooled connection, so Telegram never saw it."""
+    return isinstance(error.__cause__, _NOT_SENT_ERRORS)
+
+async def _call_with_retry(send_call: Callable[[], Awaitable[Any]], description: str) -> Any:
+    """
+    Awaits `send_call()` and retries it, with backoff, only when Telegram
+    cannot have processed the upload: RetryAfter (refused by flood control)
+    and connect-phase network errors. A timeout or connection loss after the
+    upload was sent is raised, since Telegram may have delivered it and a
+    retry would send the file twice. All retries, whatever their reason,
+    count against SEND_MAX_RETRIES: `send_call` must pass rate_limit_args=0
+    so the rate limiter does not retry RetryAfter on its own as well.
+    `send_call` must (re)open its files on every call.
+    """
+    attempt = 0
+    while True:
+        metrics.increment("send_file_attempts")
+        try:
+            return await send_call()
+        except RetryAfter as e:
+            if attempt >= SEND_MAX_RETRIES:
+                metrics.increment("send_file_failures", reason="retry_after")
+                raise
+            delay = float(e.retry_after)
+            reason = "retry_after"
+        except BadRequest:
+            raise # Not transient (BadRequest is a NetworkError subclass, so it must be re-raised first)
+        except (TimedOut, NetworkError) as e:
+            if not request_not_sent(e):
+                metrics.increment("send_file_failures", reason="maybe_delivered")
+                raise
+            if attempt >= SEND_MAX_RETRIES:
+                metrics.increment("send_file_failures", reason="network")
+                raise
+            delay = compute_backoff_delay(attempt)
+            reason = "timeout" if isinstance(e, TimedOut) else "network"
+
+        attempt += 1
+        metrics.increment("send_file_retries", reason=reason)
+        logger.warning(f"Sending {description} failed ({reason}). Retry {attempt}/{SEND_MAX_RETRIES} in {delay:.1f}s.")
+        await asyncio.sleep(delay)
+
+async def send_document_with_retry(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: int,
+    file_path: Path,
+    file_name: str
+) -> Message:
+    """
+    Sends `file_path` as a document. Re-uses a cached file_id when the same
+    file version was uploaded before; otherwise uploads it with retries.
+    """
+    cached_file_id = get_cached_file_id(context, file_path)
+    if cached_file_id:
+        try:
+            message = await context.bot.send_document(chat_id=chat_id, document=cached_file_id, filename=file_name)
+            metrics.increment("send_file_cache_hits")
+            logger.info(f"Re-sent {file_path} to chat {chat_id} using cached file_id.")
+            return message
+        except BadRequest as e:
+            logger.info(f"Cached file_id for {file_path} rejected ({e}). Uploading again.")
+            forget_file_id(context, file_path)
+
+    async def upload() -> Message:
+        with open(file_path, 'rb') as file_to_send:
+            return await context.bot.send_document(
+                chat_id=chat_id, document=file_to_send, filename=file_name,
+                read_timeout=180, write_timeout=180, connect_timeout=60, pool_timeout=180,
+                rate_limit_args=0, # RetryAfter is retried by _call_with_retry
+            )
+
+    message = await _call_with_retry(upload, f"{file_path} to chat {chat_id}")
+    file_id = _extract_file_id(message, MEDIA_KIND_DOCUMENT)
+    if file_id:
+        remember_file_id(context, file_path, file_id)
+    return message
+
+async def send_media_group_with_retry(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: int,
+    batch: List[Tuple[Path, str]]
+) -> List[Message]:
+    """
+    Sends one batch from `build_media_batches` as a single media group
+    (or a plain document for a batch of one). Items with a cached file_id
+    are not uploaded again.
+    """
+    if len(batch) == 1:
+        file_path, _ = batch[0]
+        return [await send_document_with_retry(context, chat_id, file_path, file_path.name)]
+
+    use_cached_ids = True
+    used_cached_ids = False
+
+    async def upload() -> List[Message]:
+        nonlocal used_cached_ids
+        with ExitStack() as open_files:
+            media = []
+            for file_path, kind in batch:
+                source = get_cached_file_id(context, file_path, kind) if use_cached_ids else None
+                if source:
+                    used_cached_ids = True
+                else:
+                    source = open_files.enter_context(open(file_path, 'rb'))
+                media_class = _INPUT_MEDIA_CLASSES[kind]
+                if kind == MEDIA_KIND_PHOTO:
+                    media.append(media_class(media=source))
+                else:
+                    media.append(media_class(media=source, filename=file_path.name))
+            return list(await context.bot.send_media_group(
+                chat_id=chat_id, media=media,
+                read_timeout=180, write_timeout=180, connect_timeout=60, pool_timeout=180,
+                rate_limit_args=0, # RetryAfter is retried by _call_with_retry
+            ))
+
+    description = f"media group of {len(batch)} to chat {chat_id}"
+    try:
+        messages = await _call_with_retry(upload, description)
+    except BadRequest as e:
+        if not used_cached_ids:
+            raise
+        logger.info(f"Cached file_id rejected in {description} ({e}). Uploading the whole batch again.")
+        for file_path, _ in batch:
+            forget_file_id(context, file_path)
+        use_cached_ids = False
+        messages = await _call_with_retry(upload, description)
+
+    for message, (file_path, kind) in zip(messages, batch):
+        file_id = _extract_file_id(message, kind)
+        if file_id:
+            remember_file_id(context, file_path, file_id, kind)
+    return messages
+
+# --- Receiving ---
+def sanitize_upload_name(file_name: Optional[str], fallback: str) -> str:
+    """Reduces a client supplied file name to a single safe path component."""
+    name = (file_name or "").replace("\0", "").replace("\\", "/").split("/")[-1].strip()
+    if name in ("", ".", ".."):
+        return fallback
+    return name
+
+def _encoded_file_url(file_url: str) -> str:
+    # Same as File._get_encoded_url: non-ASCII file paths must be percent-encoded
+    parts = urllib_parse.urlsplit(file_url)
+    return urllib_parse.urlunsplit(parts._replace(path=urllib_parse.quote(parts.path)))
+
+def _fsync_directory(directory: Path) -> None:
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return # Not supported on this platform
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def _commit_without_overwrite(temp_path: Path, target_dir: Path, file_name: str) -> Path:
+    """
+    Moves the finished temp file to `file_name` in `target_dir`, adding a
+    " (n)" suffix if that name is taken. A hard link is used so an existing
+    file is never replaced, even if another upload picks the same name. Blocking.
+    """
+    stem, suffix = os.path.splitext(file_name)
+    for attempt in range(1000):
+        candidate = target_dir / (file_name if attempt == 0 else f"{stem} ({attempt}){suffix}")
+        try:
+            os.link(temp_path, candidate)
+        except FileExistsError:
+            continue
+        except OSError:
+            # Filesystem without hard links: best effort check, then an atomic rename
+            if candidate.exists():
+                continue
+            os.replace(temp_path, candidate)
+        else:
+            os.unlink(temp_path)
+        _fsync_directory(target_dir)
+        return candidate
+    raise FileExistsError(f"No free name for {file_name} in {target_dir}")
+
+async def _stream_to_file(file_url: str, destination: BinaryIO) -> int:
+    written = 0
+    timeout = httpx.Timeout(60.0, read=180.0)
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        async with client.stream("GET", _encoded_file_url(file_url)) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(destination.write, chunk)
+                written += len(chunk)
+    return written
+
+def _copy_local_file(source: Path, destination: BinaryIO) -> int:
+    # A local Bot API server hands out paths on this machine instead of URLs
+    with open(source, 'rb') as source_file:
+        shutil.copyfileobj(source_file, destination, UPLOAD_CHUNK_SIZE)
+    return destination.tell()
+
+async def receive_file_to_directory(
+    context: ContextTypes.DEFAULT_TYPE,
+    file_id: str,
+    target_dir: Path,
+    file_name: str
+) -> Path:
+    """
+    Downloads a file sent to the bot into `target_dir` and returns its final path.
+    Data is streamed in UPLOAD_CHUNK_SIZE chunks to a hidden temp file in the
+    same directory, fsynced, then renamed into place, so a crash or a failed
+    download never leaves a half-written file under the real name.
+    """
+    tg_file = await context.bot.get_file(file_id, read_timeout=60, connect_timeout=60)
+    fd, temp_name = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=target_dir)
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            if Path(tg_file.file_path).is_absolute():
+                written = await asyncio.to_thread(_copy_local_file, Path(tg_file.file_path), temp_file)
+            else:
+                written = await _stream_to_file(tg_file.file_path, temp_file)
+            await asyncio.to_thread(temp_file.flush)
+            await asyncio.to_thread(os.fsync, temp_file.fileno())
+        final_path = await asyncio.to_thread(_commit_without_overwrite, temp_path, target_dir, file_name)
+    except BaseException:
+        metrics.increment("receive_file_failures")
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
+        raise
+    metrics.increment("receive_file_completed")
+    metrics.increment("receive_file_bytes", written)
+    logger.info(f"Received {written} bytes into {final_path}.")
+    return final_path
+
+# --- Transfer Scheduler ---
+class TransferScheduler:
+    """
+    Runs uploads/downloads as background tasks with a cap on how many are in
+    flight at once, so several transfers are pipelined without flooding the API.
+    Tasks are created through the Application, so their errors reach the
+    registered error handler.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.queued = 0
+        self.active = 0
+
+    async def _run(self, coroutine: Awaitable[Any]) -> Any:
+        self.queued += 1
+        waiting = True
+        try:
+            async with self._semaphore:
+                self.queued -= 1
+                waiting = False
+                self.active += 1
+                try:
+                    return await coroutine
+                finally:
+                    self.active -= 1
+        finally:
+            if waiting: # Cancelled before it got a slot
+                self.queued -= 1
+                close = getattr(coroutine, "close", None)
+                if close:
+                    close()
+
+    def submit(self, application: Application, coroutine: Awaitable[Any], update: Optional[object] = None) -> "asyncio.Task[Any]":
+        return application.create_task(self._run(coroutine), update=update)
+
+transfer_scheduler = TransferScheduler(TRANSFER_MAX_CONCURRENT)
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Update processor for concurrent update handling (Application.concurrent_updates).
+Updates of different users run in parallel, up to a global ceiling;
+updates of the same user run one after another in arrival order, so a
+user's clicks stay ordered and their user_data is never mutated concurrently.
+Work a handler defers until after it returned (see utils.callback_ack) takes
+the same per-user lock through `serialized()`.
+"""
+import asyncio
+import inspect
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from config import UPDATE_MAX_CONCURRENT
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PENDING_UPDATES_FACTOR = 16 # Updates accepted (running + waiting) per concurrency slot
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    The base class semaphore only bounds how many updates are pending. The real
+    ceiling is taken after the per-user lock, so a user waiting for their own
+    previous update doesn't hold a slot other users could use.
+    """
+
+    def __init__(self, max_concurrent: int = UPDATE_MAX_CONCURRENT):
+        super().__init__(max(2, max_concurrent) * PENDING_UPDATES_FACTOR)
+        self.max_concurrent = max_concurrent
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._user_locks: Dict[int, List[Any]] = {} # user_id -> [lock, users of the lock]
+        self.active = 0
+        self.waiting = 0
+
+    @staticmethod
+    def _serialization_key(update: object) -> Optional[int]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return update.effective_user.id
+        if update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def _run_with_slot(self, coroutine: Awaitable[Any]) -> None:
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            await coroutine
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        try:
+            await self._process_in_order(update, coroutine)
+        finally:
+            # Cancelled (shutdown) while still queued: avoid "coroutine was never awaited"
+            if inspect.iscoroutine(coroutine) and inspect.getcoroutinestate(coroutine) == inspect.CORO_CREATED:
+                coroutine.close()
+
+    @asynccontextmanager
+    async def serialized(self, update: object) -> AsyncIterator[None]:
+        """Holds the lock of the update's user (nothing for updates without a user or chat)."""
+        key = self._serialization_key(update)
+        if key is None:
+            yield
+            return
+
+        entry = self._user_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            lock: asyncio.Lock = entry[0]
+            if lock.locked():
+                metrics.increment("updates_serialized")
+            async with lock:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._user_locks[key]
+
+    async def _process_in_order(self, update: object, coroutine: Awaitable[Any]) -> None:
+        async with self.serialized(update):
+            await self._run_with_slot(coroutine)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Webhook mode: Telegram POSTs updates to our own HTTP server, which feeds
+them straight into the Application's update queue. The server speaks
+plain HTTP; put it behind a TLS-terminating reverse proxy (Telegram only
+delivers to HTTPS URLs).
+"""
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+import signal
+
+from telegram import Update
+from telegram.ext import Application
+
+from config import WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET_TOKEN
+from . import metrics
+from .http_server import AsyncHttpServer, HttpRequest, HttpResponse, RouteHandler
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+def make_webhook_handler(application: Application, secret_token: str) -> RouteHandler:
+    """Builds the route that validates the secret token and queues the update."""
+    expected_secret = secret_token.encode('utf-8')
+
+    async def handle_update(request: HttpRequest) -> HttpResponse:
+        received_secret = request.headers.get(SECRET_HEADER, "").encode('utf-8')
+        if not hmac.compare_digest(received_secret, expected_secret):
+            metrics.increment("webhook_rejected", reason="secret")
+            logger.warning("Webhook request with a wrong or missing secret token rejected.")
+            return HttpResponse(403)
+        try:
+            update = Update.de_json(json.loads(request.body), application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            metrics.increment("webhook_rejected", reason="payload")
+            logger.warning(f"Webhook request with an invalid update body rejected: {e}")
+            return HttpResponse(400)
+        await application.update_queue.put(update)
+        metrics.increment("webhook_updates")
+        return HttpResponse(200)
+
+    return handle_update
+
+
+async def serve_webhook(application: Application, stop_event: asyncio.Event) -> None:
+    """
+    Runs the Application in webhook mode until `stop_event` is set.
+    Mirrors what run_polling does around the update source: post_init,
+    start, stop and shutdown (which also flushes persistence).
+    """
+    secret_token = WEBHOOK_SECRET_TOKEN or secrets.token_urlsafe(32)
+    server = AsyncHttpServer(WEBHOOK_LISTEN, WEBHOOK_PORT)
+    server.add_route("POST", WEBHOOK_PATH, make_webhook_handler(application, secret_token))
+
+    async with application: # initialize() ... shutdown()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await server.start()
+        try:
+            await application.bot.set_webhook(
+                url=WEBHOOK_URL, secret_token=secret_token, allowed_updates=Update.ALL_TYPES
+            )
+            logger.info(f"Webhook registered at {WEBHOOK_URL}.")
+            await stop_event.wait()
+        finally:
+            await server.stop()
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+def run_webhook(application: Application) -> None:
+    """Blocking entry point, the webhook counterpart of application.run_polling()."""
+    async def main() -> None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for stop_signal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(stop_signal, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass # Windows: KeyboardInterrupt still ends asyncio.run
+        await serve_webhook(application, stop_event)
+
+    asyncio.run(main())
+
+# Made by: Zaky1million 😊♥️
+# For contact or project requests: https://t.me/Zaky1million